@@ -1,17 +1,35 @@
 import streamlit as st
-from database import (create_bug, get_user_bugs, get_bug_details, get_bug_stats, update_bug_status, 
-                     get_connection, create_developer, get_developers, get_developer_by_id, 
+from database import (create_bug, get_bugs_page, search_bugs, get_bug_details_many, get_bug_stats, update_bug_status, 
+                     create_developer, get_developers, 
                      update_developer, delete_developer, update_bug, delete_bug,
-                     authenticate_user, check_permission, get_user_by_id, create_user,
-                     get_all_users, update_user, change_user_password, delete_user)
+                     authenticate_user, get_user_by_id, create_user,
+                     get_all_users, update_user, change_user_password, delete_user,
+                     get_attachment_stats, SEARCH_MAX_CANDIDATES,
+                     get_developer_directory, UNASSIGNED_ID, bulk_update_bugs,
+                     list_projects, create_project, set_current_project, use_project,
+                     get_cross_project_stats, DEFAULT_PROJECT)
+from exporter import EXPORT_FORMATS, export_bugs_to_tempfile, download_export, discard_export
+from attachments import store_screenshot, store_log, AttachmentTooLarge, UPLOAD_DIR
+from compression import strip_codec_suffix
+from log_viewer import (get_log_info, read_lines, search_log, download_log, download_parts, MAX_SEARCH_RESULTS,
+                        LOG_DOWNLOAD_PART_BYTES)
+from thumbnails import get_derivative, download_original
+from sessions import (create_session, get_session_user, drop_session, drop_user_sessions, expire_user_sessions,
+                      SESSION_QUERY_PARAM, SESSION_IN_URL)
+from permissions import get_capabilities, editable_bug_mask
+from log_config import setup_logging
+import db_metrics
+from query_cache import get_cache_stats, clear_cache
 import os
 import time
 import pandas as pd
-from io import BytesIO
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
+# 日志配置（重复调用无副作用）
+setup_logging()
+
 # 页面配置
 st.set_page_config(
     page_title="个人BUG管理系统",
@@ -24,6 +42,8 @@ if 'current_page' not in st.session_state:
     st.session_state.current_page = "submit"
 if 'user' not in st.session_state:
     st.session_state.user = None
+if 'session_token' not in st.session_state:
+    st.session_state.session_token = None
 if 'is_authenticated' not in st.session_state:
     st.session_state.is_authenticated = False
 
@@ -45,6 +65,9 @@ def show_login_page():
                     user = authenticate_user(username, password)
                     if user:
                         st.session_state.user = user
+                        st.session_state.session_token = create_session(user)
+                        if SESSION_IN_URL:
+                            st.query_params[SESSION_QUERY_PARAM] = st.session_state.session_token
                         st.session_state.is_authenticated = True
                         st.success(f"✅ 欢迎，{user['real_name'] or user['username']}! 正在跳转...")
                         time.sleep(1)
@@ -63,19 +86,173 @@ def show_login_page():
 
 # 注销功能
 def logout():
+    drop_session(st.session_state.session_token)
+    st.session_state.session_token = None
+    st.query_params.pop(SESSION_QUERY_PARAM, None)
     st.session_state.user = None
     st.session_state.is_authenticated = False
     st.session_state.current_page = "submit"
     st.rerun()
 
-# 检查是否登录
+# 日志查看每页行数选项
+LOG_WINDOW_OPTIONS = [100, 200, 500, 1000]
+
+def _set_log_start(key, line):
+    """按钮回调：设置日志窗口起始行（在控件创建前执行）"""
+    st.session_state[key] = max(1, line)
+
+def show_log_viewer(bug_id, log_path):
+    """分页查看日志：只读取当前窗口的行，支持跳到末尾和正则搜索"""
+    info = get_log_info(log_path)
+    total_lines = max(info['lines'], 1)
+    start_key = f"log_start_{bug_id}"
+    if st.session_state.get(start_key, 1) > total_lines:
+        st.session_state[start_key] = total_lines
+    if start_key not in st.session_state:
+        st.session_state[start_key] = 1
+
+    st.caption(f"共 {info['lines']:,} 行，{info['size'] / 1024:,.1f} KB")
+    col1, col2, col3, col4, col5, col6 = st.columns([1.2, 1, 1, 1, 1, 1])
+    with col1:
+        start = st.number_input("起始行", min_value=1, max_value=total_lines, step=1, key=start_key)
+    with col2:
+        window = st.selectbox("每页行数", LOG_WINDOW_OPTIONS, key=f"log_window_{bug_id}")
+    with col3:
+        st.button("⏮️ 开头", key=f"log_head_{bug_id}", on_click=_set_log_start, args=(start_key, 1),
+                  use_container_width=True)
+    with col4:
+        st.button("⬆️ 上一页", key=f"log_prev_{bug_id}", on_click=_set_log_start,
+                  args=(start_key, start - window), use_container_width=True)
+    with col5:
+        st.button("⬇️ 下一页", key=f"log_next_{bug_id}", on_click=_set_log_start,
+                  args=(start_key, min(start + window, total_lines)), use_container_width=True)
+    with col6:
+        st.button("⏭️ 末尾", key=f"log_tail_{bug_id}", on_click=_set_log_start,
+                  args=(start_key, total_lines - window + 1), use_container_width=True)
+
+    first, lines = read_lines(log_path, start - 1, window)
+    st.code('\n'.join(lines), language='text')
+    if lines:
+        st.caption(f"第 {first + 1:,} - {first + len(lines):,} 行")
+
+    # 正则搜索
+    col1, col2 = st.columns([4, 1])
+    with col1:
+        pattern = st.text_input("🔎 搜索日志（正则表达式）", key=f"log_search_{bug_id}")
+    with col2:
+        ignore_case = st.checkbox("忽略大小写", value=True, key=f"log_search_case_{bug_id}")
+    if pattern:
+        try:
+            matches = search_log(log_path, pattern, ignore_case=ignore_case)
+        except ValueError as e:
+            st.error(f"❌ {e}")
+            matches = None
+        if matches:
+            suffix = "（仅显示前 %d 处）" % MAX_SEARCH_RESULTS if len(matches) >= MAX_SEARCH_RESULTS else ""
+            st.caption(f"找到 {len(matches)} 行匹配{suffix}")
+            st.code('\n'.join(f"{line + 1:>8}: {text}" for line, text in matches), language='text')
+            col1, col2 = st.columns([4, 1])
+            with col1:
+                target = st.selectbox("跳转到匹配行", [line + 1 for line, _ in matches],
+                                      key=f"log_match_{bug_id}")
+            with col2:
+                st.button("↪️ 跳转", key=f"log_goto_{bug_id}", on_click=_set_log_start,
+                          args=(start_key, target - window // 2), use_container_width=True)
+        elif matches is not None:
+            st.info("未找到匹配的行")
+
+def show_log_download(bug_id, log_path):
+    """日志下载按钮：点击时才读取文件，大日志按行拆成多段下载"""
+    parts = download_parts(log_path)
+    file_name = strip_codec_suffix(os.path.basename(log_path))
+    if parts is None:
+        st.caption("💡 压缩存储的日志请先打开“查看日志内容”，解压后即可下载")
+        return
+    if len(parts) == 1:
+        st.download_button(
+            label="💾 下载日志文件",
+            data=download_log(log_path),
+            file_name=file_name,
+            mime="text/plain",
+            key=f"log_download_{bug_id}"
+        )
+        return
+
+    st.caption(f"💾 日志较大，分为 {len(parts)} 段下载（每段不超过 {LOG_DOWNLOAD_PART_BYTES / 1024 / 1024:.0f} MB，"
+               "按顺序拼接即为完整日志）")
+    name, ext = os.path.splitext(file_name)
+    columns = st.columns(min(len(parts), 6))
+    for i, (start, end) in enumerate(parts):
+        with columns[i % len(columns)]:
+            st.download_button(
+                label=f"第 {i + 1} 段",
+                data=download_log(log_path, start, end),
+                file_name=f"{name}.part{i + 1:02d}{ext}",
+                mime="text/plain",
+                key=f"log_download_{bug_id}_{i}"
+            )
+
+def developer_options():
+    """研发人员下拉框的选项（研发人员ID，第一项为未分配）和显示名称函数"""
+    developers_by_id = get_developer_directory()['by_id']
+    options = [UNASSIGNED_ID] + list(developers_by_id)
+    def format_developer(dev_id):
+        return developers_by_id[dev_id]['name'] if dev_id in developers_by_id else "未分配"
+    return options, format_developer
+
+def _apply_bulk_update(bug_ids):
+    """批量操作按钮回调：在本次重跑渲染列表之前完成写入，列表直接显示新数据，无需再次 st.rerun()"""
+    status = st.session_state.get('bug_bulk_status')
+    assignee_id = st.session_state.get('bug_bulk_assignee')
+    if status is None and assignee_id is None:
+        st.session_state.bug_bulk_result = ('warning', "⚠️ 请选择要修改的状态或研发人员")
+        return
+    # 回调在脚本重跑之前执行，此时尚未切换到会话所选的项目
+    with use_project(st.session_state.get('project', DEFAULT_PROJECT)):
+        try:
+            results = bulk_update_bugs(bug_ids, status=status, assignee_id=assignee_id)
+        except ValueError as e:
+            st.session_state.bug_bulk_result = ('error', f"❌ 批量修改失败: {e}")
+            return
+    missing = [f"#{bug_id}" for bug_id, updated in results.items() if not updated]
+    message = f"✅ 已更新 {len(results) - len(missing)} 个BUG"
+    if missing:
+        st.session_state.bug_bulk_result = ('warning', f"{message}，以下BUG不存在: {', '.join(missing)}")
+    else:
+        st.session_state.bug_bulk_result = ('success', message)
+
+def show_screenshot(bug_id, path):
+    """列表中只显示缩略图，打开开关后才加载预览图，原图仅在下载时读取"""
+    thumb = get_derivative(path, 'thumb')
+    if thumb:
+        st.image(thumb, caption="📸 问题截图")
+    else:
+        st.caption("📸 问题截图（缩略图生成中）")
+    if st.toggle("🔍 查看大图", key=f"screenshot_view_{bug_id}"):
+        st.image(get_derivative(path, 'preview') or path, use_container_width=True)
+        st.download_button(
+            label="💾 下载原图",
+            data=download_original(path),
+            file_name=os.path.basename(path),
+            key=f"screenshot_download_{bug_id}"
+        )
+
+# 检查是否登录：凭会话令牌取用户信息（缓存命中时不访问数据库）；
+# 刷新页面后 session_state 为空，从 URL 查询参数中恢复令牌（BUG_SESSION_IN_URL=0 时不恢复）
+token = st.session_state.session_token or (st.query_params.get(SESSION_QUERY_PARAM) if SESSION_IN_URL else None)
+st.session_state.user = get_session_user(token)
+st.session_state.is_authenticated = st.session_state.user is not None
+st.session_state.session_token = token if st.session_state.is_authenticated else None
 if not st.session_state.is_authenticated:
+    st.query_params.pop(SESSION_QUERY_PARAM, None)
     show_login_page()
     st.stop()
 
 # 已登录用户的主界面
 current_user = st.session_state.user
 user_role = current_user['role']
+# 当前用户的全部权限，本次重跑中的权限判断都只是集合查找
+capabilities = get_capabilities(user_role)
 
 # 侧边栏图标导航
 st.sidebar.title("🐛 BUG管理系统")
@@ -110,30 +287,58 @@ with st.sidebar:
 if st.sidebar.button("😪 退出登录", use_container_width=True):
     logout()
 
+# 项目切换：每个项目一个数据库文件，本次重跑中的数据库函数都访问所选项目
+projects = list_projects()
+project_names = {project['key']: project['name'] for project in projects}
+# 新建项目后切换过去（选择框创建之后不能再修改它的值，所以在下一次重跑开始时设置）
+if 'pending_project' in st.session_state:
+    st.session_state.project = st.session_state.pop('pending_project')
+if st.session_state.get('project') not in project_names:
+    st.session_state.project = DEFAULT_PROJECT
+if len(projects) > 1:
+    st.sidebar.selectbox("🗂️ 项目", list(project_names), format_func=project_names.get, key='project')
+set_current_project(st.session_state.project)
+
+if 'manage_projects' in capabilities:
+    with st.sidebar.expander("➕ 新建项目"):
+        with st.form("create_project_form", clear_on_submit=True):
+            new_project_key = st.text_input("项目标识", placeholder="例如 mobile（小写字母、数字、-、_）")
+            new_project_name = st.text_input("项目名称", placeholder="例如 移动端")
+            if st.form_submit_button("创建", use_container_width=True):
+                try:
+                    create_project(new_project_key, new_project_name)
+                except ValueError as e:
+                    st.error(f"❌ {e}")
+                else:
+                    st.session_state.pending_project = new_project_key
+                    st.rerun()
+
 st.sidebar.markdown("---")
 
 # 导航按钮配置（根据权限过滤）
 nav_config = []
 
 # 所有用户都可以查看统计
-if check_permission(user_role, 'view_stats'):
+if 'view_stats' in capabilities:
     nav_config.append({"key": "stats", "label": "📊 统计", "icon": "📊"})
 
 # 所有用户都可以查看列表
-if check_permission(user_role, 'view_bugs'):
+if 'view_bugs' in capabilities:
     nav_config.append({"key": "list", "label": "📋 BUG列表", "icon": "📋"})
 
 # 只有有创建BUG权限的用户才能提交
-if check_permission(user_role, 'create_bug'):
+if 'create_bug' in capabilities:
     nav_config.append({"key": "submit", "label": "📝 提交BUG", "icon": "📝"})
 
 # 只有管理员和项目经理才能管理研发人员
-if check_permission(user_role, 'manage_developers'):
+if 'manage_developers' in capabilities:
     nav_config.append({"key": "developers", "label": "👨‍💻 研发管理", "icon": "👨‍💻"})
 
-# 只有管理员才能管理用户
-if user_role == 'admin':
+# 只有管理员才能管理用户和查看性能监控
+if 'manage_users' in capabilities:
     nav_config.append({"key": "users", "label": "👥 用户管理", "icon": "👥"})
+if 'view_metrics' in capabilities:
+    nav_config.append({"key": "metrics", "label": "⏱️ 性能监控", "icon": "⏱️"})
 
 # 当前选中状态
 selected_page = st.session_state.current_page
@@ -150,11 +355,11 @@ st.sidebar.markdown("---")
 st.sidebar.caption("点击左侧按钮切换功能")
 
 # 创建文件存储目录
-if not os.path.exists('uploads'):
-    os.makedirs('uploads')
+if not os.path.exists(UPLOAD_DIR):
+    os.makedirs(UPLOAD_DIR)
 
 # 根据页面和权限显示内容
-if selected_page == "submit" and check_permission(user_role, 'create_bug'):
+if selected_page == "submit" and 'create_bug' in capabilities:
     st.title("📝 提交新的BUG")
     
     # 提交表单
@@ -178,15 +383,14 @@ if selected_page == "submit" and check_permission(user_role, 'create_bug'):
         
         bug_description = st.text_area("📄 BUG描述", help="详细描述问题现象", height=150)
         
-        # 动态加载研发人员列表
-        developers, _ = get_developers()
-        developer_names = ["未分配"] + [dev['name'] for dev in developers]
+        # 动态加载研发人员列表（选项为研发人员ID）
+        developer_ids, format_developer = developer_options()
         
         col1, col2 = st.columns(2)
         with col1:
             status = st.selectbox("🏷️ 初始状态", ["待处理", "紧急", "一般", "低优先级"], index=0)
         with col2:
-            assignee = st.selectbox("👨‍💻 分配研发人员", developer_names, index=0)
+            assignee_id = st.selectbox("👨‍💻 分配研发人员", developer_ids, index=0, format_func=format_developer)
         
         col1, col2 = st.columns(2)
         with col1:
@@ -202,33 +406,30 @@ if selected_page == "submit" and check_permission(user_role, 'create_bug'):
         if not submitter or not bug_title or not bug_description or not version or not region:
             st.error("❌ 请填写所有必填字段（提交人姓名、标题、描述、版本信息、供货地区）")
         else:
-            # 保存文件
+            # 保存文件（分块写入并按内容去重存储，相同文件只保存一份）
             screenshot_path = None
             log_file_path = None
-            timestamp = int(time.time())
-            
-            if screenshot:
-                safe_filename = "".join(c for c in screenshot.name if c.isalnum() or c in (' ', '-', '_', '.')).rstrip()
-                screenshot_path = os.path.join('uploads', f"screenshot_{timestamp}_{safe_filename}")
-                with open(screenshot_path, 'wb') as f:
-                    f.write(screenshot.getbuffer())
-                st.success("✅ 截图已保存")
             
-            if log_file:
-                safe_filename = "".join(c for c in log_file.name if c.isalnum() or c in (' ', '-', '_', '.')).rstrip()
-                log_file_path = os.path.join('uploads', f"log_{timestamp}_{safe_filename}")
-                with open(log_file_path, 'wb') as f:
-                    f.write(log_file.getbuffer())
-                st.success("✅ 日志文件已保存")
+            try:
+                if screenshot:
+                    screenshot_path = store_screenshot(screenshot, screenshot.name)
+                    st.success("✅ 截图已保存")
+                
+                if log_file:
+                    log_file_path = store_log(log_file, log_file.name)
+                    st.success("✅ 日志文件已保存")
+            except AttachmentTooLarge as e:
+                st.error(f"❌ {e}")
+                st.stop()
 
             # 插入BUG记录（使用动态研发人员列表）
             bug_id = create_bug(bug_title, bug_description, version, region, submitter, 
-                              assignee if assignee != "未分配" else None, status, 
-                              screenshot_path, log_file_path)
+                              status=status, screenshot=screenshot_path, log_file=log_file_path,
+                              assignee_id=assignee_id)
             
             # 成功提示 - 模态对话框效果
             st.balloons()
-            st.success(f"🎉 BUG提交成功！ID: #{bug_id} (状态: {status}, 分配: {assignee})")
+            st.success(f"🎉 BUG提交成功！ID: #{bug_id} (状态: {status}, 分配: {format_developer(assignee_id)})")
             
             # 模态确认对话框（表单外部）
             st.markdown("---")
@@ -242,7 +443,7 @@ if selected_page == "submit" and check_permission(user_role, 'create_bug'):
             # 提示用户可以继续提交或查看列表
             st.info("💡 您可以继续提交新的BUG，或者点击左侧导航按钮查看已提交的BUG列表")
 
-elif selected_page == "developers" and check_permission(user_role, 'manage_developers'):
+elif selected_page == "developers" and 'manage_developers' in capabilities:
     st.title("👨‍💻 研发人员管理")
     
     # 研发人员管理选项卡
@@ -347,15 +548,14 @@ elif selected_page == "developers" and check_permission(user_role, 'manage_devel
         st.subheader("🔧 编辑研发人员")
         
         # 获取所有研发人员用于选择
-        all_developers, _ = get_developers()
+        all_developers = get_developer_directory()['by_id']
         
         if all_developers:
-            selected_id = st.selectbox("选择要编辑的人员", 
-                                     [f"ID: {dev['id']} - {dev['name']} ({dev['role']})" for dev in all_developers])
+            dev_id = st.selectbox("选择要编辑的人员", list(all_developers),
+                                  format_func=lambda dev_id: f"ID: {dev_id} - {all_developers[dev_id]['name']} ({all_developers[dev_id]['role']})")
             
-            if selected_id:
-                dev_id = int(selected_id.split(" - ")[0].replace("ID: ", ""))
-                dev = get_developer_by_id(dev_id)
+            if dev_id:
+                dev = all_developers[dev_id]
                 
                 if dev:
                     with st.form("edit_developer_form"):
@@ -405,7 +605,7 @@ elif selected_page == "developers" and check_permission(user_role, 'manage_devel
             st.info("📭 暂无研发人员")
             st.caption("💡 请先添加研发人员")
 
-elif selected_page == "stats" and check_permission(user_role, 'view_stats'):
+elif selected_page == "stats" and 'view_stats' in capabilities:
     st.subheader("📊 BUG数据分析与可视化")
     
     # 获取增强统计数据
@@ -449,9 +649,7 @@ elif selected_page == "stats" and check_permission(user_role, 'view_stats'):
         submitter_data = []
         for submitter, count in stats['submitter_stats'].items():
             # 计算每个提交人的解决率
-            cursor = get_connection().cursor()
-            cursor.execute('SELECT COUNT(*) FROM bugs WHERE submitter = ? AND status = "已解决"', (submitter,))
-            resolved_count = cursor.fetchone()[0]
+            resolved_count = stats['submitter_resolved'].get(submitter, 0)
             resolve_rate = resolved_count / count * 100 if count > 0 else 0
             
             submitter_data.append({
@@ -498,334 +696,447 @@ elif selected_page == "stats" and check_permission(user_role, 'view_stats'):
     
     with col2:
         # 紧急BUG数量
-        cursor = get_connection().cursor()
-        cursor.execute('SELECT COUNT(*) FROM bugs WHERE status = "紧急"')
-        urgent_bugs = cursor.fetchone()[0]
-        st.metric("紧急BUG数量", urgent_bugs)
+        st.metric("紧急BUG数量", stats['urgent'])
     
     with col3:
         # 超期未解决
-        cursor = get_connection().cursor()
-        cursor.execute('SELECT COUNT(*) FROM bugs WHERE status != "已解决" AND created_at < datetime("now", "-7 days")')
-        overdue_bugs = cursor.fetchone()[0]
-        st.metric("超期未解决", overdue_bugs)
+        st.metric("超期未解决", stats['overdue'])
+
+    # 多个项目时显示各项目概况（并行读取各项目的统计汇总表）
+    if len(projects) > 1:
+        st.markdown("---")
+        st.subheader("🗂️ 全部项目概况")
+        cross_stats = get_cross_project_stats()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("📈 全部BUG", cross_stats['total']['total'])
+        col2.metric("📅 本月新增", cross_stats['total']['monthly'])
+        col3.metric("✅ 已解决", cross_stats['total']['resolved'])
+        col4.metric("⚠️ 超期未解决", cross_stats['total']['overdue'])
+        st.dataframe(pd.DataFrame([{
+            '项目': row['name'],
+            '总BUG数': row['total'],
+            '本月新增': row['monthly'],
+            '已解决': row['resolved'],
+            '紧急': row['urgent'],
+            '超期未解决': row['overdue'],
+        } for row in cross_stats['projects']]), hide_index=True, use_container_width=True)
 
-elif selected_page == "list" and check_permission(user_role, 'view_bugs'):
+elif selected_page == "list" and 'view_bugs' in capabilities:
     st.subheader("📋 BUG列表")
-    bugs = get_user_bugs()
-    
+
+    # 全文搜索（标题、描述和日志内容），结果按相关度排序
+    search_query = st.text_input("🔎 搜索", placeholder="输入关键词搜索标题、描述和日志内容，多个词用空格分隔",
+                                 key="bug_search").strip()
+
+    # 过滤条件
+    with st.expander("🔍 筛选条件", expanded=False):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            filter_bug_status = st.selectbox("🏷️ 状态", ["所有", "待处理", "紧急", "一般", "低优先级", "已解决"], index=0)
+        with col2:
+            filter_assignee = st.selectbox("👨‍💻 分配研发人员", ["所有", "未分配"] + list(get_developer_directory()['by_name']), index=0)
+        with col3:
+            filter_submitter = st.text_input("👤 提交人", placeholder="精确匹配提交人姓名")
+
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            filter_version = st.text_input("🔢 版本", placeholder="例如：v1.0.0")
+        with col2:
+            filter_region = st.text_input("🌍 地区", placeholder="例如：中国")
+        with col3:
+            filter_date_from = st.date_input("📅 开始日期", value=None)
+        with col4:
+            filter_date_to = st.date_input("📅 结束日期", value=None)
+
+    bug_filters = {
+        'status': filter_bug_status,
+        'assignee': filter_assignee,
+        'submitter': filter_submitter.strip() or None,
+        'version': filter_version.strip() or None,
+        'region': filter_region.strip() or None,
+        'date_from': filter_date_from,
+        'date_to': filter_date_to,
+    }
+
+    # 过滤条件、搜索词或项目变化时回到第一页；bug_list_cursors 保存已访问页的起始游标
+    # （搜索时为页码）
+    if st.session_state.get('bug_list_filters') != (bug_filters, search_query, st.session_state.project):
+        st.session_state.bug_list_filters = (bug_filters, search_query, st.session_state.project)
+        st.session_state.bug_list_cursors = [None]
+
+    list_page_size = st.selectbox("每页显示", [10, 20, 50, 100], index=1, key="bug_list_page_size")
+    if st.session_state.get('bug_list_last_page_size') != list_page_size:
+        st.session_state.bug_list_last_page_size = list_page_size
+        st.session_state.bug_list_cursors = [None]
+
+    page_cursors = st.session_state.bug_list_cursors
+    if search_query:
+        search_page = page_cursors[-1] or 1
+        bugs, search_total = search_bugs(search_query, page=search_page, page_size=list_page_size, **bug_filters)
+        next_cursor = search_page + 1 if search_page * list_page_size < search_total else None
+    else:
+        bugs, next_cursor = get_bugs_page(**bug_filters, cursor=page_cursors[-1], page_size=list_page_size)
+
     if not bugs:
-        st.info("📭 暂无BUG记录")
-        st.caption("💡 快去提交第一个BUG吧！")
+        if search_query:
+            st.info("📭 没有找到匹配的BUG")
+        else:
+            st.info("📭 暂无BUG记录")
+            st.caption("💡 快去提交第一个BUG吧！")
     else:
-        # 显示BUG统计信息和导出功能
+        # 显示分页信息和导出功能
         col1, col2 = st.columns([3, 1])
         with col1:
-            st.caption(f"📊 总计 {len(bugs)} 个BUG记录")
+            if search_query:
+                more = "+" if search_total >= SEARCH_MAX_CANDIDATES else ""
+                st.caption(f"🔎 找到 {search_total}{more} 个匹配的BUG，第 {len(page_cursors)} 页，本页 {len(bugs)} 个")
+                if more:
+                    st.caption(f"💡 匹配过多，只在最新的 {SEARCH_MAX_CANDIDATES} 条匹配中按相关度排序，"
+                               "更早的BUG可能未列出，可增加搜索词或筛选条件缩小范围")
+            else:
+                st.caption(f"📊 第 {len(page_cursors)} 页，本页 {len(bugs)} 个BUG记录")
         with col2:
-            # Excel导出功能
-            if st.button("📊 导出Excel", key="export_excel", use_container_width=True):
-                # 获取所有BUG详细数据
-                export_data = []
-                for bug in bugs:
-                    details = get_bug_details(bug['id'])
-                    if details:
-                        export_data.append({
-                            'ID': details['id'],
-                            '标题': details['title'],
-                            '提交人': details['submitter'],
-                            '分配研发': details['assignee'],
-                            '版本': details['version'],
-                            '地区': details['region'],
-                            '状态': details['status'],
-                            '描述': details['description'][:100] + '...' if len(details['description']) > 100 else details['description'],
-                            '截图路径': details['screenshot'] or '',
-                            '日志路径': details['log_file'] or '',
-                            '创建时间': details['created_at'],
-                            '解决时间': details['resolved_at'] or ''
-                        })
+            # 导出功能（流式导出当前筛选条件下的全部BUG）
+            export_format = st.selectbox("导出格式", list(EXPORT_FORMATS.keys()), index=0,
+                                         key="export_format", label_visibility="collapsed")
+            if st.button("📊 导出数据", key="export_excel", use_container_width=True):
+                # 清理上一次导出的临时文件
+                previous_export = st.session_state.pop('export_file', None)
+                if previous_export:
+                    discard_export(previous_export)
                 
-                if export_data:
-                    # 创建DataFrame
-                    df = pd.DataFrame(export_data)
-                    
-                    # 生成Excel文件
-                    output = BytesIO()
-                    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                        df.to_excel(writer, sheet_name='BUG记录', index=False)
-                        worksheet = writer.sheets['BUG记录']
-                        # 设置列宽
-                        for column in worksheet.columns:
-                            max_length = 0
-                            column_letter = column[0].column_letter
-                            for cell in column:
-                                try:
-                                    if len(str(cell.value)) > max_length:
-                                        max_length = len(str(cell.value))
-                                except:
-                                    pass
-                            adjusted_width = min(max_length + 2, 50)
-                            worksheet.column_dimensions[column_letter].width = adjusted_width
-                    
-                    # 设置Excel文件名
+                export_path, export_count = export_bugs_to_tempfile(export_format, **bug_filters)
+                st.session_state.export_file = export_path
+                
+                if export_count:
+                    # 设置导出文件名
                     timestamp = int(time.time())
-                    filename = f"BUG管理系统_{timestamp}.xlsx"
+                    filename = f"BUG管理系统_{timestamp}{EXPORT_FORMATS[export_format]['suffix']}"
                     
-                    # 提供下载
+                    # 提供下载（点击时才读取文件；下载不触发重跑，按钮保留在页面上）
                     st.download_button(
-                        label="💾 下载Excel文件",
-                        data=output.getvalue(),
+                        label="💾 下载导出文件",
+                        data=download_export(export_path),
                         file_name=filename,
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                        mime=EXPORT_FORMATS[export_format]['mime'],
+                        on_click="ignore",
                         use_container_width=True
                     )
-                    st.success(f"✅ Excel文件已准备好下载！包含 {len(export_data)} 条BUG记录")
+                    st.success(f"✅ 导出文件已准备好下载！包含 {export_count} 条BUG记录")
                 else:
+                    discard_export(export_path)
                     st.warning("⚠️ 暂无数据可导出")
         
-        # 创建卡片式布局
-        for bug in bugs:
-            with st.expander(f"🔍 {bug['title']} - v{bug['version']} ({bug['region']}) [{bug['status']}]", expanded=False):
-                # 基本信息 - 卡片布局
-                info_container = st.container()
-                with info_container:
-                    col1, col2, col3, col4, col5 = st.columns([1.2, 1, 1, 1, 1])
-                    with col1:
-                        st.write(f"👤 **提交人:** {bug['submitter']}")
-                    with col2:
-                        st.write(f"🔢 **版本:** {bug['version']}")
-                    with col3:
-                        st.write(f"🌍 **地区:** {bug['region']}")
-                    with col4:
-                        st.write(f"🏷️ **状态:** {bug['status']}")
-                    with col5:
-                        st.write(f"📅 **时间:** {bug['created_at'][:10]}")
+        # 本页每个BUG当前用户能否编辑（一次算出，表格、批量操作和详情面板共用）
+        editable = editable_bug_mask(current_user, [bug['submitter'] for bug in bugs], capabilities)
+        
+        # 紧凑表格：本页BUG的摘要字段来自列表查询本身，只为选中的BUG渲染详情和操作面板
+        bug_table = pd.DataFrame({
+            'ID': [bug['id'] for bug in bugs],
+            '标题': [bug['title'] for bug in bugs],
+            '状态': [bug['status'] for bug in bugs],
+            '版本': [bug['version'] for bug in bugs],
+            '地区': [bug['region'] for bug in bugs],
+            '提交人': [bug['submitter'] for bug in bugs],
+            '分配研发人员': [bug['assignee'] for bug in bugs],
+            '提交时间': [bug['created_at'][:16] for bug in bugs],
+            '可编辑': editable,
+        })
+        # 表格的 key 随本页BUG集合变化，翻页、筛选或删除后不会沿用旧的选中行
+        table_event = st.dataframe(
+            bug_table,
+            hide_index=True,
+            use_container_width=True,
+            on_select="rerun",
+            selection_mode="multi-row",
+            key=f"bug_list_table_{hash(tuple(bug['id'] for bug in bugs))}"
+        )
+        selected_rows = table_event.selection.rows
+
+        # 上一次批量操作的结果
+        bulk_result = st.session_state.pop('bug_bulk_result', None)
+        if bulk_result:
+            level, message = bulk_result
+            getattr(st, level)(message)
+
+        if not selected_rows:
+            st.caption("👆 选中表格中的一行查看详情和操作，选中多行可批量修改状态和分配")
+        elif len(selected_rows) > 1:
+            # 批量操作：一个事务更新全部选中的、当前用户可编辑的BUG
+            editable_ids = [bugs[row]['id'] for row in selected_rows if editable[row]]
+            st.markdown(f"#### 🗂️ 批量操作（已选 {len(selected_rows)} 个BUG）")
+            if editable_ids:
+                if len(editable_ids) < len(selected_rows):
+                    st.caption(f"ℹ️ 其中 {len(selected_rows) - len(editable_ids)} 个BUG没有编辑权限，批量修改时将跳过")
+                developer_ids, format_developer = developer_options()
+                col1, col2, col3 = st.columns([1, 1, 1])
+                with col1:
+                    st.selectbox("🏷️ 状态", [None, "待处理", "紧急", "一般", "低优先级", "已解决"],
+                                 format_func=lambda value: "不修改" if value is None else value,
+                                 key="bug_bulk_status")
+                with col2:
+                    st.selectbox("👨‍💻 分配研发人员", [None] + developer_ids,
+                                 format_func=lambda value: "不修改" if value is None else format_developer(value),
+                                 key="bug_bulk_assignee")
+                with col3:
+                    st.write("")
+                    st.button("✅ 应用到选中的BUG", key="bug_bulk_apply", on_click=_apply_bulk_update,
+                              args=(editable_ids,), type="primary", use_container_width=True)
+            else:
+                st.warning("⚠️ 没有修改选中BUG的权限，请只选中一行查看详情")
+        else:
+            bug = bugs[selected_rows[0]]
+            can_edit = bool(editable[selected_rows[0]])
+            st.markdown(f"#### 🔍 #{bug['id']} {bug['title']}")
+            # 基本信息 - 卡片布局
+            info_container = st.container()
+            with info_container:
+                col1, col2, col3, col4, col5 = st.columns([1.2, 1, 1, 1, 1])
+                with col1:
+                    st.write(f"👤 **提交人:** {bug['submitter']}")
+                with col2:
+                    st.write(f"🔢 **版本:** {bug['version']}")
+                with col3:
+                    st.write(f"🌍 **地区:** {bug['region']}")
+                with col4:
+                    st.write(f"🏷️ **状态:** {bug['status']}")
+                with col5:
+                    st.write(f"📅 **时间:** {bug['created_at'][:10]}")
+            
+            # 搜索命中位置
+            if search_query:
+                st.markdown(f"🔎 **标题:** {bug['title_highlight']}")
+                if bug['description_snippet']:
+                    st.markdown(f"🔎 **描述:** {bug['description_snippet']}")
+                if bug['log_snippet']:
+                    st.markdown(f"🔎 **日志:** {bug['log_snippet']}")
+            
+            # 获取详细报告
+            details = get_bug_details_many([bug['id']]).get(bug['id'])
+            if details:
+                st.write("**📄 问题描述:**")
+                st.write(details['description'])
                 
-                # 获取详细报告
-                details = get_bug_details(bug['id'])
-                if details:
-                    st.write("**📄 问题描述:**")
-                    st.write(details['description'])
-                    
-                    # 分配信息
-                    if details['assignee'] != '未分配':
-                        st.write(f"👨‍💻 **分配研发人员:** {details['assignee']}")
-                    else:
-                        st.warning("⚠️ 该BUG尚未分配研发人员")
-                    
-                    # 显示附件
-                    if details['screenshot']:
-                        st.image(details['screenshot'], caption="📸 问题截图", use_container_width=True)
-                    
-                    if details['log_file']:
-                        try:
-                            with open(details['log_file'], 'r', encoding='utf-8') as f:
-                                log_content = f.read()
-                                with st.expander("📋 查看日志内容", expanded=False):
-                                    st.code(log_content, language='text')
-                            st.download_button(
-                                label="💾 下载日志文件",
-                                data=open(details['log_file'], 'rb').read(),
-                                file_name=os.path.basename(details['log_file']),
-                                mime="text/plain"
+                # 分配信息
+                if details['assignee'] != '未分配':
+                    st.write(f"👨‍💻 **分配研发人员:** {details['assignee']}")
+                else:
+                    st.warning("⚠️ 该BUG尚未分配研发人员")
+                
+                # 显示附件
+                if details['screenshot']:
+                    show_screenshot(bug['id'], details['screenshot'])
+                
+                if details['log_file']:
+                    try:
+                        # 打开开关后才读取日志，只读当前窗口的行
+                        if st.toggle("📋 查看日志内容", key=f"log_view_{bug['id']}"):
+                            show_log_viewer(bug['id'], details['log_file'])
+                        show_log_download(bug['id'], details['log_file'])
+                    except Exception as e:
+                        st.error(f"❌ 无法读取日志文件: {e}")
+                
+                # 初始化会话状态
+                if f"reassign_mode_{bug['id']}" not in st.session_state:
+                    st.session_state[f"reassign_mode_{bug['id']}"] = False
+                if f"edit_mode_{bug['id']}" not in st.session_state:
+                    st.session_state[f"edit_mode_{bug['id']}"] = False
+                
+                # 删除权限（只有管理员和项目经理可以删除）；编辑权限 can_edit 已按本页一次算出
+                can_delete = 'delete_bug' in capabilities
+                
+                # 编辑模式
+                if st.session_state[f"edit_mode_{bug['id']}"]:
+                    st.markdown("### 📝 编辑BUG")
+                    with st.form(f"edit_bug_form_{bug['id']}"):
+                        col1, col2 = st.columns(2)
+                        with col1:
+                            edit_title = st.text_input("📌 标题", value=details['title'])
+                        with col2:
+                            edit_version = st.text_input("🔢 版本", value=details['version'])
+                        
+                        col1, col2 = st.columns(2)
+                        with col1:
+                            edit_region = st.text_input("🌍 地区", value=details['region'])
+                        with col2:
+                            edit_status = st.selectbox("🏷️ 状态", 
+                                                      ["待处理", "紧急", "一般", "低优先级", "已解决"],
+                                                      index=["待处理", "紧急", "一般", "低优先级", "已解决"].index(details['status']) if details['status'] in ["待处理", "紧急", "一般", "低优先级", "已解决"] else 0)
+                        
+                        edit_description = st.text_area("📄 描述", value=details['description'], height=100)
+                        
+                        # 研发人员分配
+                        developer_ids, format_developer = developer_options()
+                        current_assignee = details['assignee_id'] or UNASSIGNED_ID
+                        assignee_index = developer_ids.index(current_assignee) if current_assignee in developer_ids else 0
+                        edit_assignee_id = st.selectbox("👨‍🗺 分配研发人员", developer_ids, index=assignee_index,
+                                                        format_func=format_developer)
+                        
+                        # 表单按钮
+                        col1, col2 = st.columns(2)
+                        with col1:
+                            update_submitted = st.form_submit_button("💾 保存更新", use_container_width=True, type="primary")
+                        with col2:
+                            cancel_edit = st.form_submit_button("❌ 取消编辑", use_container_width=True)
+                        
+                        if update_submitted:
+                            # 更新BUG
+                            success = update_bug(
+                                bug['id'],
+                                title=edit_title,
+                                description=edit_description,
+                                version=edit_version,
+                                region=edit_region,
+                                status=edit_status,
+                                assignee_id=edit_assignee_id
                             )
-                        except Exception as e:
-                            st.error(f"❌ 无法读取日志文件: {e}")
+                            
+                            if success:
+                                st.success(f"✅ BUG #{bug['id']} 更新成功！")
+                                st.session_state[f"edit_mode_{bug['id']}"] = False
+                                time.sleep(1)
+                                st.rerun()
+                            else:
+                                st.error(f"❌ 更新BUG #{bug['id']} 失败")
+                        
+                        if cancel_edit:
+                            st.session_state[f"edit_mode_{bug['id']}"] = False
+                            st.rerun()
+                
+                else:
+                    # 正常显示模式 - 状态操作按钮
+                    button_cols = []
                     
-                    # 初始化会话状态
-                    if f"reassign_mode_{bug['id']}" not in st.session_state:
-                        st.session_state[f"reassign_mode_{bug['id']}"] = False
-                    if f"edit_mode_{bug['id']}" not in st.session_state:
-                        st.session_state[f"edit_mode_{bug['id']}"] = False
+                    # 标记为已解决按钮
+                    if details['status'] != '已解决':
+                        button_cols.append('resolve')
                     
-                    # 检查编辑权限（只有管理员、项目经理和提交人可以编辑）
-                    can_edit = (
-                        user_role == 'admin' or 
-                        user_role == 'pm' or 
-                        check_permission(user_role, 'edit_bug') or
-                        (check_permission(user_role, 'edit_own_bug') and details['submitter'] == (current_user.get('real_name') or current_user.get('username', '')))
-                    )
+                    # 重新分配按钮
+                    if 'edit_bug' in capabilities:
+                        button_cols.append('reassign')
                     
-                    # 检查删除权限（只有管理员和项目经理可以删除）
-                    can_delete = user_role == 'admin' or user_role == 'pm' or check_permission(user_role, 'delete_bug')
+                    # 编辑按钮
+                    if can_edit:
+                        button_cols.append('edit')
                     
-                    # 编辑模式
-                    if st.session_state[f"edit_mode_{bug['id']}"]:
-                        st.markdown("### 📝 编辑BUG")
-                        with st.form(f"edit_bug_form_{bug['id']}"):
-                            col1, col2 = st.columns(2)
-                            with col1:
-                                edit_title = st.text_input("📌 标题", value=details['title'])
-                            with col2:
-                                edit_version = st.text_input("🔢 版本", value=details['version'])
-                            
-                            col1, col2 = st.columns(2)
-                            with col1:
-                                edit_region = st.text_input("🌍 地区", value=details['region'])
-                            with col2:
-                                edit_status = st.selectbox("🏷️ 状态", 
-                                                          ["待处理", "紧急", "一般", "低优先级", "已解决"],
-                                                          index=["待处理", "紧急", "一般", "低优先级", "已解决"].index(details['status']) if details['status'] in ["待处理", "紧急", "一般", "低优先级", "已解决"] else 0)
-                            
-                            edit_description = st.text_area("📄 描述", value=details['description'], height=100)
-                            
-                            # 研发人员分配
-                            developers, _ = get_developers()
-                            developer_names = ["未分配"] + [dev['name'] for dev in developers]
-                            current_assignee = details.get('assignee', '未分配')
-                            assignee_index = developer_names.index(current_assignee) if current_assignee in developer_names else 0
-                            edit_assignee = st.selectbox("👨‍🗺 分配研发人员", developer_names, index=assignee_index)
-                            
-                            # 表单按钮
-                            col1, col2 = st.columns(2)
-                            with col1:
-                                update_submitted = st.form_submit_button("💾 保存更新", use_container_width=True, type="primary")
-                            with col2:
-                                cancel_edit = st.form_submit_button("❌ 取消编辑", use_container_width=True)
-                            
-                            if update_submitted:
-                                # 更新BUG
-                                success = update_bug(
-                                    bug['id'],
-                                    title=edit_title,
-                                    description=edit_description,
-                                    version=edit_version,
-                                    region=edit_region,
-                                    status=edit_status,
-                                    assignee_name=edit_assignee if edit_assignee != "未分配" else None
-                                )
-                                
-                                if success:
-                                    st.success(f"✅ BUG #{bug['id']} 更新成功！")
-                                    st.session_state[f"edit_mode_{bug['id']}"] = False
-                                    time.sleep(1)
-                                    st.rerun()
-                                else:
-                                    st.error(f"❌ 更新BUG #{bug['id']} 失败")
-                            
-                            if cancel_edit:
-                                st.session_state[f"edit_mode_{bug['id']}"] = False
-                                st.rerun()
+                    # 删除按钮
+                    if can_delete:
+                        button_cols.append('delete')
                     
-                    else:
-                        # 正常显示模式 - 状态操作按钮
-                        button_cols = []
+                    # 创建按钮布局
+                    if button_cols:
+                        cols = st.columns(len(button_cols))
                         
-                        # 标记为已解决按钮
-                        if details['status'] != '已解决':
-                            button_cols.append('resolve')
+                        col_idx = 0
                         
-                        # 重新分配按钮
-                        if check_permission(user_role, 'edit_bug') or user_role in ['admin', 'pm']:
-                            button_cols.append('reassign')
+                        # 标记为已解决
+                        if 'resolve' in button_cols:
+                            with cols[col_idx]:
+                                if st.button(f"✅ 标记为已解决 #{bug['id']}", key=f"resolve_{bug['id']}", use_container_width=True):
+                                    if update_bug_status(bug['id'], "已解决", assignee_id=details['assignee_id']):
+                                        st.success(f"🎉 BUG #{bug['id']} 已标记为已解决")
+                                        st.rerun()
+                                    else:
+                                        st.error(f"❌ 标记BUG #{bug['id']} 失败")
+                            col_idx += 1
+                        
+                        # 重新分配
+                        if 'reassign' in button_cols:
+                            with cols[col_idx]:
+                                if not st.session_state[f"reassign_mode_{bug['id']}"]:
+                                    if st.button(f"🔄 重新分配 #{bug['id']}", key=f"reassign_{bug['id']}", use_container_width=True):
+                                        st.session_state[f"reassign_mode_{bug['id']}"] = True
+                                        st.rerun()
+                            col_idx += 1
                         
                         # 编辑按钮
-                        if can_edit:
-                            button_cols.append('edit')
+                        if 'edit' in button_cols:
+                            with cols[col_idx]:
+                                if st.button(f"📝 编辑 #{bug['id']}", key=f"edit_{bug['id']}", use_container_width=True):
+                                    st.session_state[f"edit_mode_{bug['id']}"] = True
+                                    st.rerun()
+                            col_idx += 1
                         
                         # 删除按钮
-                        if can_delete:
-                            button_cols.append('delete')
-                        
-                        # 创建按钮布局
-                        if button_cols:
-                            cols = st.columns(len(button_cols))
-                            
-                            col_idx = 0
-                            
-                            # 标记为已解决
-                            if 'resolve' in button_cols:
-                                with cols[col_idx]:
-                                    if st.button(f"✅ 标记为已解决 #{bug['id']}", key=f"resolve_{bug['id']}", use_container_width=True):
-                                        if update_bug_status(bug['id'], "已解决", details.get('assignee', '未分配')):
-                                            st.success(f"🎉 BUG #{bug['id']} 已标记为已解决")
-                                            st.rerun()
-                                        else:
-                                            st.error(f"❌ 标记BUG #{bug['id']} 失败")
-                                col_idx += 1
-                            
-                            # 重新分配
-                            if 'reassign' in button_cols:
-                                with cols[col_idx]:
-                                    if not st.session_state[f"reassign_mode_{bug['id']}"]:
-                                        if st.button(f"🔄 重新分配 #{bug['id']}", key=f"reassign_{bug['id']}", use_container_width=True):
-                                            st.session_state[f"reassign_mode_{bug['id']}"] = True
-                                            st.rerun()
-                                col_idx += 1
-                            
-                            # 编辑按钮
-                            if 'edit' in button_cols:
-                                with cols[col_idx]:
-                                    if st.button(f"📝 编辑 #{bug['id']}", key=f"edit_{bug['id']}", use_container_width=True):
-                                        st.session_state[f"edit_mode_{bug['id']}"] = True
+                        if 'delete' in button_cols:
+                            with cols[col_idx]:
+                                if st.button(f"🗑️ 删除 #{bug['id']}", key=f"delete_{bug['id']}", use_container_width=True, type="secondary"):
+                                    # 删除确认
+                                    if f"confirm_delete_{bug['id']}" not in st.session_state:
+                                        st.session_state[f"confirm_delete_{bug['id']}"] = True
+                                        st.warning(f"⚠️ 确认删除BUG #{bug['id']}: {bug['title']}?")
                                         st.rerun()
-                                col_idx += 1
-                            
-                            # 删除按钮
-                            if 'delete' in button_cols:
-                                with cols[col_idx]:
-                                    if st.button(f"🗑️ 删除 #{bug['id']}", key=f"delete_{bug['id']}", use_container_width=True, type="secondary"):
-                                        # 删除确认
-                                        if f"confirm_delete_{bug['id']}" not in st.session_state:
-                                            st.session_state[f"confirm_delete_{bug['id']}"] = True
-                                            st.warning(f"⚠️ 确认删除BUG #{bug['id']}: {bug['title']}?")
-                                            st.rerun()
-                        
-                        # 删除确认对话框
-                        if st.session_state.get(f"confirm_delete_{bug['id']}", False):
-                            st.markdown("---")
-                            st.warning(f"🚨 **确认删除** BUG #{bug['id']}: {bug['title']}")
-                            col1, col2, col3 = st.columns([1, 1, 1])
-                            with col1:
-                                if st.button("✅ 确认删除", key=f"confirm_delete_yes_{bug['id']}", use_container_width=True, type="primary"):
-                                    if delete_bug(bug['id']):
-                                        st.success(f"🗑️ BUG #{bug['id']} 已成功删除")
-                                        del st.session_state[f"confirm_delete_{bug['id']}"]
-                                        time.sleep(1)
-                                        st.rerun()
-                                    else:
-                                        st.error(f"❌ 删除BUG #{bug['id']} 失败")
-                            with col2:
-                                if st.button("❌ 取消", key=f"confirm_delete_no_{bug['id']}", use_container_width=True):
+                    
+                    # 删除确认对话框
+                    if st.session_state.get(f"confirm_delete_{bug['id']}", False):
+                        st.markdown("---")
+                        st.warning(f"🚨 **确认删除** BUG #{bug['id']}: {bug['title']}")
+                        col1, col2, col3 = st.columns([1, 1, 1])
+                        with col1:
+                            if st.button("✅ 确认删除", key=f"confirm_delete_yes_{bug['id']}", use_container_width=True, type="primary"):
+                                if delete_bug(bug['id']):
+                                    st.success(f"🗑️ BUG #{bug['id']} 已成功删除")
                                     del st.session_state[f"confirm_delete_{bug['id']}"]
+                                    time.sleep(1)
                                     st.rerun()
+                                else:
+                                    st.error(f"❌ 删除BUG #{bug['id']} 失败")
+                        with col2:
+                            if st.button("❌ 取消", key=f"confirm_delete_no_{bug['id']}", use_container_width=True):
+                                del st.session_state[f"confirm_delete_{bug['id']}"]
+                                st.rerun()
+                    
+                    # 重新分配模式
+                    if st.session_state[f"reassign_mode_{bug['id']}"]:
+                        st.markdown("---")
+                        st.markdown("### 🔄 重新分配")
+                        # 动态加载研发人员列表
+                        developer_ids, format_developer = developer_options()
+                        # 设置默认值为当前分配人员
+                        current_assignee = details['assignee_id'] or UNASSIGNED_ID
+                        default_index = developer_ids.index(current_assignee) if current_assignee in developer_ids else 0
                         
-                        # 重新分配模式
-                        if st.session_state[f"reassign_mode_{bug['id']}"]:
-                            st.markdown("---")
-                            st.markdown("### 🔄 重新分配")
-                            # 动态加载研发人员列表
-                            developers, _ = get_developers()
-                            developer_names = ["未分配"] + [dev['name'] for dev in developers]
-                            # 设置默认值为当前分配人员
-                            current_assignee = details.get('assignee', '未分配')
-                            default_index = developer_names.index(current_assignee) if current_assignee in developer_names else 0
-                            
-                            col1, col2 = st.columns([3, 1])
-                            with col1:
-                                new_assignee = st.selectbox(
-                                    f"分配给:",
-                                    developer_names,
-                                    index=default_index,
-                                    key=f"assignee_select_{bug['id']}"
-                                )
-                            with col2:
-                                col_a, col_b = st.columns(2)
-                                with col_a:
-                                    if st.button("💾 确认", key=f"confirm_assign_{bug['id']}", use_container_width=True):
-                                        if update_bug_status(bug['id'], details['status'], new_assignee):
-                                            st.success(f"✅ BUG #{bug['id']} 已分配给 {new_assignee}")
-                                            st.session_state[f"reassign_mode_{bug['id']}"] = False
-                                            st.rerun()
-                                        else:
-                                            st.error(f"❌ 分配失败")
-                                
-                                with col_b:
-                                    if st.button("❌ 取消", key=f"cancel_assign_{bug['id']}", use_container_width=True):
+                        col1, col2 = st.columns([3, 1])
+                        with col1:
+                            new_assignee_id = st.selectbox(
+                                f"分配给:",
+                                developer_ids,
+                                index=default_index,
+                                format_func=format_developer,
+                                key=f"assignee_select_{bug['id']}"
+                            )
+                        with col2:
+                            col_a, col_b = st.columns(2)
+                            with col_a:
+                                if st.button("💾 确认", key=f"confirm_assign_{bug['id']}", use_container_width=True):
+                                    if update_bug_status(bug['id'], details['status'], assignee_id=new_assignee_id):
+                                        st.success(f"✅ BUG #{bug['id']} 已分配给 {format_developer(new_assignee_id)}")
                                         st.session_state[f"reassign_mode_{bug['id']}"] = False
                                         st.rerun()
+                                    else:
+                                        st.error(f"❌ 分配失败")
+                            
+                            with col_b:
+                                if st.button("❌ 取消", key=f"cancel_assign_{bug['id']}", use_container_width=True):
+                                    st.session_state[f"reassign_mode_{bug['id']}"] = False
+                                    st.rerun()
+
+    # 分页导航（键集分页，只支持上一页/下一页）
+    if len(page_cursors) > 1 or next_cursor:
+        st.markdown("---")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            if st.button("⬅️ 上一页", key="bug_list_prev", disabled=len(page_cursors) <= 1):
+                page_cursors.pop()
+                st.rerun()
+        with col2:
+            st.write(f"第 {len(page_cursors)} 页")
+        with col3:
+            if st.button("➡️ 下一页", key="bug_list_next", disabled=next_cursor is None):
+                page_cursors.append(next_cursor)
+                st.rerun()
 
-elif selected_page == "users" and user_role == 'admin':
+elif selected_page == "users" and 'manage_users' in capabilities:
     st.title("👥 用户管理")
     
     # 用户管理选项卡
@@ -986,6 +1297,7 @@ elif selected_page == "users" and user_role == 'admin':
                                     edit_user_status
                                 )
                                 if success:
+                                    expire_user_sessions(edit_user_id)
                                     st.success(f"✅ 用户 {edit_username} 更新成功")
                                     st.rerun()
                                 else:
@@ -1025,6 +1337,7 @@ elif selected_page == "users" and user_role == 'admin':
                                     st.error("❌ 两次密码输入不一致")
                                 else:
                                     if change_user_password(edit_user_id, new_password):
+                                        drop_user_sessions(edit_user_id)
                                         st.success("✅ 密码修改成功")
                                         st.session_state[f"password_mode_{edit_user_id}"] = False
                                         st.rerun()
@@ -1042,6 +1355,7 @@ elif selected_page == "users" and user_role == 'admin':
                         with col2:
                             if st.button(f"🗑️ 删除用户 {edit_user['username']}", type="secondary", key=f"delete_user_{edit_user_id}"):
                                 if delete_user(edit_user_id):
+                                    drop_user_sessions(edit_user_id)
                                     st.success(f"✅ 用户 {edit_user['username']} 已被禁用")
                                     st.rerun()
                                 else:
@@ -1054,13 +1368,103 @@ elif selected_page == "users" and user_role == 'admin':
         else:
             st.info("📦 暂无用户")
 
+elif selected_page == "metrics" and 'view_metrics' in capabilities:
+    st.title("⏱️ 数据库性能监控")
+    
+    # 查询缓存统计（始终开启）
+    st.subheader("🗃️ 查询缓存")
+    cache_stats = get_cache_stats()
+    cache_lookups = cache_stats['hits'] + cache_stats['misses']
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("命中", cache_stats['hits'])
+    with col2:
+        st.metric("未命中", cache_stats['misses'])
+    with col3:
+        st.metric("命中率", f"{cache_stats['hits'] / cache_lookups:.1%}" if cache_lookups else "-")
+    with col4:
+        st.metric("缓存条目", f"{cache_stats['entries']} / {cache_stats['max_entries']}")
+    if cache_stats['functions']:
+        st.dataframe(pd.DataFrame([
+            {'函数': name, '命中': item['hits'], '未命中': item['misses']}
+            for name, item in sorted(cache_stats['functions'].items())
+        ]), use_container_width=True, hide_index=True)
+    if st.button("🧹 清空缓存", key="clear_query_cache"):
+        clear_cache()
+        st.rerun()
+    
+    # 附件存储统计
+    st.subheader("📎 附件存储")
+    attachment_stats = get_attachment_stats()
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("文件数", attachment_stats['blobs'])
+    with col2:
+        st.metric("实际占用", f"{attachment_stats['stored_bytes'] / 1024 / 1024:.2f} MB")
+    with col3:
+        st.metric("去重节省", f"{attachment_stats['saved_bytes'] / 1024 / 1024:.2f} MB")
+    with col4:
+        st.metric("未引用文件", attachment_stats['orphans'])
+    
+    st.subheader("⏱️ 查询耗时")
+    metrics = db_metrics.get_metrics(limit=20)
+    if not metrics['enabled']:
+        st.info("ℹ️ 性能监控未开启。设置环境变量 BUG_DB_METRICS=1 后重启应用即可开启，"
+                "BUG_DB_SLOW_MS 可调整慢查询阈值（默认100毫秒）。")
+    else:
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            st.caption(f"统计起始时间: {metrics['since']}　慢查询阈值: {metrics['slow_query_ms']:.0f} ms")
+        with col2:
+            if st.button("🔄 清空统计", key="reset_metrics", use_container_width=True):
+                db_metrics.reset_metrics()
+                st.rerun()
+        
+        def metrics_dataframe(items, name_label):
+            rows = []
+            for item in items:
+                row = {
+                    name_label: item['name'],
+                    '调用次数': item['calls'],
+                    '总耗时(ms)': round(item['total_ms'], 2),
+                    '平均(ms)': round(item['avg_ms'], 3),
+                    '最大(ms)': round(item['max_ms'], 2),
+                    '返回行数': item['rows'],
+                }
+                row.update(zip(metrics['bucket_labels'], item['buckets']))
+                rows.append(row)
+            return pd.DataFrame(rows)
+        
+        tab1, tab2, tab3 = st.tabs(["🧩 函数耗时", "🗄️ SQL语句耗时", "🐢 慢查询"])
+        with tab1:
+            if metrics['functions']:
+                st.dataframe(metrics_dataframe(metrics['functions'], '函数'), use_container_width=True, hide_index=True)
+            else:
+                st.info("📦 暂无数据")
+        with tab2:
+            if metrics['statements']:
+                st.dataframe(metrics_dataframe(metrics['statements'], 'SQL'), use_container_width=True, hide_index=True)
+            else:
+                st.info("📦 暂无数据")
+        with tab3:
+            if metrics['slow_queries']:
+                for entry in metrics['slow_queries']:
+                    with st.expander(f"{entry['time']}　{entry['elapsed_ms']} ms　{entry['sql'][:80]}"):
+                        st.code(entry['sql'], language='sql')
+                        st.markdown("**查询计划**")
+                        st.code("\n".join(entry['plan']) or "（无）")
+            else:
+                st.info("📦 暂无慢查询")
+
 # 权限不足的页面提示
 else:
-    if selected_page == "submit" and not check_permission(user_role, 'create_bug'):
+    if selected_page == "submit" and 'create_bug' not in capabilities:
         st.error("❌ 您没有提交BUG的权限")
-    elif selected_page == "developers" and not check_permission(user_role, 'manage_developers'):
+    elif selected_page == "developers" and 'manage_developers' not in capabilities:
         st.error("❌ 您没有管理研发人员的权限")
-    elif selected_page == "users" and user_role != 'admin':
+    elif selected_page == "users" and 'manage_users' not in capabilities:
         st.error("❌ 只有管理员才能管理用户")
+    elif selected_page == "metrics" and 'view_metrics' not in capabilities:
+        st.error("❌ 只有管理员才能查看性能监控")
     else:
         st.info("ℹ️ 请选择一个功能页面")
\ No newline at end of file
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BUG附件存储
+上传文件按固定大小分块写入临时文件，同时计算 BLAKE2b 哈希并检查大小限制，
+fsync 后原子重命名到按内容哈希分目录的位置（uploads/objects/ab/cd/<哈希><扩展名>），
+相同内容只保存一份。每个项目的引用计数在各自的数据库中，因此默认项目以外的项目使用
+各自的目录（uploads/projects/<项目>/objects），回收一个项目的附件不会影响其他项目。日志可选在写入时压缩，读取时由 compression.open_attachment 透明解压。
+引用计数由 database.py 中的 attachments 表和触发器维护；截图的缩略图见 thumbnails.py。
+
+环境变量:
+    BUG_MAX_SCREENSHOT_MB   截图大小上限（MB），默认 20
+    BUG_MAX_LOG_MB          日志大小上限（MB），默认 500
+    BUG_LOG_COMPRESSION     日志压缩格式 gzip / zstd，默认不压缩
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+
+from compression import CODEC_SUFFIXES, check_codec, compressing_writer
+from database import (register_attachment, get_unmanaged_attachment_paths, relink_attachment,
+                      get_current_project, DEFAULT_PROJECT, DATA_DIR)
+from thumbnails import schedule_derivatives
+
+logger = logging.getLogger(__name__)
+
+# 附件根目录（在数据目录下，与数据库放在一起）
+UPLOAD_DIR = os.path.join(DATA_DIR, 'uploads')
+# 按哈希保存的文件目录（默认项目）
+OBJECT_DIR = os.path.join(UPLOAD_DIR, 'objects')
+# 其他项目的附件目录
+PROJECT_UPLOAD_DIR = os.path.join(UPLOAD_DIR, 'projects')
+# 写入中的临时文件目录（与 OBJECT_DIR 同一文件系统，保证重命名是原子的）
+TEMP_DIR = os.path.join(UPLOAD_DIR, 'tmp')
+# 每次读写的块大小
+CHUNK_SIZE = 1024 * 1024
+# 各类附件的大小上限（字节）
+MAX_SCREENSHOT_BYTES = int(float(os.environ.get('BUG_MAX_SCREENSHOT_MB', '20')) * 1024 * 1024)
+MAX_LOG_BYTES = int(float(os.environ.get('BUG_MAX_LOG_MB', '500')) * 1024 * 1024)
+# 日志压缩格式，空字符串表示不压缩
+LOG_COMPRESSION = os.environ.get('BUG_LOG_COMPRESSION', '').strip().lower() or None
+
+class AttachmentTooLarge(ValueError):
+    """附件超过大小限制"""
+
+def attachment_suffix(filename):
+    """从原始文件名中取出安全的扩展名
+
+    压缩后缀（.gz / .zst）只由存储层在自己压缩时添加：用户上传的压缩文件按原样保存、不带该后缀，
+    避免读取时按用户文件名去解压一个格式未知的文件。
+    """
+    suffix = os.path.splitext(filename or '')[1].lower()
+    if len(suffix) > 10 or not all(c.isalnum() for c in suffix[1:]) or suffix in CODEC_SUFFIXES.values():
+        return ''
+    return suffix
+
+def project_object_dir(project=None):
+    """项目（默认为当前项目）按哈希保存文件的目录"""
+    project = project or get_current_project()
+    if project == DEFAULT_PROJECT:
+        return OBJECT_DIR
+    return os.path.join(PROJECT_UPLOAD_DIR, project, 'objects')
+
+def object_path(digest, suffix=''):
+    """哈希对应的存储路径，用前两级各两个字符分目录，避免单个目录文件过多"""
+    return os.path.join(project_object_dir(), digest[:2], digest[2:4], digest + suffix)
+
+def _fsync_directory(path):
+    """把目录项的变化（重命名）刷到磁盘，不支持的平台上跳过"""
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def store_attachment(source, filename, max_bytes=None, compress=None):
+    """把文件对象的内容保存到附件存储，返回存储路径
+
+    source 只需支持 read(size)，例如 Streamlit 的 UploadedFile 或打开的文件。
+    超过 max_bytes 时抛出 AttachmentTooLarge；compress 为压缩格式（gzip / zstd）。
+    哈希按原始内容计算，压缩与否不影响去重。
+    """
+    if compress:
+        check_codec(compress)
+    suffix = attachment_suffix(filename) + (CODEC_SUFFIXES[compress] if compress else '')
+
+    os.makedirs(TEMP_DIR, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=TEMP_DIR, prefix='upload_')
+    hasher = hashlib.blake2b(digest_size=32)
+    size = 0
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            writer = compressing_writer(f, compress) if compress else f
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise AttachmentTooLarge(
+                        f"附件 {filename} 超过大小限制 {max_bytes / 1024 / 1024:.0f} MB")
+                hasher.update(chunk)
+                writer.write(chunk)
+            if writer is not f:
+                writer.close()
+            f.flush()
+            os.fsync(f.fileno())
+
+        digest = hasher.hexdigest()
+        stored_size = os.path.getsize(temp_path)
+        path = register_attachment(digest, stored_size, temp_path, object_path(digest, suffix))
+        _fsync_directory(os.path.dirname(path))
+        if compress:
+            logger.debug("附件 %s 压缩 %s -> %s 字节", filename, size, stored_size)
+        return path
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def store_screenshot(source, filename):
+    """保存截图（检查大小限制），并在后台生成缩略图和预览图"""
+    path = store_attachment(source, filename, max_bytes=MAX_SCREENSHOT_BYTES)
+    schedule_derivatives(path)
+    return path
+
+def store_log(source, filename):
+    """保存日志（检查大小限制，按配置压缩）"""
+    return store_attachment(source, filename, max_bytes=MAX_LOG_BYTES, compress=LOG_COMPRESSION)
+
+def import_legacy_attachments():
+    """把旧版本直接写入 uploads/ 的附件导入附件存储并删除原文件
+
+    返回 {'files': 导入文件数, 'missing': 不存在的文件数, 'bytes_before': 原文件总大小,
+          'bytes_after': 去重后的总大小}
+    """
+    report = {'files': 0, 'missing': 0, 'bytes_before': 0, 'bytes_after': 0}
+    stored = {}
+    for old_path in get_unmanaged_attachment_paths():
+        if not os.path.isfile(old_path):
+            logger.warning("附件文件不存在，跳过: %s", old_path)
+            report['missing'] += 1
+            continue
+
+        size = os.path.getsize(old_path)
+        with open(old_path, 'rb') as f:
+            new_path = store_attachment(f, old_path)
+        relink_attachment(old_path, new_path)
+        os.remove(old_path)
+
+        stored[new_path] = size
+        report['files'] += 1
+        report['bytes_before'] += size
+        logger.info("导入附件 %s -> %s", old_path, new_path)
+
+    report['bytes_after'] = sum(stored.values())
+    return report
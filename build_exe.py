@@ -9,6 +9,7 @@ import os
 import sys
 import subprocess
 import shutil
+import sqlite3
 from pathlib import Path
 
 def clean_build_dirs():
@@ -109,6 +110,18 @@ streamlit_datas = [
 project_datas = [
     ('app.py', '.'),
     ('database.py', '.'),
+    ('exporter.py', '.'),
+    ('log_config.py', '.'),
+    ('db_metrics.py', '.'),
+    ('query_cache.py', '.'),
+    ('attachments.py', '.'),
+    ('compression.py', '.'),
+    ('log_viewer.py', '.'),
+    ('thumbnails.py', '.'),
+    ('importer.py', '.'),
+    ('passwords.py', '.'),
+    ('sessions.py', '.'),
+    ('permissions.py', '.'),
     ('requirements.txt', '.'),
 ]
 
@@ -127,7 +140,16 @@ hiddenimports = [
     'sqlite3',
     'hashlib',
     'secrets',
+    'hmac',
     'threading',
+    'queue',
+    'gzip',
+    'mmap',
+    'numpy',
+    'PIL.WebPImagePlugin',
+    'concurrent.futures',
+    'contextvars',
+    'logging.handlers',
     'io',
     'os',
     'time',
@@ -204,6 +226,29 @@ def build_executable():
         print(f"错误输出: {e.stderr}")
         return False
 
+def copy_database(source, target):
+    """复制 SQLite 数据库
+
+    WAL 模式下最近提交的事务可能还在 -wal 文件中，只复制 .db 文件会丢失这些数据；
+    这里用 SQLite 在线备份得到包含全部已提交数据的一致副本，程序运行中也可以执行。
+    """
+    source_conn = sqlite3.connect(source)
+    try:
+        target_conn = sqlite3.connect(target)
+        try:
+            source_conn.backup(target_conn)
+        finally:
+            target_conn.close()
+    finally:
+        source_conn.close()
+
+def copy_project_databases(target_dir):
+    """复制项目登记表和各项目的数据库"""
+    shutil.copy2('projects.json', target_dir / 'projects.json')
+    (target_dir / 'projects').mkdir(exist_ok=True)
+    for db_file in Path('projects').glob('*.db'):
+        copy_database(db_file, target_dir / 'projects' / db_file.name)
+
 def copy_additional_files():
     """复制额外的文件到dist目录"""
     dist_dir = Path('dist/BUG管理系统')
@@ -213,9 +258,14 @@ def copy_additional_files():
     
     # 复制数据库文件（如果存在）
     if os.path.exists('bugs.db'):
-        shutil.copy2('bugs.db', dist_dir / 'bugs.db')
+        copy_database('bugs.db', dist_dir / 'bugs.db')
         print("复制数据库文件: bugs.db")
     
+    # 复制其他项目的登记表和数据库（如果存在）
+    if os.path.exists('projects.json'):
+        copy_project_databases(dist_dir)
+        print("复制项目数据库: projects/")
+    
     # 复制上传目录（如果存在）
     if os.path.exists('uploads'):
         shutil.copytree('uploads', dist_dir / 'uploads', dirs_exist_ok=True)
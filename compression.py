@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+附件压缩编解码
+按文件后缀识别压缩格式，读取时透明解压。gzip 使用标准库，zstd 需要安装 zstandard。
+压缩后缀只由附件存储在自己压缩时添加（见 attachments.attachment_suffix）；旧版本可能保存过
+带压缩后缀的用户文件，读取这类文件用 read_attachment，无法解压时统一抛出 AttachmentDecodeError。
+"""
+
+import gzip
+import zlib
+
+# 压缩格式 -> 文件后缀
+CODEC_SUFFIXES = {
+    'gzip': '.gz',
+    'zstd': '.zst',
+}
+
+# 压缩级别（兼顾速度，上传时边接收边压缩）
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+class AttachmentDecodeError(ValueError):
+    """附件无法按其压缩格式解压（文件损坏、格式不符或缺少解压库）"""
+
+def _import_zstandard():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise RuntimeError("zstd压缩需要安装 zstandard: pip install zstandard") from e
+    return zstandard
+
+def check_codec(codec):
+    """检查压缩格式是否可用，不可用时抛出异常"""
+    if codec not in CODEC_SUFFIXES:
+        raise ValueError(f"不支持的压缩格式: {codec}")
+    if codec == 'zstd':
+        _import_zstandard()
+
+def compressing_writer(fileobj, codec):
+    """包装可写文件对象，写入的数据被压缩；关闭包装对象不会关闭 fileobj"""
+    if codec == 'gzip':
+        return gzip.GzipFile(fileobj=fileobj, mode='wb', compresslevel=GZIP_LEVEL, mtime=0)
+    if codec == 'zstd':
+        return _import_zstandard().ZstdCompressor(level=ZSTD_LEVEL).stream_writer(fileobj, closefd=False)
+    raise ValueError(f"不支持的压缩格式: {codec}")
+
+def codec_of(path):
+    """根据后缀判断文件的压缩格式，未压缩返回 None"""
+    for codec, suffix in CODEC_SUFFIXES.items():
+        if path.endswith(suffix):
+            return codec
+    return None
+
+def strip_codec_suffix(name):
+    """去掉压缩后缀，得到解压后的文件名"""
+    codec = codec_of(name)
+    return name[:-len(CODEC_SUFFIXES[codec])] if codec else name
+
+def open_attachment(path):
+    """以二进制只读方式打开附件，压缩文件透明解压"""
+    codec = codec_of(path)
+    if codec == 'gzip':
+        return gzip.open(path, 'rb')
+    if codec == 'zstd':
+        return _import_zstandard().ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    return open(path, 'rb')
+
+def _decode_errors():
+    """解压时可能抛出的异常类型"""
+    errors = (EOFError, RuntimeError, zlib.error, gzip.BadGzipFile)
+    try:
+        import zstandard
+    except ImportError:
+        return errors
+    return errors + (zstandard.ZstdError,)
+
+def read_attachment(path, size=-1):
+    """读取附件（压缩文件透明解压）的前 size 字节；无法解压时抛出 AttachmentDecodeError，
+    文件不存在等 I/O 错误照常抛出 OSError"""
+    try:
+        with open_attachment(path) as f:
+            return f.read(size)
+    except _decode_errors() as e:
+        raise AttachmentDecodeError(f"无法解压附件 {path}: {e}") from e
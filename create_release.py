@@ -7,9 +7,33 @@ BUG管理系统 - 便携式发行版创建工具
 
 import os
 import shutil
+import sqlite3
 import zipfile
 from pathlib import Path
 
+def copy_database(source, target):
+    """复制 SQLite 数据库
+
+    WAL 模式下最近提交的事务可能还在 -wal 文件中，只复制 .db 文件会丢失这些数据；
+    这里用 SQLite 在线备份得到包含全部已提交数据的一致副本，程序运行中也可以执行。
+    """
+    source_conn = sqlite3.connect(source)
+    try:
+        target_conn = sqlite3.connect(target)
+        try:
+            source_conn.backup(target_conn)
+        finally:
+            target_conn.close()
+    finally:
+        source_conn.close()
+
+def copy_project_databases(target_dir):
+    """复制项目登记表和各项目的数据库"""
+    shutil.copy2('projects.json', target_dir / 'projects.json')
+    (target_dir / 'projects').mkdir(exist_ok=True)
+    for db_file in Path('projects').glob('*.db'):
+        copy_database(db_file, target_dir / 'projects' / db_file.name)
+
 def create_portable_release():
     """创建便携式发行版"""
     print("=" * 60)
@@ -26,7 +50,7 @@ def create_portable_release():
     print(f"创建发行版目录: {release_dir}")
     
     # 复制核心文件
-    core_files = ['app.py', 'database.py', 'requirements.txt']
+    core_files = ['app.py', 'database.py', 'exporter.py', 'log_config.py', 'db_metrics.py', 'query_cache.py', 'attachments.py', 'compression.py', 'log_viewer.py', 'thumbnails.py', 'importer.py', 'passwords.py', 'sessions.py', 'permissions.py', 'manage.py', 'requirements.txt']
     for file in core_files:
         if os.path.exists(file):
             shutil.copy2(file, release_dir / file)
@@ -34,9 +58,14 @@ def create_portable_release():
     
     # 复制数据文件
     if os.path.exists('bugs.db'):
-        shutil.copy2('bugs.db', release_dir / 'bugs.db')
+        copy_database('bugs.db', release_dir / 'bugs.db')
         print("复制: bugs.db")
     
+    # 其他项目的登记表和数据库
+    if os.path.exists('projects.json'):
+        copy_project_databases(release_dir)
+        print("复制: 项目数据库")
+    
     if os.path.exists('uploads'):
         shutil.copytree('uploads', release_dir / 'uploads')
         print("复制: uploads目录")
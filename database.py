@@ -1,38 +1,348 @@
 import sqlite3
-from datetime import datetime
+import logging
+from datetime import datetime, timezone
 import threading
-import hashlib
-import secrets
+import json
+import base64
+import os
+import queue
+import random
+import time
+import atexit
+import inspect
+import re
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
 
-# 全局标志，确保表只创建一次
-_table_created = False
-_table_lock = threading.Lock()
+import db_metrics
+from compression import read_attachment, AttachmentDecodeError
+from thumbnails import remove_derivatives
+from passwords import hash_password, check_password, check_dummy_password
+from query_cache import cached, invalidate, set_scope_provider
 
-def get_connection():
-    """获取当前线程的数据库连接"""
-    if not hasattr(threading.current_thread(), 'conn'):
-        setattr(threading.current_thread(), 'conn', sqlite3.connect('bugs.db', check_same_thread=False))
+logger = logging.getLogger(__name__)
+
+# 数据目录：默认项目的数据库、项目登记表、其他项目的数据库、附件（uploads/）、日志（logs/）和会话签名密钥
+# 都在此目录下。
+# 导入时解析为绝对路径，之后启动器再 os.chdir 也不会改变数据库位置
+DATA_DIR = os.path.abspath(os.environ.get('BUG_DATA_DIR', '.'))
+# 默认项目（也保存用户和登录会话）
+DEFAULT_PROJECT = 'default'
+# 用户和登录会话所在的项目
+ACCOUNTS_PROJECT = DEFAULT_PROJECT
+# 默认项目的数据库文件路径（兼容旧版本的 bugs.db）
+DATABASE_PATH = os.path.join(DATA_DIR, 'bugs.db')
+# 其他项目的数据库目录（<项目标识>.db）
+PROJECTS_DIR = os.path.join(DATA_DIR, 'projects')
+# 项目登记表
+PROJECT_REGISTRY_PATH = os.path.join(DATA_DIR, 'projects.json')
+# 项目标识：小写字母、数字、下划线和短横线
+PROJECT_KEY_PATTERN = re.compile(r'^[a-z0-9][a-z0-9_-]{0,31}$')
+# 只读连接池大小（可通过环境变量 BUG_DB_POOL_SIZE 配置）
+DEFAULT_READ_POOL_SIZE = int(os.environ.get('BUG_DB_POOL_SIZE', '8'))
+# 等待写锁的超时时间（毫秒）
+BUSY_TIMEOUT_MS = 5000
+
+# 每个新连接都会执行的 PRAGMA
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA temp_store = MEMORY",
+)
+
+class ConnectionPool:
+    """SQLite连接池：一个写连接（进程内串行化所有写入）+ 数量有上限的只读连接
+
+    WAL 模式下读连接不会阻塞写连接，写连接也不会阻塞读连接。
+    """
+
+    def __init__(self, path=DATABASE_PATH, read_pool_size=DEFAULT_READ_POOL_SIZE, accounts=True):
+        self.path = path
+        # 是否为保存用户和登录会话的数据库
+        self.accounts = accounts
+        self.read_pool_size = read_pool_size
+        self._idle_readers = queue.LifoQueue()
+        self._reader_slots = threading.BoundedSemaphore(read_pool_size)
+        self._writer = None
+        self._writer_lock = threading.RLock()
+        self._schema_checked = False
+        self._closed = False
+
+    def _connect(self, read_only):
+        """创建并配置一个新连接"""
+        factory = db_metrics.InstrumentedConnection if db_metrics.is_enabled() else sqlite3.Connection
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False,
+                               factory=factory)
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        if read_only:
+            conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def _get_writer(self):
+        """获取写连接（调用方需持有写锁），首次使用时执行表结构迁移"""
+        if self._closed:
+            raise sqlite3.ProgrammingError("连接池已关闭")
+        if self._writer is None:
+            self._writer = self._connect(read_only=False)
+        if not self._schema_checked:
+            initialize_database(self._writer, self.accounts)
+            self._schema_checked = True
+        return self._writer
+
+    @contextmanager
+    def writer(self):
+        """独占写连接，正常退出时提交，异常时回滚"""
+        with self._writer_lock:
+            conn = self._get_writer()
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            else:
+                conn.commit()
+
+    @contextmanager
+    def reader(self):
+        """借用一个只读连接，用完归还；连接数达到上限时等待"""
+        if not self._schema_checked:
+            with self._writer_lock:
+                self._get_writer()
+
+        self._reader_slots.acquire()
+        try:
+            try:
+                conn = self._idle_readers.get_nowait()
+            except queue.Empty:
+                conn = self._connect(read_only=True)
+        except BaseException:
+            self._reader_slots.release()
+            raise
+
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            if self._closed:
+                conn.close()
+            else:
+                self._idle_readers.put(conn)
+            self._reader_slots.release()
+
+    def close(self):
+        """关闭所有空闲连接和写连接"""
+        self._closed = True
+        while True:
+            try:
+                self._idle_readers.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._writer_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+# 项目标识 -> 连接池，每个项目的数据库有各自的写连接和读连接池
+_pools = {}
+_pool_lock = threading.Lock()
+# 当前项目（Streamlit 每个会话的脚本线程在重跑开始时设置，后台线程默认为默认项目）
+_current_project = contextvars.ContextVar('current_project', default=DEFAULT_PROJECT)
+
+def get_current_project():
+    """当前线程/上下文中的项目标识"""
+    return _current_project.get()
+
+def set_current_project(project):
+    """设置当前项目，之后本线程中的数据库函数都访问该项目的数据库"""
+    get_project_path(project)
+    _current_project.set(project)
+
+@contextmanager
+def use_project(project):
+    """临时切换当前项目: with use_project('mobile'): ..."""
+    get_project_path(project)
+    token = _current_project.set(project)
+    try:
+        yield
+    finally:
+        _current_project.reset(token)
+
+# 查询缓存按项目区分
+set_scope_provider(get_current_project)
+
+def get_pool(project=None):
+    """获取项目（默认为当前项目）的连接池"""
+    project = project or _current_project.get()
+    pool = _pools.get(project)
+    if pool is None:
+        with _pool_lock:
+            pool = _pools.get(project)
+            if pool is None:
+                pool = _pools[project] = ConnectionPool(get_project_path(project),
+                                                        accounts=project == ACCOUNTS_PROJECT)
+    return pool
+
+# 当前上下文固定使用的读连接 (项目, 连接)，由 _count_read_statements 设置，其他线程不受影响
+_pinned_reader = contextvars.ContextVar('pinned_reader', default=None)
+
+def read_connection(project=None):
+    """借用只读连接: with read_connection() as conn: ..."""
+    project = project or _current_project.get()
+    pinned = _pinned_reader.get()
+    if pinned is not None and pinned[0] == project:
+        return nullcontext(pinned[1])
+    return get_pool(project).reader()
+
+@contextmanager
+def write_connection(invalidates=(), project=None):
+    """获取写连接（自动提交/回滚）: with write_connection() as conn: ...
+
+    invalidates 为本次写入涉及的表，提交成功后使依赖这些表的查询缓存失效。
+    project 默认为当前项目。
+    """
+    project = project or _current_project.get()
+    with get_pool(project).writer() as conn:
+        yield conn
+    invalidate(*invalidates, scope=project)
+
+# 项目登记表缓存: (文件修改时间, 项目列表)
+_registry_cache = (None, ())
+_registry_lock = threading.Lock()
+
+def _load_registry():
+    """读取项目登记表（文件未变化时用缓存），返回 [{'key', 'name', 'created_at'}]"""
+    global _registry_cache
+    try:
+        mtime = os.stat(PROJECT_REGISTRY_PATH).st_mtime_ns
+    except FileNotFoundError:
+        return ()
+    if _registry_cache[0] != mtime:
+        with open(PROJECT_REGISTRY_PATH, encoding='utf-8') as f:
+            _registry_cache = (mtime, tuple(json.load(f).get('projects', [])))
+    return _registry_cache[1]
+
+def get_project_path(project):
+    """项目的数据库文件路径，项目不存在时抛出 ValueError"""
+    if project == DEFAULT_PROJECT:
+        return DATABASE_PATH
+    if any(entry['key'] == project for entry in _load_registry()):
+        return os.path.join(PROJECTS_DIR, f"{project}.db")
+    raise ValueError(f"项目不存在: {project}")
+
+def list_projects():
+    """返回全部项目 [{'key', 'name', 'path'}]，默认项目在最前"""
+    projects = [{'key': DEFAULT_PROJECT, 'name': '默认项目', 'path': DATABASE_PATH}]
+    for entry in _load_registry():
+        projects.append({'key': entry['key'], 'name': entry['name'],
+                         'path': os.path.join(PROJECTS_DIR, f"{entry['key']}.db")})
+    return projects
+
+def create_project(key, name=None):
+    """登记新项目并创建其数据库，返回项目标识；标识无效或已存在时抛出 ValueError"""
+    key = (key or '').strip()
+    if not PROJECT_KEY_PATTERN.match(key):
+        raise ValueError("项目标识只能包含小写字母、数字、下划线和短横线（最长32个字符）")
+    with _registry_lock:
+        projects = list(_load_registry())
+        if key == DEFAULT_PROJECT or any(entry['key'] == key for entry in projects):
+            raise ValueError(f"项目已存在: {key}")
+        projects.append({'key': key, 'name': (name or '').strip() or key,
+                         'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')})
+        os.makedirs(PROJECTS_DIR, exist_ok=True)
+        # 先写临时文件再重命名，读取方不会读到半个文件
+        temp_path = f"{PROJECT_REGISTRY_PATH}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'projects': projects}, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, PROJECT_REGISTRY_PATH)
+
+    # 创建数据库并执行迁移
+    with write_connection(project=key):
+        pass
+    logger.info("创建项目 %s: %s", key, get_project_path(key))
+    return key
+
+# 初始化数据库（按 PRAGMA user_version 顺序执行迁移）
+# accounts 为 False 的数据库（默认项目以外的项目）不创建用户和登录会话表
+def initialize_database(conn, accounts=True):
+    cursor = conn.cursor()
     
-    # 确保表结构只初始化一次
-    global _table_created
-    with _table_lock:
-        if not _table_created:
-            initialize_database(getattr(threading.current_thread(), 'conn'))
-            _table_created = True
+    # 表结构已是最新版本时只需这一次整数检查
+    cursor.execute("PRAGMA user_version")
+    if cursor.fetchone()[0] >= SCHEMA_VERSION:
+        return
     
-    return getattr(threading.current_thread(), 'conn')
+    if conn.in_transaction:
+        conn.commit()
+    
+    for version, description, migrate in MIGRATIONS:
+        # 每个迁移在独立的写事务中执行，并在事务内复核版本，避免多进程重复迁移
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            cursor.execute("PRAGMA user_version")
+            if cursor.fetchone()[0] >= version:
+                conn.rollback()
+                continue
+            migrate(cursor, accounts)
+            cursor.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        logger.info("应用数据库迁移 v%s: %s", version, description)
+    
+    logger.info("数据库初始化完成")
 
-# 初始化数据库（迁移式表结构更新）
-def initialize_database(conn):
-    cursor = conn.cursor()
+def _create_users_table(cursor):
+    """创建users表（用户认证）及默认账户"""
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='users'")
+    users_table_exists = cursor.fetchone()
+
+    if not users_table_exists:
+        logger.info("创建新的users表...")
+        cursor.execute('''
+            CREATE TABLE users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username TEXT NOT NULL UNIQUE,
+                password_hash TEXT NOT NULL,
+                salt TEXT NOT NULL,
+                role TEXT NOT NULL DEFAULT 'tester',
+                email TEXT UNIQUE,
+                real_name TEXT,
+                status TEXT DEFAULT 'active',
+                last_login TIMESTAMP,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        logger.info("users表创建成功")
+    
+        # 创建默认账户（每个账户独立的盐值包含在 password_hash 中，salt 列留空）
+        default_users = [
+            ('admin', hash_password("admin123"), '', 'admin', 'admin@company.com', '系统管理员', 'active'),
+            ('pm', hash_password("pm123"), '', 'pm', 'pm@company.com', '项目经理', 'active'),
+            ('tester', hash_password("test123"), '', 'tester', 'tester@company.com', '测试人员', 'active')
+        ]
     
+        cursor.executemany('''
+            INSERT INTO users (username, password_hash, salt, role, email, real_name, status) 
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', default_users)
+        logger.info("添加默认用户账户")
+
+def _migrate_base_schema(cursor, accounts):
+    """v1: 创建 bugs/users/developers 表（兼容旧库补齐缺失字段，users 只在账户数据库中）及分页索引"""
     # 创建/更新bugs表
     cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='bugs'")
     table_exists = cursor.fetchone()
     
     if not table_exists:
         # 表不存在，创建新表
-        print("创建新的bugs表...")
+        logger.info("创建新的bugs表...")
         cursor.execute('''
             CREATE TABLE bugs (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -49,10 +359,10 @@ def initialize_database(conn):
                 resolved_at TIMESTAMP
             )
         ''')
-        print("bugs表创建成功")
+        logger.info("bugs表创建成功")
     else:
         # 表存在，检查并添加缺失字段
-        print("检查bugs表结构...")
+        logger.info("检查bugs表结构...")
         required_columns = ['id', 'title', 'description', 'version', 'region', 'submitter', 'assignee_id', 'status', 'screenshot', 'log_file', 'created_at', 'resolved_at']
         
         cursor.execute("PRAGMA table_info(bugs)")
@@ -62,65 +372,31 @@ def initialize_database(conn):
             if required_col not in existing_columns:
                 if required_col == 'assignee_id':
                     cursor.execute("ALTER TABLE bugs ADD COLUMN assignee_id INTEGER")
-                    print(f"添加assignee_id字段")
+                    logger.info("添加assignee_id字段")
                 elif required_col == 'status':
                     cursor.execute("ALTER TABLE bugs ADD COLUMN status TEXT DEFAULT '待处理'")
-                    print(f"添加status字段")
+                    logger.info("添加status字段")
                 elif required_col == 'resolved_at':
                     cursor.execute("ALTER TABLE bugs ADD COLUMN resolved_at TIMESTAMP")
-                    print(f"添加resolved_at字段")
+                    logger.info("添加resolved_at字段")
                 elif required_col == 'screenshot':
                     cursor.execute("ALTER TABLE bugs ADD COLUMN screenshot TEXT")
-                    print(f"添加screenshot字段")
+                    logger.info("添加screenshot字段")
                 elif required_col == 'log_file':
                     cursor.execute("ALTER TABLE bugs ADD COLUMN log_file TEXT")
-                    print(f"添加log_file字段")
-    
-    # 创建/更新users表（用户认证）
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='users'")
-    users_table_exists = cursor.fetchone()
+                    logger.info("添加log_file字段")
     
-    if not users_table_exists:
-        print("创建新的users表...")
-        cursor.execute('''
-            CREATE TABLE users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT NOT NULL UNIQUE,
-                password_hash TEXT NOT NULL,
-                salt TEXT NOT NULL,
-                role TEXT NOT NULL DEFAULT 'tester',
-                email TEXT UNIQUE,
-                real_name TEXT,
-                status TEXT DEFAULT 'active',
-                last_login TIMESTAMP,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        print("users表创建成功")
-        
-        # 创建默认管理员账户
-        admin_salt = secrets.token_hex(16)
-        admin_password = "admin123"  # 默认密码
-        admin_hash = hashlib.sha256((admin_password + admin_salt).encode()).hexdigest()
-        
-        default_users = [
-            ('admin', admin_hash, admin_salt, 'admin', 'admin@company.com', '系统管理员', 'active'),
-            ('pm', hashlib.sha256(("pm123" + admin_salt).encode()).hexdigest(), admin_salt, 'pm', 'pm@company.com', '项目经理', 'active'),
-            ('tester', hashlib.sha256(("test123" + admin_salt).encode()).hexdigest(), admin_salt, 'tester', 'tester@company.com', '测试人员', 'active')
-        ]
-        
-        cursor.executemany('''
-            INSERT INTO users (username, password_hash, salt, role, email, real_name, status) 
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', default_users)
-        print("添加默认用户账户")
     
+    # 用户认证表只在保存账户的数据库中创建
+    if accounts:
+        _create_users_table(cursor)
+
     # 创建/更新developers表
     cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='developers'")
     dev_table_exists = cursor.fetchone()
     
     if not dev_table_exists:
-        print("创建新的developers表...")
+        logger.info("创建新的developers表...")
         cursor.execute('''
             CREATE TABLE developers (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -133,7 +409,7 @@ def initialize_database(conn):
                 FOREIGN KEY (user_id) REFERENCES users (id)
             )
         ''')
-        print("developers表创建成功")
+        logger.info("developers表创建成功")
         # 添加一些默认研发人员
         default_developers = [
             ('张三', 'zhangsan@company.com', '高级工程师', '活跃', None),
@@ -145,9 +421,9 @@ def initialize_database(conn):
             INSERT OR IGNORE INTO developers (name, email, role, status, user_id) 
             VALUES (?, ?, ?, ?, ?)
         ''', default_developers)
-        print("添加默认研发人员")
+        logger.info("添加默认研发人员")
     else:
-        print("检查developers表结构...")
+        logger.info("检查developers表结构...")
         dev_required_columns = ['id', 'name', 'email', 'role', 'status', 'user_id', 'created_at']
         
         cursor.execute("PRAGMA table_info(developers)")
@@ -157,758 +433,2264 @@ def initialize_database(conn):
             if required_col not in dev_existing_columns:
                 if required_col == 'email':
                     cursor.execute("ALTER TABLE developers ADD COLUMN email TEXT UNIQUE")
-                    print(f"添加email字段")
+                    logger.info("添加email字段")
                 elif required_col == 'role':
                     cursor.execute("ALTER TABLE developers ADD COLUMN role TEXT DEFAULT '开发工程师'")
-                    print(f"添加role字段")
+                    logger.info("添加role字段")
                 elif required_col == 'status':
                     cursor.execute("ALTER TABLE developers ADD COLUMN status TEXT DEFAULT '活跃'")
-                    print(f"添加status字段")
+                    logger.info("添加status字段")
                 elif required_col == 'user_id':
                     cursor.execute("ALTER TABLE developers ADD COLUMN user_id INTEGER")
-                    print(f"添加user_id字段")
+                    logger.info("添加user_id字段")
                 elif required_col == 'created_at':
                     cursor.execute("ALTER TABLE developers ADD COLUMN created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP")
-                    print(f"添加created_at字段")
-    
-    # 验证最终表结构
-    print("=== bugs表结构 ===")
-    cursor.execute("PRAGMA table_info(bugs)")
-    for col in cursor.fetchall():
-        print(f"  - {col[1]} ({col[2]})")
+                    logger.info("添加created_at字段")
     
-    print("=== developers表结构 ===")
-    cursor.execute("PRAGMA table_info(developers)")
-    for col in cursor.fetchall():
-        print(f"  - {col[1]} ({col[2]})")
-    
-    conn.commit()
-    print("数据库初始化完成")
+    # 列表分页（按 created_at, id 倒序的键集分页）、超期统计
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_bugs_created_at ON bugs (created_at)")
 
-# 研发人员管理函数
-def create_developer(name, email=None, role='开发工程师', status='活跃'):
-    """创建新研发人员"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute('''
-            INSERT INTO developers (name, email, role, status) 
-            VALUES (?, ?, ?, ?)
-        ''', (name, email, role, status))
-        dev_id = cursor.lastrowid
-        conn.commit()
-        print(f"创建研发人员成功: {name}, ID: {dev_id}")
-        return dev_id
-    except sqlite3.IntegrityError as e:
-        print(f"创建研发人员失败: {e}")
-        return None
+def _migrate_filter_indexes(cursor, accounts):
+    """v2: 按状态/提交人/研发人员过滤并按时间倒序的复合索引"""
+    # 列表筛选、我提交的、分配给我的、删除研发人员前的检查
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_bugs_status_created ON bugs (status, created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_bugs_submitter_created ON bugs (submitter, created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_bugs_assignee_created ON bugs (assignee_id, created_at)")
 
-def get_developers(search=None, role=None, status=None, page=1, page_size=10):
-    """获取研发人员列表，支持搜索、分页、过滤"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    # 基础查询
-    query = '''
-        SELECT id, name, email, role, status, created_at 
-        FROM developers 
-        WHERE 1=1
-    '''
-    params = []
-    
-    # 搜索条件
-    if search:
-        query += " AND name LIKE ?"
-        params.append(f"%{search}%")
-    
-    if role and role != "所有":
-        query += " AND role = ?"
-        params.append(role)
-    
-    if status and status != "所有":
-        query += " AND status = ?"
-        params.append(status)
-    
-    # 分页
-    offset = (page - 1) * page_size
-    query += " ORDER BY name ASC LIMIT ? OFFSET ?"
-    params.extend([page_size, offset])
-    
-    cursor.execute(query, params)
-    developers = cursor.fetchall()
-    
-    # 获取总记录数（移除LIMIT和OFFSET）
-    count_query = '''
-        SELECT COUNT(*) FROM developers 
-        WHERE 1=1
-    '''
-    count_params = []
-    if search:
-        count_query += " AND name LIKE ?"
-        count_params.append(f"%{search}%")
-    if role and role != "所有":
-        count_query += " AND role = ?"
-        count_params.append(role)
-    if status and status != "所有":
-        count_query += " AND status = ?"
-        count_params.append(status)
-    
-    cursor.execute(count_query, count_params)
-    total_count = cursor.fetchone()[0]
-    
-    result = []
-    for dev in developers:
-        result.append({
-            'id': dev[0],
-            'name': dev[1],
-            'email': dev[2],
-            'role': dev[3],
-            'status': dev[4],
-            'created_at': dev[5]
-        })
-    
-    print(f"查询到 {len(result)} / {total_count} 条研发人员记录")
-    return result, total_count
+def _query_plan_expectations():
+    """热点查询及其应使用的索引 [(查询名, SQL, 参数, 预期索引, 所在数据库)]，用于防止查询计划退化为全表扫描
 
-def get_developer_by_id(dev_id):
-    """根据ID获取单个研发人员"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT id, name, email, role, status, created_at 
-        FROM developers WHERE id = ?
-    ''', (dev_id,))
-    row = cursor.fetchone()
-    if row:
-        return {
-            'id': row[0],
-            'name': row[1],
-            'email': row[2],
-            'role': row[3],
-            'status': row[4],
-            'created_at': row[5]
-        }
-    return None
+    SQL 取自各函数实际执行的常量和构建函数，函数中的查询修改后检查随之生效。
+    所在数据库为 None 表示当前项目。
+    """
+    return [
+        ('get_bugs_page', *build_bugs_page_query(cursor=encode_bug_cursor('2025-01-01 00:00:00', 1)),
+         'idx_bugs_created_at', None),
+        ('get_bugs_page(status)', *build_bugs_page_query(status='紧急'), 'idx_bugs_status_created', None),
+        ('get_user_submitted_bugs', USER_SUBMITTED_BUGS_SQL, ('tester',), 'idx_bugs_submitter_created', None),
+        ('get_developer_assigned_bugs', DEVELOPER_ASSIGNED_BUGS_SQL, ('张三',), 'idx_bugs_assignee_created', None),
+        ('delete_developer', DEVELOPER_BUG_COUNT_SQL, (1,), 'idx_bugs_assignee_created', None),
+        ('get_bug_stats(overdue)', OVERDUE_RECENT_BUGS_SQL, (), 'idx_bugs_created_at', None),
+        ('get_session_user_record', SESSION_USER_SQL, ('session', 0), 'USING PRIMARY KEY', ACCOUNTS_PROJECT),
+    ]
 
-def update_developer(dev_id, name=None, email=None, role=None, status=None):
-    """更新研发人员信息"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    updates = []
-    params = []
-    
-    if name is not None:
-        updates.append("name = ?")
-        params.append(name)
-    if email is not None:
-        updates.append("email = ?")
-        params.append(email)
-    if role is not None:
-        updates.append("role = ?")
-        params.append(role)
-    if status is not None:
-        updates.append("status = ?")
-        params.append(status)
-    
-    if updates:
-        params.append(dev_id)
-        query = f"UPDATE developers SET {', '.join(updates)} WHERE id = ?"
-        cursor.execute(query, params)
-        affected = cursor.rowcount
-        conn.commit()
-        print(f"更新研发人员 {dev_id} 成功，影响行数: {affected}")
-        return affected > 0
-    return False
+# 查询计划中对 bugs 表（别名 b）不走索引的全表扫描
+_BUGS_FULL_SCAN_PATTERN = re.compile(r'SCAN (bugs|b)')
 
-def delete_developer(dev_id):
-    """删除研发人员（级联检查）"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    # 检查是否有BUG分配给该研发人员
-    cursor.execute('SELECT COUNT(*) FROM bugs WHERE assignee_id = ?', (dev_id,))
-    bug_count = cursor.fetchone()[0]
-    
-    if bug_count > 0:
-        print(f"无法删除研发人员 {dev_id}，还有 {bug_count} 个BUG分配给该人员")
-        return False
-    
-    # 删除研发人员
-    cursor.execute('DELETE FROM developers WHERE id = ?', (dev_id,))
-    affected = cursor.rowcount
-    conn.commit()
-    print(f"删除研发人员 {dev_id} 成功，影响行数: {affected}")
-    return affected > 0
+def _plan_uses_index(plan, expected_index):
+    """查询计划（EXPLAIN QUERY PLAN 的 detail 列表）中是否有一步使用了预期索引（按完整名称匹配）"""
+    pattern = re.compile(rf'\b{re.escape(expected_index)}\b')
+    return any(pattern.search(detail) for detail in plan)
 
-# 用户认证和权限管理函数
-def create_user(username, password, role='tester', email=None, real_name=None):
-    """创建新用户"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    try:
-        # 生成盐值和密码哈希
-        salt = secrets.token_hex(16)
-        password_hash = hashlib.sha256((password + salt).encode()).hexdigest()
-        
-        cursor.execute('''
-            INSERT INTO users (username, password_hash, salt, role, email, real_name) 
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (username, password_hash, salt, role, email, real_name))
-        
-        user_id = cursor.lastrowid
-        conn.commit()
-        print(f"创建用户成功: {username}, ID: {user_id}")
-        return user_id
-    except sqlite3.IntegrityError as e:
-        print(f"创建用户失败: {e}")
-        return None
+def _plan_scans_bugs(plan):
+    """查询计划中是否有对 bugs 表的全表扫描（SCAN bug_rollup_daily 等其他表不算）"""
+    return any(_BUGS_FULL_SCAN_PATTERN.fullmatch(detail) for detail in plan)
 
-def authenticate_user(username, password):
-    """用户认证"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        SELECT id, username, password_hash, salt, role, email, real_name, status 
-        FROM users WHERE username = ? AND status = 'active'
-    ''', (username,))
-    
-    user = cursor.fetchone()
-    if user:
-        user_id, username, stored_hash, salt, role, email, real_name, status = user
-        # 验证密码
-        password_hash = hashlib.sha256((password + salt).encode()).hexdigest()
-        if password_hash == stored_hash:
-            # 更新最后登录时间
-            cursor.execute('UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = ?', (user_id,))
-            conn.commit()
-            
-            print(f"用户 {username} 登录成功")
-            return {
-                'id': user_id,
-                'username': username,
-                'role': role,
-                'email': email,
-                'real_name': real_name
-            }
-    
-    print(f"用户 {username} 认证失败")
-    return None
+def _explain_query_plan(query, params=(), project=None):
+    """返回查询的 EXPLAIN QUERY PLAN 各步说明"""
+    with read_connection(project) as conn:
+        cursor = conn.execute(f"EXPLAIN QUERY PLAN {query}", params)
+        return [row[-1] for row in cursor.fetchall()]
 
-def get_user_by_id(user_id):
-    """根据ID获取用户信息"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        SELECT id, username, role, email, real_name, status, created_at, last_login 
-        FROM users WHERE id = ?
-    ''', (user_id,))
-    
-    row = cursor.fetchone()
-    if row:
-        return {
-            'id': row[0],
-            'username': row[1],
-            'role': row[2],
-            'email': row[3],
-            'real_name': row[4],
-            'status': row[5],
-            'created_at': row[6],
-            'last_login': row[7]
-        }
-    return None
+def check_query_plans():
+    """检查热点查询的 EXPLAIN QUERY PLAN 是否使用了预期索引
 
-def check_permission(user_role, action):
-    """检查用户权限"""
-    permissions = {
-        'admin': ['all'],  # 管理员拥有所有权限
-        'pm': ['view_bugs', 'create_bug', 'edit_bug', 'delete_bug', 'manage_developers', 'view_stats', 'export_data'],
-        'developer': ['view_bugs', 'create_bug', 'edit_own_bug', 'view_stats'],
-        'tester': ['view_bugs', 'create_bug', 'edit_own_bug', 'view_stats'],
-        'guest': ['view_bugs', 'view_stats']
-    }
-    
-    user_permissions = permissions.get(user_role, [])
-    return 'all' in user_permissions or action in user_permissions
+    返回不符合预期的项列表 [(查询名, 预期索引, 实际查询计划)]，为空表示全部符合。
+    """
+    failures = []
+    for name, query, params, expected_index, project in _query_plan_expectations():
+        plan = _explain_query_plan(query, params, project)
+        if not _plan_uses_index(plan, expected_index) or _plan_scans_bugs(plan):
+            failures.append((name, expected_index, plan))
 
-def get_all_users(search=None, role=None, page=1, page_size=10):
-    """获取用户列表"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    query = '''
-        SELECT id, username, role, email, real_name, status, created_at, last_login 
-        FROM users WHERE 1=1
+    logger.info("查询计划检查完成，不符合预期: %s", len(failures))
+    return failures
+
+# 统计汇总表：按 (日期, 状态)、(提交人, 状态)、研发人员 预聚合BUG数量，
+# 由 bugs 表上的触发器在同一事务内维护
+ROLLUP_TABLES = ('bug_rollup_daily', 'bug_rollup_submitter', 'bug_rollup_assignee')
+
+def _rollup_trigger_body(row, delta):
+    """生成对三张汇总表按 row（NEW/OLD）增减 delta 的触发器语句"""
+    day = f"IFNULL(date({row}.created_at), '')"
+    status = f"IFNULL({row}.status, '')"
+    assignee = f"IFNULL({row}.assignee_id, 0)"
+    return f'''
+        INSERT OR IGNORE INTO bug_rollup_daily (day, status, bug_count) VALUES ({day}, {status}, 0);
+        UPDATE bug_rollup_daily SET bug_count = bug_count + ({delta})
+            WHERE day = {day} AND status = {status};
+        DELETE FROM bug_rollup_daily WHERE day = {day} AND status = {status} AND bug_count <= 0;
+
+        INSERT OR IGNORE INTO bug_rollup_submitter (submitter, status, bug_count) VALUES ({row}.submitter, {status}, 0);
+        UPDATE bug_rollup_submitter SET bug_count = bug_count + ({delta})
+            WHERE submitter = {row}.submitter AND status = {status};
+        DELETE FROM bug_rollup_submitter WHERE submitter = {row}.submitter AND status = {status} AND bug_count <= 0;
+
+        INSERT OR IGNORE INTO bug_rollup_assignee (assignee_id, bug_count) VALUES ({assignee}, 0);
+        UPDATE bug_rollup_assignee SET bug_count = bug_count + ({delta})
+            WHERE assignee_id = {assignee};
+        DELETE FROM bug_rollup_assignee WHERE assignee_id = {assignee} AND bug_count <= 0;
     '''
-    params = []
-    
-    if search:
-        query += " AND (username LIKE ? OR real_name LIKE ?)"
-        params.extend([f"%{search}%", f"%{search}%"])
-    
-    if role and role != "所有":
-        query += " AND role = ?"
-        params.append(role)
-    
-    # 分页
-    offset = (page - 1) * page_size
-    query += " ORDER BY created_at DESC LIMIT ? OFFSET ?"
-    params.extend([page_size, offset])
-    
-    cursor.execute(query, params)
-    users = cursor.fetchall()
-    
-    # 获取总数
-    count_query = "SELECT COUNT(*) FROM users WHERE 1=1"
-    count_params = []
-    if search:
-        count_query += " AND (username LIKE ? OR real_name LIKE ?)"
-        count_params.extend([f"%{search}%", f"%{search}%"])
-    if role and role != "所有":
-        count_query += " AND role = ?"
-        count_params.append(role)
-    
-    cursor.execute(count_query, count_params)
-    total_count = cursor.fetchone()[0]
-    
-    result = []
-    for user in users:
-        result.append({
-            'id': user[0],
-            'username': user[1],
-            'role': user[2],
-            'email': user[3],
-            'real_name': user[4],
-            'status': user[5],
-            'created_at': user[6],
-            'last_login': user[7]
-        })
-    
-    return result, total_count
 
-def update_user(user_id, username=None, role=None, email=None, real_name=None, status=None):
-    """更新用户信息"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    updates = []
-    params = []
-    
-    if username is not None:
-        updates.append("username = ?")
-        params.append(username)
-    if role is not None:
-        updates.append("role = ?")
-        params.append(role)
-    if email is not None:
-        updates.append("email = ?")
-        params.append(email)
-    if real_name is not None:
-        updates.append("real_name = ?")
-        params.append(real_name)
-    if status is not None:
-        updates.append("status = ?")
-        params.append(status)
-    
-    if updates:
-        params.append(user_id)
-        query = f"UPDATE users SET {', '.join(updates)} WHERE id = ?"
-        cursor.execute(query, params)
-        affected = cursor.rowcount
-        conn.commit()
-        print(f"更新用户 {user_id} 成功，影响行数: {affected}")
-        return affected > 0
-    return False
+def initialize_stats_rollups(cursor, accounts=True):
+    """创建统计汇总表和维护触发器，首次创建时从 bugs 表全量构建"""
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='bug_rollup_daily'")
+    rollups_exist = cursor.fetchone()
 
-def change_user_password(user_id, new_password):
-    """修改用户密码"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    # 生成新的盐值和密码哈希
-    salt = secrets.token_hex(16)
-    password_hash = hashlib.sha256((new_password + salt).encode()).hexdigest()
-    
     cursor.execute('''
-        UPDATE users SET password_hash = ?, salt = ? WHERE id = ?
-    ''', (password_hash, salt, user_id))
-    
-    affected = cursor.rowcount
-    conn.commit()
-    print(f"修改用户 {user_id} 密码成功")
-    return affected > 0
+        CREATE TABLE IF NOT EXISTS bug_rollup_daily (
+            day TEXT NOT NULL,
+            status TEXT NOT NULL,
+            bug_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, status)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS bug_rollup_submitter (
+            submitter TEXT NOT NULL,
+            status TEXT NOT NULL,
+            bug_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (submitter, status)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS bug_rollup_assignee (
+            assignee_id INTEGER PRIMARY KEY,
+            bug_count INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
 
-def delete_user(user_id):
-    """删除用户（软删除）"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    # 检查是否为最后一个管理员
-    cursor.execute('SELECT COUNT(*) FROM users WHERE role = "admin" AND status = "active"')
-    admin_count = cursor.fetchone()[0]
-    
-    cursor.execute('SELECT role FROM users WHERE id = ?', (user_id,))
-    user_role = cursor.fetchone()
-    
-    if user_role and user_role[0] == 'admin' and admin_count <= 1:
-        print(f"无法删除用户 {user_id}，至少需要保留一个管理员账户")
-        return False
-    
-    # 软删除（设置状态为inactive）
-    cursor.execute('UPDATE users SET status = "inactive" WHERE id = ?', (user_id,))
-    affected = cursor.rowcount
-    conn.commit()
-    print(f"删除用户 {user_id} 成功（软删除）")
-    return affected > 0
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_bugs_rollup_insert AFTER INSERT ON bugs
+        BEGIN
+            {_rollup_trigger_body('NEW', 1)}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_bugs_rollup_delete AFTER DELETE ON bugs
+        BEGIN
+            {_rollup_trigger_body('OLD', -1)}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_bugs_rollup_update
+        AFTER UPDATE OF status, submitter, assignee_id, created_at ON bugs
+        BEGIN
+            {_rollup_trigger_body('OLD', -1)}
+            {_rollup_trigger_body('NEW', 1)}
+        END
+    ''')
 
-# BUG相关函数（新增编辑和删除功能）
-def create_bug(title, description, version, region, submitter, assignee_name=None, status='待处理', screenshot=None, log_file=None):
-    """创建BUG，支持研发人员名称分配"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    # 如果分配了研发人员，获取其ID
-    assignee_id = None
-    if assignee_name and assignee_name != "未分配":
-        cursor.execute('SELECT id FROM developers WHERE name = ?', (assignee_name,))
-        result = cursor.fetchone()
-        if result:
-            assignee_id = result[0]
-        else:
-            print(f"警告: 研发人员 {assignee_name} 不存在，使用未分配")
-    
-    print(f"正在插入BUG: {title} by {submitter}, 分配: {assignee_name or '未分配'}")
+    if not rollups_exist:
+        logger.info("创建统计汇总表，正在从bugs表构建...")
+        _rebuild_stats_rollups(cursor)
+
+def _rebuild_stats_rollups(cursor):
+    """清空并按 bugs 表全量重算三张汇总表（不提交事务）"""
+    for table in ROLLUP_TABLES:
+        cursor.execute(f"DELETE FROM {table}")
     cursor.execute('''
-        INSERT INTO bugs (title, description, version, region, submitter, assignee_id, status, screenshot, log_file) 
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (title, description, version, region, submitter, assignee_id, status, screenshot, log_file))
-    
-    bug_id = cursor.lastrowid
-    print(f"插入成功，BUG ID: {bug_id}")
-    
-    conn.commit()
-    print(f"事务已提交，影响行数: {cursor.rowcount}")
-    return bug_id
+        INSERT INTO bug_rollup_daily (day, status, bug_count)
+        SELECT IFNULL(date(created_at), ''), IFNULL(status, ''), COUNT(*)
+        FROM bugs GROUP BY 1, 2
+    ''')
+    cursor.execute('''
+        INSERT INTO bug_rollup_submitter (submitter, status, bug_count)
+        SELECT submitter, IFNULL(status, ''), COUNT(*)
+        FROM bugs GROUP BY 1, 2
+    ''')
+    cursor.execute('''
+        INSERT INTO bug_rollup_assignee (assignee_id, bug_count)
+        SELECT IFNULL(assignee_id, 0), COUNT(*)
+        FROM bugs GROUP BY 1
+    ''')
 
-def update_bug(bug_id, title=None, description=None, version=None, region=None, 
-               status=None, assignee_name=None, screenshot=None, log_file=None):
-    """更新BUG信息"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    updates = []
-    params = []
+def rebuild_stats_rollups():
+    """重建统计汇总表"""
+    with write_connection(invalidates=('bugs',)) as conn:
+        _rebuild_stats_rollups(conn.cursor())
+    logger.info("统计汇总表重建完成")
+    return True
+
+def check_stats_rollups():
+    """将汇总表与 bugs 表全量重算结果比对
+
+    返回不一致项列表 [(表名, 键, 重算值, 汇总表值)]，为空表示一致。
+    """
+    with read_connection() as conn:
+        cursor = conn.cursor()
+
+        checks = [
+            ('bug_rollup_daily',
+             "SELECT IFNULL(date(created_at), ''), IFNULL(status, ''), COUNT(*) FROM bugs GROUP BY 1, 2",
+             "SELECT day, status, bug_count FROM bug_rollup_daily"),
+            ('bug_rollup_submitter',
+             "SELECT submitter, IFNULL(status, ''), COUNT(*) FROM bugs GROUP BY 1, 2",
+             "SELECT submitter, status, bug_count FROM bug_rollup_submitter"),
+            ('bug_rollup_assignee',
+             "SELECT IFNULL(assignee_id, 0), COUNT(*) FROM bugs GROUP BY 1",
+             "SELECT assignee_id, bug_count FROM bug_rollup_assignee"),
+        ]
+
+        mismatches = []
+        for table, recount_query, rollup_query in checks:
+            cursor.execute(recount_query)
+            expected = {tuple(row[:-1]): row[-1] for row in cursor.fetchall()}
+            cursor.execute(rollup_query)
+            actual = {tuple(row[:-1]): row[-1] for row in cursor.fetchall()}
+            for key in sorted(set(expected) | set(actual), key=str):
+                if expected.get(key, 0) != actual.get(key, 0):
+                    mismatches.append((table, key, expected.get(key, 0), actual.get(key, 0)))
+
+        logger.info("统计汇总表一致性检查完成，不一致项: %s", len(mismatches))
+        return mismatches
+
+# 全文搜索：bugs_fts 是 bugs(title, description) 的外部内容FTS5索引，由触发器同步；
+# bug_logs_fts 保存日志附件文本（rowid 即 BUG ID），由写入BUG的函数维护。
+# 使用 trigram 分词器以支持中文任意子串搜索（需要 SQLite 3.34+）。
+
+# 单个日志附件最多索引的字节数
+LOG_INDEX_MAX_BYTES = 1024 * 1024
+# trigram 分词下可走索引的最短搜索词长度，更短的词退化为 LIKE 过滤
+FTS_MIN_TERM_LENGTH = 3
+# 每次搜索参与相关度排序的最多匹配数（按BUG ID取最新的），匹配总数也以此为上限
+SEARCH_MAX_CANDIDATES = 2000
+
+def _create_fts_table(cursor, definition):
+    """创建FTS5表，SQLite 不支持 trigram 时退化为默认分词器"""
+    try:
+        cursor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {definition}, tokenize='trigram')")
+    except sqlite3.OperationalError:
+        logger.warning("当前SQLite不支持trigram分词，全文搜索改用默认分词器")
+        cursor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {definition})")
+
+def _read_log_text(log_file):
+    """读取日志附件用于索引，文件不存在时返回 None"""
+    if not log_file or not os.path.exists(log_file):
+        return None
+    data = read_attachment(log_file, LOG_INDEX_MAX_BYTES)
+    return data.decode('utf-8', errors='replace')
+
+def _index_bug_log(cursor, bug_id, log_file):
+    """更新某个BUG的日志附件索引"""
+    cursor.execute('DELETE FROM bug_logs_fts WHERE rowid = ?', (bug_id,))
+    try:
+        log_text = _read_log_text(log_file)
+    except (OSError, AttachmentDecodeError) as e:
+        logger.warning("读取日志附件 %s 失败，跳过索引: %s", log_file, e)
+        return
+    if log_text:
+        cursor.execute('INSERT INTO bug_logs_fts (rowid, log_text) VALUES (?, ?)', (bug_id, log_text))
+
+def _migrate_bug_fts(cursor, accounts):
+    """创建BUG全文索引及同步触发器，并为已有数据建立索引"""
+    _create_fts_table(cursor, "bugs_fts USING fts5(title, description, content='bugs', content_rowid='id'")
+    _create_fts_table(cursor, "bug_logs_fts USING fts5(log_text")
+
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_bugs_fts_insert AFTER INSERT ON bugs
+        BEGIN
+            INSERT INTO bugs_fts (rowid, title, description) VALUES (NEW.id, NEW.title, NEW.description);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_bugs_fts_delete AFTER DELETE ON bugs
+        BEGIN
+            INSERT INTO bugs_fts (bugs_fts, rowid, title, description)
+            VALUES ('delete', OLD.id, OLD.title, OLD.description);
+            DELETE FROM bug_logs_fts WHERE rowid = OLD.id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_bugs_fts_update AFTER UPDATE OF title, description ON bugs
+        BEGIN
+            INSERT INTO bugs_fts (bugs_fts, rowid, title, description)
+            VALUES ('delete', OLD.id, OLD.title, OLD.description);
+            INSERT INTO bugs_fts (rowid, title, description) VALUES (NEW.id, NEW.title, NEW.description);
+        END
+    ''')
+
+    _rebuild_search_index(cursor)
+
+def _rebuild_search_index(cursor):
+    """从bugs表和日志附件重建全文索引"""
+    logger.info("正在重建BUG全文索引...")
+    cursor.execute("INSERT INTO bugs_fts (bugs_fts) VALUES ('rebuild')")
+    cursor.execute("DELETE FROM bug_logs_fts")
+    cursor.execute("SELECT id, log_file FROM bugs WHERE log_file IS NOT NULL AND log_file != ''")
+    for bug_id, log_file in cursor.fetchall():
+        _index_bug_log(cursor, bug_id, log_file)
+
+def rebuild_search_index():
+    """重建全文索引（日志附件在BUG之外被修改后使用）"""
+    with write_connection(invalidates=('bugs',)) as conn:
+        _rebuild_search_index(conn.cursor())
+    logger.info("全文索引重建完成")
+
+# 姓名子串搜索：name_grams 保存研发人员姓名、用户名和真实姓名的1~3字n-gram，由触发器维护。
+# 1~3个字的搜索词直接按n-gram查找，更长的词取命中最少的3-gram查找后再用 LIKE 校验。
+# 中文姓名多为2~3个字，trigram 分词器无法索引这么短的词，因此这里不用FTS5。
+# 超过 NAME_GRAM_MAX_LENGTH 的姓名另记一个标记，搜索时总是作为候选由 LIKE 校验。
+
+# 姓名中参与建立n-gram的最大长度（超出部分由标记行兜底）
+NAME_GRAM_MAX_LENGTH = 64
+# 姓名超长时记录的标记（n-gram 最多3个字，不会与之重复）
+NAME_GRAM_LONG_MARKER = '<long>'
+# n-gram 的最大长度
+NAME_GRAM_SIZE = 3
+# 搜索词最少的n-gram命中超过表中这一比例的行时，改为顺序扫描
+NAME_SEARCH_SCAN_RATIO = 0.05
+# 探测n-gram命中数时至少读取的条数
+NAME_SEARCH_MIN_PROBE = 500
+
+def _name_gram_select(row, column, extra=''):
+    """某一行某一列全部n-gram的 SELECT 语句（用于触发器），第一列为 gram"""
+    return (f"SELECT lower(substr({row}.{column}, p.pos, p.len)){extra} FROM name_gram_positions p "
+            f"WHERE p.pos + p.len - 1 <= length({row}.{column})")
+
+def _name_gram_trigger_body(entity, row, columns, delta):
+    """插入或删除一行所有列的n-gram（以及超长标记）"""
+    if delta > 0:
+        extra = f", '{entity}', {row}.id"
+        return ''.join(f"INSERT OR IGNORE INTO name_grams (gram, entity, ref_id) "
+                       f"{_name_gram_select(row, column, extra)};"
+                       f"INSERT OR IGNORE INTO name_grams (gram, entity, ref_id) "
+                       f"SELECT '{NAME_GRAM_LONG_MARKER}'{extra} "
+                       f"WHERE length({row}.{column}) > {NAME_GRAM_MAX_LENGTH};"
+                       for column in columns)
+    grams = ' UNION '.join(_name_gram_select(row, column) for column in columns)
+    return (f"DELETE FROM name_grams WHERE entity = '{entity}' AND ref_id = {row}.id "
+            f"AND gram IN ({grams} UNION SELECT '{NAME_GRAM_LONG_MARKER}');")
+
+def _name_gram_tables(accounts):
+    """建立姓名n-gram索引的 [(entity, 表名, 列)]"""
+    name_tables = [('developers', 'developers', ('name',))]
+    if accounts:
+        name_tables.append(('users', 'users', ('username', 'real_name')))
+    return name_tables
+
+def _create_name_gram_triggers(cursor, entity, table, columns):
+    """创建维护某张表姓名n-gram的触发器"""
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_grams_insert AFTER INSERT ON {table}
+        BEGIN
+            {_name_gram_trigger_body(entity, 'NEW', columns, 1)}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_grams_delete AFTER DELETE ON {table}
+        BEGIN
+            {_name_gram_trigger_body(entity, 'OLD', columns, -1)}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_grams_update AFTER UPDATE OF {', '.join(columns)} ON {table}
+        BEGIN
+            {_name_gram_trigger_body(entity, 'OLD', columns, -1)}
+            {_name_gram_trigger_body(entity, 'NEW', columns, 1)}
+        END
+    ''')
+
+def _index_long_names(cursor, entity, table, columns):
+    """为已有的超长姓名补记标记"""
+    for column in columns:
+        cursor.execute(f'''
+            INSERT OR IGNORE INTO name_grams (entity, gram, ref_id)
+            SELECT ?, ?, id FROM {table} WHERE length({column}) > ?
+        ''', (entity, NAME_GRAM_LONG_MARKER, NAME_GRAM_MAX_LENGTH))
+
+def _migrate_name_grams(cursor, accounts):
+    """创建姓名n-gram索引表及同步触发器，并为已有数据建立索引"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS name_gram_positions (
+            pos INTEGER NOT NULL,
+            len INTEGER NOT NULL,
+            PRIMARY KEY (pos, len)
+        ) WITHOUT ROWID
+    ''')
+    cursor.executemany(
+        'INSERT OR IGNORE INTO name_gram_positions (pos, len) VALUES (?, ?)',
+        [(pos, size) for pos in range(1, NAME_GRAM_MAX_LENGTH + 1) for size in range(1, NAME_GRAM_SIZE + 1)
+         if pos + size - 1 <= NAME_GRAM_MAX_LENGTH])
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS name_grams (
+            entity TEXT NOT NULL,
+            gram TEXT NOT NULL,
+            ref_id INTEGER NOT NULL,
+            PRIMARY KEY (entity, gram, ref_id)
+        ) WITHOUT ROWID
+    ''')
+
+    for entity, table, columns in _name_gram_tables(accounts):
+        _create_name_gram_triggers(cursor, entity, table, columns)
+
+        logger.info("正在为 %s 建立姓名n-gram索引...", table)
+        cursor.execute("DELETE FROM name_grams WHERE entity = ?", (entity,))
+        for column in columns:
+            cursor.execute(f'''
+                INSERT OR IGNORE INTO name_grams (entity, gram, ref_id)
+                SELECT '{entity}', lower(substr(t.{column}, p.pos, p.len)), t.id
+                FROM {table} t JOIN name_gram_positions p ON p.pos + p.len - 1 <= length(t.{column})
+            ''')
+        _index_long_names(cursor, entity, table, columns)
+
+    if accounts:
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_created_at ON users (created_at)")
+
+def like_contains_pattern(text):
+    """子串匹配的 LIKE 模式，转义 % 和 _（配合 ESCAPE '\\' 使用）"""
+    return '%' + text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+def build_name_search(cursor, entity, table, text_columns, search):
+    """生成姓名子串搜索的 WHERE 子句，返回 (子句列表, 参数列表, 是否走索引)
+
+    先探测搜索词各个n-gram的命中数（每个最多读 上限 条），用最少的那个走索引，
+    其余由 LIKE 逐行校验；如果连最少的n-gram都命中了表中较大比例的行，
+    逐条回表不如直接顺序扫描，此时只返回校验条件。带超长标记的行（姓名超过
+    NAME_GRAM_MAX_LENGTH）总是与索引命中的行一起作为候选，由 LIKE 校验。
+    """
+    search = search.strip()
+    # 与 SQLite 的 lower() 和 LIKE 一致，只对ASCII字母做大小写折叠
+    term = ''.join(c.lower() if 'A' <= c <= 'Z' else c for c in search)
+    pattern = like_contains_pattern(search)
+    verify = "(" + " OR ".join(f"{column} LIKE ? ESCAPE '\\'" for column in text_columns) + ")"
+    verify_params = [pattern] * len(text_columns)
+
+    if len(term) <= NAME_GRAM_SIZE:
+        grams = [term]
+    else:
+        grams = list(dict.fromkeys(term[i:i + NAME_GRAM_SIZE] for i in range(len(term) - NAME_GRAM_SIZE + 1)))
+
+    cursor.execute(f"SELECT IFNULL(MAX(id), 0) FROM {table}")
+    probe_limit = max(NAME_SEARCH_MIN_PROBE, int(cursor.fetchone()[0] * NAME_SEARCH_SCAN_RATIO))
+    best_gram, best_count = None, probe_limit
+    for gram in grams:
+        cursor.execute('''
+            SELECT COUNT(*) FROM (SELECT 1 FROM name_grams WHERE entity = ? AND gram = ? LIMIT ?)
+        ''', (entity, gram, probe_limit))
+        count = cursor.fetchone()[0]
+        if count < best_count:
+            best_gram, best_count = gram, count
+        if count == 0:
+            break
+
+    if best_gram is None:
+        return [verify], verify_params, False
+    # 超长姓名在 NAME_GRAM_MAX_LENGTH 之后的部分没有n-gram，带标记的行总是作为候选
+    cursor.execute('SELECT 1 FROM name_grams WHERE entity = ? AND gram = ? LIMIT 1',
+                   (entity, NAME_GRAM_LONG_MARKER))
+    if cursor.fetchone():
+        clauses = ["id IN (SELECT ref_id FROM name_grams WHERE entity = ? AND gram IN (?, ?))", verify]
+        return clauses, [entity, best_gram, NAME_GRAM_LONG_MARKER] + verify_params, True
+    clauses = ["id IN (SELECT ref_id FROM name_grams WHERE entity = ? AND gram = ?)"]
+    params = [entity, best_gram]
+    if best_gram != term:
+        clauses.append(verify)
+        params.extend(verify_params)
+    return clauses, params, True
+
+# 附件存储：上传文件按内容哈希只保存一份（见 attachments.py），attachments 表记录每个文件
+# 被 bugs.screenshot / bugs.log_file 引用的次数，由触发器维护。
+
+# 未被引用的附件至少保留的秒数，避免删除刚上传、尚未关联到BUG的文件
+ATTACHMENT_GC_GRACE_SECONDS = 300
+ATTACHMENT_COLUMNS = ('screenshot', 'log_file')
+
+def _attachment_ref_sql(row, delta):
+    """按行中的附件路径增减引用计数"""
+    return ''.join(f"UPDATE attachments SET ref_count = ref_count + ({delta}) WHERE path = {row}.{column};"
+                   for column in ATTACHMENT_COLUMNS)
+
+def _migrate_attachments(cursor, accounts):
+    """创建附件表及引用计数触发器"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS attachments (
+            hash TEXT PRIMARY KEY,
+            path TEXT NOT NULL UNIQUE,
+            size INTEGER NOT NULL,
+            ref_count INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            touched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_attachments_orphans ON attachments (ref_count, touched_at)")
+
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_bugs_attachments_insert AFTER INSERT ON bugs
+        BEGIN
+            {_attachment_ref_sql('NEW', 1)}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_bugs_attachments_delete AFTER DELETE ON bugs
+        BEGIN
+            {_attachment_ref_sql('OLD', -1)}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_bugs_attachments_update AFTER UPDATE OF {', '.join(ATTACHMENT_COLUMNS)} ON bugs
+        BEGIN
+            {_attachment_ref_sql('OLD', -1)}
+            {_attachment_ref_sql('NEW', 1)}
+        END
+    ''')
+
+def _has_unique_index(cursor, table, column):
+    """表上是否已有只包含该列的唯一索引（含 UNIQUE 约束自动创建的索引）"""
+    cursor.execute(f"PRAGMA index_list({table})")
+    for index in cursor.fetchall():
+        name, unique = index[1], index[2]
+        if not unique:
+            continue
+        cursor.execute(f"PRAGMA index_info('{name}')")
+        if [row[2] for row in cursor.fetchall()] == [column]:
+            return True
+    return False
+
+def _migrate_developer_name_index(cursor, accounts):
+    """v7: 研发人员姓名唯一索引（按姓名解析研发人员ID）
+
+    新建的表已有 UNIQUE 约束；旧版本创建的表可能没有，这里补上。已有重名数据时
+    无法建唯一索引，退化为普通索引并记录警告。
+    """
+    if _has_unique_index(cursor, 'developers', 'name'):
+        return
+    cursor.execute("SELECT name FROM developers GROUP BY name HAVING COUNT(*) > 1")
+    duplicates = [row[0] for row in cursor.fetchall()]
+    if duplicates:
+        logger.warning("研发人员姓名存在重复，只能创建普通索引: %s", duplicates)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_developers_name ON developers (name)")
+    else:
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_developers_name ON developers (name)")
+
+def _migrate_user_sessions(cursor, accounts):
+    """v8: 登录会话表（会话ID为主键，按ID查会话只需一次主键查找）"""
+    if not accounts:
+        return
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_sessions (
+            id TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            expires_at INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_sessions_user ON user_sessions (user_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_sessions_expires ON user_sessions (expires_at)")
+
+def _migrate_long_name_markers(cursor, accounts):
+    """v9: 超长姓名的n-gram标记（此前超出 NAME_GRAM_MAX_LENGTH 的部分搜索不到）"""
+    for entity, table, columns in _name_gram_tables(accounts):
+        for suffix in ('insert', 'delete', 'update'):
+            cursor.execute(f"DROP TRIGGER IF EXISTS trg_{table}_grams_{suffix}")
+        _create_name_gram_triggers(cursor, entity, table, columns)
+        _index_long_names(cursor, entity, table, columns)
+
+# 数据库迁移：(版本号, 说明, 迁移函数)，版本号严格递增，迁移函数需幂等；
+# 迁移函数的参数为 (cursor, accounts)，accounts 表示是否为保存用户和登录会话的数据库
+MIGRATIONS = [
+    (1, "基础表结构", _migrate_base_schema),
+    (2, "BUG过滤复合索引", _migrate_filter_indexes),
+    (3, "统计汇总表", initialize_stats_rollups),
+    (4, "BUG全文索引", _migrate_bug_fts),
+    (5, "姓名子串搜索索引", _migrate_name_grams),
+    (6, "附件去重存储", _migrate_attachments),
+    (7, "研发人员姓名唯一索引", _migrate_developer_name_index),
+    (8, "登录会话表", _migrate_user_sessions),
+    (9, "超长姓名搜索标记", _migrate_long_name_markers),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def fetch_page_with_total(cursor, columns, table, clauses, params, order_by, page, page_size,
+                          window_count=False):
+    """用一条查询同时取出当前页和总记录数，返回 (行列表, 总数)
+
+    window_count 为 True 时用 COUNT(*) OVER ()，适合搜索等结果集较小的查询；
+    否则用不相关标量子查询计数（SQLite只计算一次），避免为计数对全表排序。
+    """
+    where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+    offset = (page - 1) * page_size
+    if window_count:
+        query = f"SELECT {columns}, COUNT(*) OVER () FROM {table}{where} ORDER BY {order_by} LIMIT ? OFFSET ?"
+        query_params = list(params) + [page_size, offset]
+    else:
+        query = (f"SELECT {columns}, (SELECT COUNT(*) FROM {table}{where}) FROM {table}{where} "
+                 f"ORDER BY {order_by} LIMIT ? OFFSET ?")
+        query_params = list(params) * 2 + [page_size, offset]
+    cursor.execute(query, query_params)
+    rows = cursor.fetchall()
+    if rows:
+        return [row[:-1] for row in rows], rows[0][-1]
+    if page > 1:
+        # 页码超出范围时没有行可以携带总数，单独计数
+        cursor.execute(f"SELECT COUNT(*) FROM {table}{where}", params)
+        return [], cursor.fetchone()[0]
+    return [], 0
+
+# 研发人员管理函数
+def create_developer(name, email=None, role='开发工程师', status='活跃'):
+    """创建新研发人员"""
+    with write_connection(invalidates=('developers',)) as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute('''
+                INSERT INTO developers (name, email, role, status) 
+                VALUES (?, ?, ?, ?)
+            ''', (name, email, role, status))
+            dev_id = cursor.lastrowid
+            logger.info("创建研发人员成功: %s, ID: %s", name, dev_id)
+            return dev_id
+        except sqlite3.IntegrityError as e:
+            logger.warning("创建研发人员失败: %s", e)
+            return None
+
+@cached('developers')
+def get_developers(search=None, role=None, status=None, page=1, page_size=10):
+    """获取研发人员列表，支持搜索、分页、过滤"""
+    with read_connection() as conn:
+        cursor = conn.cursor()
+    
+        clauses = []
+        params = []
+    
+        # 搜索条件（姓名子串，走 name_grams 索引）
+        search_indexed = False
+        if search:
+            search_clauses, search_params, search_indexed = build_name_search(cursor, 'developers', 'developers', ('name',), search)
+            clauses.extend(search_clauses)
+            params.extend(search_params)
+    
+        if role and role != "所有":
+            clauses.append("role = ?")
+            params.append(role)
+    
+        if status and status != "所有":
+            clauses.append("status = ?")
+            params.append(status)
+    
+        developers, total_count = fetch_page_with_total(
+            cursor, "id, name, email, role, status, created_at", "developers", clauses, params,
+            "name ASC", page, page_size, window_count=search_indexed)
+    
+        result = []
+        for dev in developers:
+            result.append({
+                'id': dev[0],
+                'name': dev[1],
+                'email': dev[2],
+                'role': dev[3],
+                'status': dev[4],
+                'created_at': dev[5]
+            })
+    
+        logger.debug("查询到 %s / %s 条研发人员记录", len(result), total_count)
+        return result, total_count
+
+# 表示“未分配”的研发人员ID（自增主键从1开始，不会与真实ID冲突）
+UNASSIGNED_ID = 0
+
+@cached('developers')
+def get_developer_directory():
+    """全部研发人员的姓名/ID对照表，返回 {'by_id': {id: 研发人员}, 'by_name': {姓名: id}}
+
+    结果随查询缓存保存在进程内，研发人员增删改时随 developers 表一起失效；
+    写BUG时据此把姓名解析为ID，不必每次查询 developers 表。
+    """
+    with read_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT id, name, email, role, status, created_at FROM developers ORDER BY name')
+        by_id = {}
+        for row in cursor.fetchall():
+            by_id[row[0]] = {
+                'id': row[0],
+                'name': row[1],
+                'email': row[2],
+                'role': row[3],
+                'status': row[4],
+                'created_at': row[5]
+            }
+        return {'by_id': by_id, 'by_name': {dev['name']: dev_id for dev_id, dev in by_id.items()}}
+
+def resolve_assignee(assignee_id=None, assignee_name=None):
+    """把分配参数解析为 assignee_id 列的值
+
+    优先使用 assignee_id（UNASSIGNED_ID 表示未分配），否则按姓名查找（"未分配" 或空表示未分配）。
+    研发人员不存在时记录警告并返回 None（未分配）。
+    """
+    directory = get_developer_directory()
+    if assignee_id is not None:
+        if assignee_id == UNASSIGNED_ID:
+            return None
+        if assignee_id in directory['by_id']:
+            return assignee_id
+        logger.warning("研发人员ID %s 不存在，使用未分配", assignee_id)
+        return None
+    if assignee_name and assignee_name != "未分配":
+        dev_id = directory['by_name'].get(assignee_name)
+        if dev_id is None:
+            logger.warning("研发人员 %s 不存在，使用未分配", assignee_name)
+        return dev_id
+    return None
+
+def get_developer_by_id(dev_id):
+    """根据ID获取单个研发人员"""
+    with read_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, name, email, role, status, created_at 
+            FROM developers WHERE id = ?
+        ''', (dev_id,))
+        row = cursor.fetchone()
+        if row:
+            return {
+                'id': row[0],
+                'name': row[1],
+                'email': row[2],
+                'role': row[3],
+                'status': row[4],
+                'created_at': row[5]
+            }
+        return None
+
+def update_developer(dev_id, name=None, email=None, role=None, status=None):
+    """更新研发人员信息"""
+    with write_connection(invalidates=('developers',)) as conn:
+        cursor = conn.cursor()
+    
+        updates = []
+        params = []
+    
+        if name is not None:
+            updates.append("name = ?")
+            params.append(name)
+        if email is not None:
+            updates.append("email = ?")
+            params.append(email)
+        if role is not None:
+            updates.append("role = ?")
+            params.append(role)
+        if status is not None:
+            updates.append("status = ?")
+            params.append(status)
+    
+        if updates:
+            params.append(dev_id)
+            query = f"UPDATE developers SET {', '.join(updates)} WHERE id = ?"
+            cursor.execute(query, params)
+            affected = cursor.rowcount
+            logger.info("更新研发人员 %s 成功，影响行数: %s", dev_id, affected)
+            return affected > 0
+        return False
+
+# 分配给某个研发人员的BUG数
+DEVELOPER_BUG_COUNT_SQL = 'SELECT COUNT(*) FROM bugs WHERE assignee_id = ?'
+
+def delete_developer(dev_id):
+    """删除研发人员（级联检查）"""
+    with write_connection(invalidates=('developers',)) as conn:
+        cursor = conn.cursor()
     
-    if title is not None:
-        updates.append("title = ?")
-        params.append(title)
-    if description is not None:
-        updates.append("description = ?")
-        params.append(description)
-    if version is not None:
-        updates.append("version = ?")
-        params.append(version)
-    if region is not None:
-        updates.append("region = ?")
-        params.append(region)
-    if status is not None:
-        updates.append("status = ?")
-        params.append(status)
-        if status == "已解决":
-            updates.append("resolved_at = CURRENT_TIMESTAMP")
-    if screenshot is not None:
-        updates.append("screenshot = ?")
-        params.append(screenshot)
-    if log_file is not None:
-        updates.append("log_file = ?")
-        params.append(log_file)
-    
-    # 处理研发人员分配
-    if assignee_name is not None:
-        assignee_id = None
-        if assignee_name and assignee_name != "未分配":
-            cursor.execute('SELECT id FROM developers WHERE name = ?', (assignee_name,))
-            result = cursor.fetchone()
-            if result:
-                assignee_id = result[0]
-        
-        updates.append("assignee_id = ?")
-        params.append(assignee_id)
+        # 检查是否有BUG分配给该研发人员
+        cursor.execute(DEVELOPER_BUG_COUNT_SQL, (dev_id,))
+        bug_count = cursor.fetchone()[0]
     
-    if updates:
-        params.append(bug_id)
-        query = f"UPDATE bugs SET {', '.join(updates)} WHERE id = ?"
-        cursor.execute(query, params)
+        if bug_count > 0:
+            logger.warning("无法删除研发人员 %s，还有 %s 个BUG分配给该人员", dev_id, bug_count)
+            return False
+    
+        # 删除研发人员
+        cursor.execute('DELETE FROM developers WHERE id = ?', (dev_id,))
         affected = cursor.rowcount
-        conn.commit()
-        print(f"更新BUG {bug_id} 成功，影响行数: {affected}")
+        logger.info("删除研发人员 %s 成功，影响行数: %s", dev_id, affected)
         return affected > 0
-    return False
 
-def delete_bug(bug_id):
-    """删除BUG"""
-    conn = get_connection()
-    cursor = conn.cursor()
+# 用户认证和权限管理函数
+def create_user(username, password, role='tester', email=None, real_name=None):
+    """创建新用户"""
+    # 哈希计算较慢，在写事务之外完成
+    password_hash = hash_password(password)
+    with write_connection(invalidates=('users',), project=ACCOUNTS_PROJECT) as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute('''
+                INSERT INTO users (username, password_hash, salt, role, email, real_name) 
+                VALUES (?, ?, '', ?, ?, ?)
+            ''', (username, password_hash, role, email, real_name))
+        
+            user_id = cursor.lastrowid
+            logger.info("创建用户成功: %s, ID: %s", username, user_id)
+            return user_id
+        except sqlite3.IntegrityError as e:
+            logger.warning("创建用户失败: %s", e)
+            return None
+
+def authenticate_user(username, password):
+    """用户认证
+
+    密码验证在 passwords 模块的线程池中执行，期间不占用数据库连接；
+    旧格式或强度低于当前配置的哈希在验证成功后重新生成。最后登录时间由 record_last_login 批量写入。
+    """
+    with read_connection(ACCOUNTS_PROJECT) as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, username, password_hash, salt, role, email, real_name, status 
+            FROM users WHERE username = ? AND status = 'active'
+        ''', (username,))
+        user = cursor.fetchone()
+
+    if not user:
+        check_dummy_password(password)
+        logger.warning("用户 %s 认证失败", username)
+        return None
+
+    user_id, username, stored_hash, salt, role, email, real_name, status = user
+    matched, needs_rehash = check_password(password, stored_hash, salt)
+    if not matched:
+        logger.warning("用户 %s 认证失败", username)
+        return None
+
+    if needs_rehash:
+        new_hash = hash_password(password)
+        with write_connection(invalidates=('users',), project=ACCOUNTS_PROJECT) as conn:
+            # 仅当哈希未被同时修改时升级
+            conn.execute('''
+                UPDATE users SET password_hash = ?, salt = '' WHERE id = ? AND password_hash = ?
+            ''', (new_hash, user_id, stored_hash))
+        logger.info("用户 %s 的密码哈希已升级为 %s", username, new_hash.split('$', 1)[0])
+    record_last_login(user_id)
+
+    logger.info("用户 %s 登录成功", username)
+    return {
+        'id': user_id,
+        'username': username,
+        'role': role,
+        'email': email,
+        'real_name': real_name
+    }
+
+def get_user_by_id(user_id):
+    """根据ID获取用户信息"""
+    with read_connection(ACCOUNTS_PROJECT) as conn:
+        cursor = conn.cursor()
     
-    # 获取BUG信息用于日志
-    cursor.execute('SELECT title, submitter FROM bugs WHERE id = ?', (bug_id,))
-    bug_info = cursor.fetchone()
+        cursor.execute('''
+            SELECT id, username, role, email, real_name, status, created_at, last_login 
+            FROM users WHERE id = ?
+        ''', (user_id,))
+    
+        row = cursor.fetchone()
+        if row:
+            return {
+                'id': row[0],
+                'username': row[1],
+                'role': row[2],
+                'email': row[3],
+                'real_name': row[4],
+                'status': row[5],
+                'created_at': row[6],
+                'last_login': row[7]
+            }
+        return None
+
+# 最后登录时间批量写入的间隔（秒）
+LAST_LOGIN_FLUSH_INTERVAL = float(os.environ.get('BUG_LAST_LOGIN_FLUSH_INTERVAL', '30'))
+
+# 待写入的最后登录时间: 用户ID -> UTC 时间
+_pending_logins = {}
+_pending_logins_lock = threading.Lock()
+_login_flush_timer = None
+
+def record_last_login(user_id):
+    """记录登录时间，LAST_LOGIN_FLUSH_INTERVAL 秒内的登录合并成一次写入"""
+    global _login_flush_timer
+    with _pending_logins_lock:
+        _pending_logins[user_id] = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        if _login_flush_timer is None:
+            _login_flush_timer = threading.Timer(LAST_LOGIN_FLUSH_INTERVAL, flush_last_logins)
+            _login_flush_timer.daemon = True
+            _login_flush_timer.start()
+
+def flush_last_logins():
+    """把待写入的登录时间一次性写入 users 表，返回写入的用户数"""
+    global _login_flush_timer
+    with _pending_logins_lock:
+        pending = list(_pending_logins.items())
+        _pending_logins.clear()
+        if _login_flush_timer is not None:
+            _login_flush_timer.cancel()
+            _login_flush_timer = None
+    if not pending:
+        return 0
+    try:
+        with write_connection(invalidates=('users',), project=ACCOUNTS_PROJECT) as conn:
+            conn.executemany('UPDATE users SET last_login = ? WHERE id = ?',
+                             [(login_time, user_id) for user_id, login_time in pending])
+    except sqlite3.Error as e:
+        logger.warning("写入最后登录时间失败: %s", e)
+        return 0
+    logger.debug("写入 %s 个用户的最后登录时间", len(pending))
+    return len(pending)
+
+# 退出前写入尚未写入的登录时间
+atexit.register(flush_last_logins)
+
+def create_session_record(session_id, user_id, expires_at):
+    """保存登录会话（expires_at 为 Unix 时间戳），顺带清除已过期的会话"""
+    with write_connection(project=ACCOUNTS_PROJECT) as conn:
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM user_sessions WHERE expires_at <= ?', (int(time.time()),))
+        cursor.execute('INSERT INTO user_sessions (id, user_id, expires_at) VALUES (?, ?, ?)',
+                       (session_id, user_id, expires_at))
+
+# 按会话ID取出登录用户
+SESSION_USER_SQL = '''
+    SELECT u.id, u.username, u.role, u.email, u.real_name
+    FROM user_sessions s JOIN users u ON u.id = s.user_id
+    WHERE s.id = ? AND s.expires_at > ? AND u.status = 'active'
+'''
+
+def get_session_user_record(session_id):
+    """按会话ID取出登录用户（一次主键查找），会话不存在、已过期或用户已停用时返回 None"""
+    with read_connection(ACCOUNTS_PROJECT) as conn:
+        cursor = conn.cursor()
+        cursor.execute(SESSION_USER_SQL, (session_id, int(time.time())))
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    return {
+        'id': row[0],
+        'username': row[1],
+        'role': row[2],
+        'email': row[3],
+        'real_name': row[4]
+    }
+
+def delete_session_record(session_id):
+    """删除登录会话（注销）"""
+    with write_connection(project=ACCOUNTS_PROJECT) as conn:
+        conn.execute('DELETE FROM user_sessions WHERE id = ?', (session_id,))
+
+def delete_user_session_records(user_id):
+    """删除某个用户的全部登录会话，返回删除的数量"""
+    with write_connection(project=ACCOUNTS_PROJECT) as conn:
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM user_sessions WHERE user_id = ?', (user_id,))
+        return cursor.rowcount
+
+@cached('users', scope=ACCOUNTS_PROJECT)
+def get_all_users(search=None, role=None, page=1, page_size=10):
+    """获取用户列表"""
+    with read_connection(ACCOUNTS_PROJECT) as conn:
+        cursor = conn.cursor()
+    
+        clauses = []
+        params = []
+    
+        # 搜索条件（用户名或真实姓名子串，走 name_grams 索引）
+        search_indexed = False
+        if search:
+            search_clauses, search_params, search_indexed = build_name_search(cursor, 'users', 'users', ('username', 'real_name'), search)
+            clauses.extend(search_clauses)
+            params.extend(search_params)
+    
+        if role and role != "所有":
+            clauses.append("role = ?")
+            params.append(role)
+    
+        users, total_count = fetch_page_with_total(
+            cursor, "id, username, role, email, real_name, status, created_at, last_login", "users",
+            clauses, params, "created_at DESC", page, page_size, window_count=search_indexed)
+    
+        result = []
+        for user in users:
+            result.append({
+                'id': user[0],
+                'username': user[1],
+                'role': user[2],
+                'email': user[3],
+                'real_name': user[4],
+                'status': user[5],
+                'created_at': user[6],
+                'last_login': user[7]
+            })
+    
+        return result, total_count
+
+def update_user(user_id, username=None, role=None, email=None, real_name=None, status=None):
+    """更新用户信息"""
+    with write_connection(invalidates=('users',), project=ACCOUNTS_PROJECT) as conn:
+        cursor = conn.cursor()
+    
+        updates = []
+        params = []
+    
+        if username is not None:
+            updates.append("username = ?")
+            params.append(username)
+        if role is not None:
+            updates.append("role = ?")
+            params.append(role)
+        if email is not None:
+            updates.append("email = ?")
+            params.append(email)
+        if real_name is not None:
+            updates.append("real_name = ?")
+            params.append(real_name)
+        if status is not None:
+            updates.append("status = ?")
+            params.append(status)
+    
+        if updates:
+            params.append(user_id)
+            query = f"UPDATE users SET {', '.join(updates)} WHERE id = ?"
+            cursor.execute(query, params)
+            affected = cursor.rowcount
+            logger.info("更新用户 %s 成功，影响行数: %s", user_id, affected)
+            return affected > 0
+        return False
+
+def change_user_password(user_id, new_password):
+    """修改用户密码"""
+    password_hash = hash_password(new_password)
+    with write_connection(invalidates=('users',), project=ACCOUNTS_PROJECT) as conn:
+        cursor = conn.cursor()
+    
+        cursor.execute('''
+            UPDATE users SET password_hash = ?, salt = '' WHERE id = ?
+        ''', (password_hash, user_id))
     
-    if bug_info:
-        cursor.execute('DELETE FROM bugs WHERE id = ?', (bug_id,))
         affected = cursor.rowcount
-        conn.commit()
-        print(f"删除BUG {bug_id} ({bug_info[0]}) 成功，影响行数: {affected}")
+        logger.info("修改用户 %s 密码成功", user_id)
         return affected > 0
-    else:
-        print(f"BUG {bug_id} 不存在")
-        return False
 
-def get_user_submitted_bugs(submitter_name):
-    """获取用户提交的BUG列表"""
-    conn = get_connection()
-    cursor = conn.cursor()
+def delete_user(user_id):
+    """删除用户（软删除）"""
+    with write_connection(invalidates=('users',), project=ACCOUNTS_PROJECT) as conn:
+        cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT b.id, b.title, b.version, b.region, b.submitter, b.status, b.created_at,
-               d.name as assignee_name
-        FROM bugs b 
-        LEFT JOIN developers d ON b.assignee_id = d.id 
-        WHERE b.submitter = ?
-        ORDER BY b.created_at DESC
-    ''', (submitter_name,))
+        # 检查是否为最后一个管理员
+        cursor.execute('SELECT COUNT(*) FROM users WHERE role = "admin" AND status = "active"')
+        admin_count = cursor.fetchone()[0]
     
-    rows = cursor.fetchall()
-    result = [
-        {
-            'id': row[0],
-            'title': row[1],
-            'version': row[2],
-            'region': row[3],
-            'submitter': row[4],
-            'status': row[5],
-            'created_at': row[6],
-            'assignee': row[7] or '未分配'
-        } for row in rows
-    ]
+        cursor.execute('SELECT role FROM users WHERE id = ?', (user_id,))
+        user_role = cursor.fetchone()
+    
+        if user_role and user_role[0] == 'admin' and admin_count <= 1:
+            logger.warning("无法删除用户 %s，至少需要保留一个管理员账户", user_id)
+            return False
     
-    print(f"查询到用户 {submitter_name} 提交的 {len(result)} 条BUG记录")
-    return result
+        # 软删除（设置状态为inactive）
+        cursor.execute('UPDATE users SET status = "inactive" WHERE id = ?', (user_id,))
+        affected = cursor.rowcount
+        logger.info("删除用户 %s 成功（软删除）", user_id)
+        return affected > 0
 
-def get_developer_assigned_bugs(developer_name):
-    """获取分配给指定研发人员的BUG列表"""
-    conn = get_connection()
-    cursor = conn.cursor()
+# BUG相关函数（新增编辑和删除功能）
+def create_bug(title, description, version, region, submitter, assignee_name=None, status='待处理', screenshot=None, log_file=None,
+               assignee_id=None):
+    """创建BUG，研发人员可以按ID（assignee_id）或名称（assignee_name）分配"""
+    # 在写事务之外解析研发人员（通常命中研发人员对照表缓存）
+    assignee_id = resolve_assignee(assignee_id, assignee_name)
+    with write_connection(invalidates=('bugs',)) as conn:
+        cursor = conn.cursor()
+    
+        logger.debug("正在插入BUG: %s by %s, 分配: %s", title, submitter, assignee_id or '未分配')
+        cursor.execute('''
+            INSERT INTO bugs (title, description, version, region, submitter, assignee_id, status, screenshot, log_file) 
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (title, description, version, region, submitter, assignee_id, status, screenshot, log_file))
     
-    cursor.execute('''
-        SELECT b.id, b.title, b.version, b.region, b.submitter, b.status, b.created_at,
-               d.name as assignee_name
-        FROM bugs b 
-        JOIN developers d ON b.assignee_id = d.id 
-        WHERE d.name = ?
-        ORDER BY b.created_at DESC
-    ''', (developer_name,))
+        bug_id = cursor.lastrowid
+        if log_file:
+            _index_bug_log(cursor, bug_id, log_file)
+        logger.debug("插入成功，BUG ID: %s", bug_id)
     
-    rows = cursor.fetchall()
-    result = [
-        {
-            'id': row[0],
-            'title': row[1],
-            'version': row[2],
-            'region': row[3],
-            'submitter': row[4],
-            'status': row[5],
-            'created_at': row[6],
-            'assignee': row[7]
-        } for row in rows
-    ]
+    logger.debug("事务已提交，BUG ID: %s", bug_id)
+    return bug_id
+
+# 批量导入每次 executemany 的行数
+BULK_IMPORT_BATCH_SIZE = 5000
+# 批量导入每个事务的行数（事务之间释放写锁，界面上的写操作不会被长时间阻塞）
+BULK_IMPORT_TRANSACTION_ROWS = 100000
+# 批量导入接受的字段（assignee 为研发人员姓名，也可以直接给 assignee_id）
+BULK_IMPORT_FIELDS = ('title', 'description', 'version', 'region', 'submitter', 'assignee', 'assignee_id',
+                      'status', 'screenshot', 'log_file', 'created_at', 'resolved_at')
+
+_BULK_INSERT_SQL = '''
+    INSERT INTO bugs (title, description, version, region, submitter, assignee_id, status,
+                      screenshot, log_file, created_at, resolved_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), ?)
+'''
+
+# 批量导入时暂停、改为按批维护的插入触发器（在导入事务内删除，提交前按原定义重建）
+BULK_DEFERRED_TRIGGERS = ('trg_bugs_rollup_insert', 'trg_bugs_fts_insert')
+# 统计汇总表: (表名, 主键列, 从 bugs 行计算主键的表达式)，与 _rollup_trigger_body 一致
+_BULK_ROLLUPS = (
+    ('bug_rollup_daily', ('day', 'status'), "IFNULL(date(created_at), ''), IFNULL(status, '')"),
+    ('bug_rollup_submitter', ('submitter', 'status'), "submitter, IFNULL(status, '')"),
+    ('bug_rollup_assignee', ('assignee_id',), "IFNULL(assignee_id, 0)"),
+)
+
+def _insert_bug_batch(cursor, batch):
+    """插入一批BUG；带日志附件的行逐条插入，以便按新ID建立日志全文索引"""
+    plain = [row for row in batch if not row[8]]
+    if plain:
+        cursor.executemany(_BULK_INSERT_SQL, plain)
+    for row in batch:
+        if row[8]:
+            cursor.execute(_BULK_INSERT_SQL, row)
+            _index_bug_log(cursor, cursor.lastrowid, row[8])
+
+def _suspend_triggers(cursor, names):
+    """删除触发器并返回 {名称: 定义}，须在事务内调用，提交前用 _restore_triggers 重建"""
+    placeholders = ', '.join('?' for _ in names)
+    cursor.execute(f"SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name IN ({placeholders})",
+                   names)
+    definitions = dict(cursor.fetchall())
+    for name in definitions:
+        cursor.execute(f"DROP TRIGGER {name}")
+    return definitions
+
+def _restore_triggers(cursor, definitions):
+    for definition in definitions.values():
+        cursor.execute(definition)
+
+def _apply_deferred_insert_triggers(cursor, suspended, after_id):
+    """对 id > after_id 的新行一次性完成被暂停的插入触发器的工作"""
+    if 'trg_bugs_rollup_insert' in suspended:
+        for table, keys, expressions in _BULK_ROLLUPS:
+            columns = ', '.join(keys)
+            group_by = ', '.join(str(index) for index in range(1, len(keys) + 1))
+            match = ' AND '.join(f"n.{key} = {table}.{key}" for key in keys)
+            cursor.execute(f"CREATE TEMP TABLE bulk_{table} ({columns}, bug_count, PRIMARY KEY ({columns}))")
+            cursor.execute(f'''
+                INSERT INTO temp.bulk_{table}
+                SELECT {expressions}, COUNT(*) FROM bugs WHERE id > ? GROUP BY {group_by}
+            ''', (after_id,))
+            cursor.execute(f"INSERT OR IGNORE INTO {table} ({columns}, bug_count) SELECT {columns}, 0 FROM temp.bulk_{table}")
+            cursor.execute(f'''
+                UPDATE {table}
+                SET bug_count = bug_count + (SELECT n.bug_count FROM temp.bulk_{table} n WHERE {match})
+                WHERE ({columns}) IN (SELECT {columns} FROM temp.bulk_{table})
+            ''')
+            cursor.execute(f"DROP TABLE temp.bulk_{table}")
+    if 'trg_bugs_fts_insert' in suspended:
+        cursor.execute('''
+            INSERT INTO bugs_fts (rowid, title, description)
+            SELECT id, title, description FROM bugs WHERE id > ?
+        ''', (after_id,))
+
+def bulk_import_bugs(bugs, batch_size=BULK_IMPORT_BATCH_SIZE, transaction_rows=BULK_IMPORT_TRANSACTION_ROWS,
+                     progress=None, on_error=None):
+    """批量导入BUG，返回 {'rows': 导入行数, 'seconds': 耗时, 'rows_per_sec': 每秒行数,
+    'unknown_assignees': {不存在的研发人员姓名: 行数}, 'skipped': 跳过的行数}
+
+    bugs 为字典的可迭代对象，键见 BULK_IMPORT_FIELDS，title 之外均可省略；created_at 省略时
+    使用当前时间。研发人员姓名通过预先加载的对照表解析，不存在的记为未分配。
+    assignee_id 与 create_bug 一样按对照表校验（UNASSIGNED_ID 表示未分配），不存在的研发人员ID
+    不写入：该行跳过，并在从 bugs 取出该行后立即调用 on_error(记录, 错误信息)。
+
+    每 batch_size 行执行一次 executemany，每 transaction_rows 行提交一次。事务内暂停统计汇总和
+    全文索引的逐行触发器，提交前对本事务的新行按批更新后重建触发器，其他连接看到的始终是
+    一致的结果。导入期间写连接的 synchronous 设为 OFF（断电时可能丢失最近的事务，但不会
+    损坏数据库），结束后恢复。progress(已导入行数) 在每个事务提交后调用。
+    """
+    start = time.perf_counter()
+    directory = get_developer_directory()
+    developer_ids = dict(directory['by_name'])
+    known_developer_ids = frozenset(directory['by_id'])
+    unknown_assignees = {}
+    total = 0
+    skipped = 0
+    bugs = iter(bugs)
+    finished = False
+
+    while not finished:
+        with write_connection(invalidates=('bugs',)) as conn:
+            conn.execute("PRAGMA synchronous = OFF")
+            try:
+                # 显式开启事务，使删除/重建触发器与插入在同一事务中
+                conn.execute('BEGIN IMMEDIATE')
+                cursor = conn.cursor()
+                cursor.execute('SELECT IFNULL(MAX(id), 0) FROM bugs')
+                after_id = cursor.fetchone()[0]
+                suspended = _suspend_triggers(cursor, BULK_DEFERRED_TRIGGERS)
+
+                in_transaction = 0
+                batch = []
+                while in_transaction < transaction_rows:
+                    bug = next(bugs, None)
+                    if bug is None:
+                        finished = True
+                        break
+                    assignee_id = bug.get('assignee_id')
+                    assignee = bug.get('assignee')
+                    if assignee_id == UNASSIGNED_ID:
+                        assignee_id = None
+                    elif assignee_id is not None and assignee_id not in known_developer_ids:
+                        skipped += 1
+                        if on_error:
+                            on_error(bug, f"研发人员ID {assignee_id} 不存在")
+                        continue
+                    elif assignee_id is None and assignee and assignee != "未分配":
+                        assignee_id = developer_ids.get(assignee)
+                        if assignee_id is None:
+                            unknown_assignees[assignee] = unknown_assignees.get(assignee, 0) + 1
+                    batch.append((bug['title'], bug.get('description') or '', bug.get('version') or '',
+                                  bug.get('region') or '', bug.get('submitter') or '', assignee_id,
+                                  bug.get('status') or '待处理', bug.get('screenshot') or None,
+                                  bug.get('log_file') or None, bug.get('created_at') or None,
+                                  bug.get('resolved_at') or None))
+                    in_transaction += 1
+                    if len(batch) >= batch_size:
+                        _insert_bug_batch(cursor, batch)
+                        batch = []
+                if batch:
+                    _insert_bug_batch(cursor, batch)
+
+                if in_transaction:
+                    _apply_deferred_insert_triggers(cursor, suspended, after_id)
+                _restore_triggers(cursor, suspended)
+                conn.commit()
+            finally:
+                # synchronous 不能在事务中修改，出错时先回滚（连同删除的触发器）
+                if conn.in_transaction:
+                    conn.rollback()
+                conn.execute("PRAGMA synchronous = NORMAL")
+        total += in_transaction
+        if in_transaction and progress:
+            progress(total)
+
+    seconds = time.perf_counter() - start
+    if unknown_assignees:
+        logger.warning("批量导入时以下研发人员不存在，已设为未分配: %s", unknown_assignees)
+    if skipped:
+        logger.warning("批量导入跳过研发人员ID不存在的行 %s 条", skipped)
+    logger.info("批量导入BUG %s 条，耗时 %.1f 秒", total, seconds)
+    return {
+        'rows': total,
+        'seconds': seconds,
+        'rows_per_sec': total / seconds if seconds > 0 else 0.0,
+        'unknown_assignees': unknown_assignees,
+        'skipped': skipped,
+    }
+
+def update_bug(bug_id, title=None, description=None, version=None, region=None, 
+               status=None, assignee_name=None, screenshot=None, log_file=None, assignee_id=None):
+    """更新BUG信息，值为 None 的字段不修改
+
+    研发人员按 assignee_id（UNASSIGNED_ID 表示取消分配）或 assignee_name（"未分配" 表示取消分配）指定。
+    """
+    change_assignee = assignee_id is not None or assignee_name is not None
+    if change_assignee:
+        assignee_id = resolve_assignee(assignee_id, assignee_name)
+    with write_connection(invalidates=('bugs',)) as conn:
+        cursor = conn.cursor()
+    
+        updates = []
+        params = []
+    
+        if title is not None:
+            updates.append("title = ?")
+            params.append(title)
+        if description is not None:
+            updates.append("description = ?")
+            params.append(description)
+        if version is not None:
+            updates.append("version = ?")
+            params.append(version)
+        if region is not None:
+            updates.append("region = ?")
+            params.append(region)
+        if status is not None:
+            updates.append("status = ?")
+            params.append(status)
+            if status == "已解决":
+                updates.append("resolved_at = CURRENT_TIMESTAMP")
+        if screenshot is not None:
+            updates.append("screenshot = ?")
+            params.append(screenshot)
+        if log_file is not None:
+            updates.append("log_file = ?")
+            params.append(log_file)
+    
+        # 处理研发人员分配
+        if change_assignee:
+            updates.append("assignee_id = ?")
+            params.append(assignee_id)
+    
+        if updates:
+            params.append(bug_id)
+            query = f"UPDATE bugs SET {', '.join(updates)} WHERE id = ?"
+            cursor.execute(query, params)
+            affected = cursor.rowcount
+            if affected and log_file is not None:
+                _index_bug_log(cursor, bug_id, log_file)
+            logger.info("更新BUG %s 成功，影响行数: %s", bug_id, affected)
+            return affected > 0
+        return False
+
+def delete_bug(bug_id):
+    """删除BUG"""
+    with write_connection(invalidates=('bugs',)) as conn:
+        cursor = conn.cursor()
     
-    print(f"查询到分配给 {developer_name} 的 {len(result)} 条BUG记录")
-    return result
-    """创建新BUG，支持研发人员名称分配"""
-    conn = get_connection()
-    cursor = conn.cursor()
+        # 获取BUG信息用于日志
+        cursor.execute('SELECT title, submitter FROM bugs WHERE id = ?', (bug_id,))
+        bug_info = cursor.fetchone()
     
-    # 如果分配了研发人员，获取其ID
-    assignee_id = None
-    if assignee_name and assignee_name != "未分配":
-        cursor.execute('SELECT id FROM developers WHERE name = ?', (assignee_name,))
-        result = cursor.fetchone()
-        if result:
-            assignee_id = result[0]
-        else:
-            print(f"警告: 研发人员 {assignee_name} 不存在，使用未分配")
+        if not bug_info:
+            logger.debug("BUG %s 不存在", bug_id)
+            return False
     
-    print(f"正在插入BUG: {title} by {submitter}, 分配: {assignee_name or '未分配'}")
-    cursor.execute('''
-        INSERT INTO bugs (title, description, version, region, submitter, assignee_id, status, screenshot, log_file) 
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (title, description, version, region, submitter, assignee_id, status, screenshot, log_file))
+        # 删除触发器会减少附件引用计数
+        cursor.execute('DELETE FROM bugs WHERE id = ?', (bug_id,))
+        affected = cursor.rowcount
+        logger.info("删除BUG %s (%s) 成功，影响行数: %s", bug_id, bug_info[0], affected)
     
-    bug_id = cursor.lastrowid
-    print(f"插入成功，BUG ID: {bug_id}")
+    collect_orphan_attachments()
+    return affected > 0
+
+# 某个用户提交的BUG
+USER_SUBMITTED_BUGS_SQL = '''
+    SELECT b.id, b.title, b.version, b.region, b.submitter, b.status, b.created_at,
+           d.name as assignee_name
+    FROM bugs b
+    LEFT JOIN developers d ON b.assignee_id = d.id
+    WHERE b.submitter = ?
+    ORDER BY b.created_at DESC
+'''
+
+def get_user_submitted_bugs(submitter_name):
+    """获取用户提交的BUG列表"""
+    with read_connection() as conn:
+        cursor = conn.cursor()
+    
+        cursor.execute(USER_SUBMITTED_BUGS_SQL, (submitter_name,))
+    
+        rows = cursor.fetchall()
+        result = [
+            {
+                'id': row[0],
+                'title': row[1],
+                'version': row[2],
+                'region': row[3],
+                'submitter': row[4],
+                'status': row[5],
+                'created_at': row[6],
+                'assignee': row[7] or '未分配'
+            } for row in rows
+        ]
     
-    conn.commit()
-    print(f"事务已提交，影响行数: {cursor.rowcount}")
-    return bug_id
+        logger.debug("查询到用户 %s 提交的 %s 条BUG记录", submitter_name, len(result))
+        return result
 
-def update_bug_status(bug_id, status, assignee_name=None):
-    """更新BUG状态和分配"""
-    conn = get_connection()
-    cursor = conn.cursor()
+# 分配给某个研发人员的BUG
+DEVELOPER_ASSIGNED_BUGS_SQL = '''
+    SELECT b.id, b.title, b.version, b.region, b.submitter, b.status, b.created_at,
+           d.name as assignee_name
+    FROM bugs b
+    JOIN developers d ON b.assignee_id = d.id
+    WHERE d.name = ?
+    ORDER BY b.created_at DESC
+'''
+
+def get_developer_assigned_bugs(developer_name):
+    """获取分配给指定研发人员的BUG列表"""
+    with read_connection() as conn:
+        cursor = conn.cursor()
+    
+        cursor.execute(DEVELOPER_ASSIGNED_BUGS_SQL, (developer_name,))
+    
+        rows = cursor.fetchall()
+        result = [
+            {
+                'id': row[0],
+                'title': row[1],
+                'version': row[2],
+                'region': row[3],
+                'submitter': row[4],
+                'status': row[5],
+                'created_at': row[6],
+                'assignee': row[7]
+            } for row in rows
+        ]
     
+        logger.debug("查询到分配给 %s 的 %s 条BUG记录", developer_name, len(result))
+        return result
+
+def update_bug_status(bug_id, status, assignee_name=None, assignee_id=None):
+    """更新BUG状态和分配，未指定研发人员（或指定未分配）时保留原分配"""
     # 获取新分配研发人员的ID
-    assignee_id = None
-    if assignee_name and assignee_name != "未分配":
-        cursor.execute('SELECT id FROM developers WHERE name = ?', (assignee_name,))
-        result = cursor.fetchone()
-        if result:
-            assignee_id = result[0]
+    assignee_id = resolve_assignee(assignee_id, assignee_name)
+    with write_connection(invalidates=('bugs',)) as conn:
+        cursor = conn.cursor()
     
-    print(f"正在更新BUG {bug_id} 状态为: {status}, 分配: {assignee_name or '未分配'}")
+        logger.debug("正在更新BUG %s 状态为: %s, 分配: %s", bug_id, status, assignee_id or '未分配')
     
-    if assignee_id:
-        cursor.execute('''
-            UPDATE bugs SET status = ?, assignee_id = ?, resolved_at = CURRENT_TIMESTAMP 
-            WHERE id = ?
-        ''', (status, assignee_id, bug_id))
-    else:
-        cursor.execute('''
-            UPDATE bugs SET status = ?, resolved_at = CURRENT_TIMESTAMP 
-            WHERE id = ?
-        ''', (status, bug_id))
+        if assignee_id:
+            cursor.execute('''
+                UPDATE bugs SET status = ?, assignee_id = ?, resolved_at = CURRENT_TIMESTAMP 
+                WHERE id = ?
+            ''', (status, assignee_id, bug_id))
+        else:
+            cursor.execute('''
+                UPDATE bugs SET status = ?, resolved_at = CURRENT_TIMESTAMP 
+                WHERE id = ?
+            ''', (status, bug_id))
     
-    affected = cursor.rowcount
-    conn.commit()
-    print(f"更新成功，影响行数: {affected}")
-    return affected > 0
+        affected = cursor.rowcount
+        logger.debug("更新成功，影响行数: %s", affected)
+        return affected > 0
 
-def get_user_bugs():
-    """获取BUG列表（包含研发人员名称）"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    print("正在查询BUG列表...")
-    cursor.execute('''
+def bulk_update_bugs(bug_ids, status=None, assignee_id=None):
+    """在一个事务中批量修改多个BUG的状态和/或分配，返回 {bug_id: 是否更新}（不存在的ID为 False）
+
+    status / assignee_id 为 None 的不修改，assignee_id 为 UNASSIGNED_ID 表示取消分配。
+    改为“已解决”时记录解决时间（原本已解决的保留原解决时间）。
+    研发人员ID不存在时抛出 ValueError，不修改任何BUG。
+    """
+    bug_ids = list(dict.fromkeys(bug_ids))
+    results = dict.fromkeys(bug_ids, False)
+    updates = []
+    params = []
+    if status is not None:
+        updates.append("status = ?")
+        params.append(status)
+        if status == "已解决":
+            updates.append("resolved_at = CASE WHEN status = '已解决' THEN resolved_at ELSE CURRENT_TIMESTAMP END")
+    if assignee_id is not None:
+        # 与 resolve_assignee 不同，不存在的ID不能当作取消分配，否则会清空所选BUG的原有分配
+        if assignee_id != UNASSIGNED_ID and assignee_id not in get_developer_directory()['by_id']:
+            raise ValueError(f"研发人员ID {assignee_id} 不存在")
+        updates.append("assignee_id = ?")
+        params.append(None if assignee_id == UNASSIGNED_ID else assignee_id)
+    if not updates or not bug_ids:
+        return results
+
+    with write_connection(invalidates=('bugs',)) as conn:
+        # 先锁定写事务，保证查到的ID与更新的行一致
+        if not conn.in_transaction:
+            conn.execute('BEGIN IMMEDIATE')
+        cursor = conn.cursor()
+        for start in range(0, len(bug_ids), BUG_DETAILS_BATCH_SIZE):
+            batch = bug_ids[start:start + BUG_DETAILS_BATCH_SIZE]
+            placeholders = ', '.join('?' for _ in batch)
+            cursor.execute(f'SELECT id FROM bugs WHERE id IN ({placeholders})', batch)
+            for (bug_id,) in cursor.fetchall():
+                results[bug_id] = True
+            cursor.execute(f"UPDATE bugs SET {', '.join(updates)} WHERE id IN ({placeholders})",
+                           params + batch)
+
+    updated = sum(results.values())
+    logger.info("批量更新BUG %s 个（请求 %s 个），状态: %s, 分配: %s", updated, len(bug_ids), status, assignee_id)
+    return results
+
+@cached('bugs', 'developers')
+def get_user_bugs(status=None, assignee=None, submitter=None, version=None, region=None,
+                  date_from=None, date_to=None):
+    """获取BUG列表（包含研发人员名称），支持与分页查询相同的过滤条件"""
+    with read_connection() as conn:
+        cursor = conn.cursor()
+        logger.debug("正在查询BUG列表...")
+        clauses, params = build_bug_filters(status, assignee, submitter, version, region,
+                                            date_from, date_to)
+        query = '''
+            SELECT b.id, b.title, b.version, b.region, b.submitter, b.status, b.created_at,
+                   d.name as assignee_name
+            FROM bugs b 
+            LEFT JOIN developers d ON b.assignee_id = d.id 
+        '''
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY b.created_at DESC, b.id DESC"
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        logger.debug("查询到 %s 条记录", len(rows))
+    
+        result = [
+            {
+                'id': row[0],
+                'title': row[1],
+                'version': row[2],
+                'region': row[3],
+                'submitter': row[4],
+                'status': row[5],
+                'created_at': row[6],
+                'assignee': row[7] or '未分配'
+            } for row in rows
+        ]
+        return result
+
+def encode_bug_cursor(created_at, bug_id):
+    """将 (created_at, id) 编码为不透明的分页游标"""
+    raw = json.dumps([created_at, bug_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_bug_cursor(cursor):
+    """解析分页游标，返回 (created_at, id)"""
+    try:
+        created_at, bug_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return created_at, int(bug_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"无效的分页游标: {cursor}") from e
+
+def build_bug_filters(status=None, assignee=None, submitter=None, version=None, region=None,
+                      date_from=None, date_to=None):
+    """根据过滤条件生成 WHERE 子句列表和参数（"所有"/空值表示不过滤）"""
+    clauses = []
+    params = []
+
+    if status and status != "所有":
+        clauses.append("b.status = ?")
+        params.append(status)
+
+    if assignee and assignee != "所有":
+        if assignee == "未分配":
+            clauses.append("b.assignee_id IS NULL")
+        else:
+            clauses.append("b.assignee_id = (SELECT id FROM developers WHERE name = ?)")
+            params.append(assignee)
+
+    if submitter and submitter != "所有":
+        clauses.append("b.submitter = ?")
+        params.append(submitter)
+
+    if version and version != "所有":
+        clauses.append("b.version = ?")
+        params.append(version)
+
+    if region and region != "所有":
+        clauses.append("b.region = ?")
+        params.append(region)
+
+    # 日期范围（闭区间，按天）
+    if date_from:
+        clauses.append("b.created_at >= ?")
+        params.append(str(date_from))
+    if date_to:
+        clauses.append("b.created_at < date(?, '+1 day')")
+        params.append(str(date_to))
+
+    return clauses, params
+
+def build_bugs_page_query(status=None, assignee=None, submitter=None, version=None, region=None,
+                          date_from=None, date_to=None, cursor=None, page_size=20):
+    """生成 get_bugs_page 的查询，返回 (SQL, 参数)；多取一条用于判断是否还有下一页"""
+    clauses, params = build_bug_filters(status, assignee, submitter, version, region,
+                                        date_from, date_to)
+
+    # 键集分页：从上一页最后一条记录之后继续，深分页也无需扫描跳过的行
+    if cursor:
+        last_created_at, last_id = decode_bug_cursor(cursor)
+        clauses.append("(b.created_at, b.id) < (?, ?)")
+        params.extend([last_created_at, last_id])
+
+    query = '''
         SELECT b.id, b.title, b.version, b.region, b.submitter, b.status, b.created_at,
                d.name as assignee_name
-        FROM bugs b 
-        LEFT JOIN developers d ON b.assignee_id = d.id 
-        ORDER BY b.created_at DESC
-    ''')
-    rows = cursor.fetchall()
-    print(f"查询到 {len(rows)} 条记录")
-    
-    result = [
-        {
-            'id': row[0],
-            'title': row[1],
-            'version': row[2],
-            'region': row[3],
-            'submitter': row[4],
-            'status': row[5],
-            'created_at': row[6],
-            'assignee': row[7] or '未分配'
-        } for row in rows
-    ]
-    return result
+        FROM bugs b
+        LEFT JOIN developers d ON b.assignee_id = d.id
+    '''
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += " ORDER BY b.created_at DESC, b.id DESC LIMIT ?"
+    params.append(page_size + 1)
+    return query, params
+
+@cached('bugs', 'developers')
+def get_bugs_page(status=None, assignee=None, submitter=None, version=None, region=None,
+                  date_from=None, date_to=None, cursor=None, page_size=20):
+    """分页获取BUG列表（按 created_at, id 倒序的键集分页）
+
+    返回 (当前页BUG列表, 下一页游标)，没有下一页时游标为 None。
+    """
+    with read_connection() as conn:
+        cursor_obj = conn.cursor()
+        query, params = build_bugs_page_query(status, assignee, submitter, version, region,
+                                              date_from, date_to, cursor, page_size)
+        cursor_obj.execute(query, params)
+        rows = cursor_obj.fetchall()
+
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+
+        result = [
+            {
+                'id': row[0],
+                'title': row[1],
+                'version': row[2],
+                'region': row[3],
+                'submitter': row[4],
+                'status': row[5],
+                'created_at': row[6],
+                'assignee': row[7] or '未分配'
+            } for row in rows
+        ]
+
+        next_cursor = None
+        if has_more and result:
+            next_cursor = encode_bug_cursor(result[-1]['created_at'], result[-1]['id'])
+
+        logger.debug("分页查询到 %s 条BUG记录，是否有下一页: %s", len(result), has_more)
+        return result, next_cursor
+
+def build_fts_query(text):
+    """把用户输入转换为FTS5查询
+
+    每个词作为短语加引号（避免用户输入被解析为FTS5语法），多个词之间为 AND 关系。
+    返回 (MATCH表达式或None, 走索引的词列表, 过短而无法走索引的词列表)。
+    """
+    index_terms = []
+    short_terms = []
+    for term in (text or '').split():
+        if len(term) >= FTS_MIN_TERM_LENGTH:
+            index_terms.append(term)
+        else:
+            short_terms.append(term)
+    match_expr = ' '.join('"' + term.replace('"', '""') + '"' for term in index_terms)
+    return (match_expr or None), index_terms, short_terms
+
+@cached('bugs', 'developers')
+def search_bugs(query, page=1, page_size=20, include_logs=True, status=None, assignee=None,
+                submitter=None, version=None, region=None, date_from=None, date_to=None):
+    """全文搜索BUG标题、描述和日志附件，按相关度排序分页
+
+    返回 (当前页结果, 匹配总数)，匹配总数最多为 SEARCH_MAX_CANDIDATES。为保证大数据量下的响应时间，
+    标题描述索引和日志索引各自只取最新的 SEARCH_MAX_CANDIDATES 条匹配参与排序，合并后再截取前
+    SEARCH_MAX_CANDIDATES 条；匹配数达到上限时，更早的BUG即使相关度更高也不会出现在结果中。
+    结果中 title_highlight 为高亮后的标题，description_snippet / log_snippet
+    为命中位置附近的摘要，命中词用 ** 包围。
+    """
+    match_expr, index_terms, short_terms = build_fts_query(query)
+    if not match_expr and not short_terms:
+        return [], 0
+
+    with read_connection() as conn:
+        cursor = conn.cursor()
+
+        clauses, params = build_bug_filters(status, assignee, submitter, version, region,
+                                            date_from, date_to)
+        # 过短的词无法使用trigram索引，在候选结果上用 LIKE 过滤
+        for term in short_terms:
+            clauses.append("(b.title LIKE ? ESCAPE '\\' OR b.description LIKE ? ESCAPE '\\')")
+            params.extend([like_contains_pattern(term)] * 2)
+        where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+
+        if match_expr:
+            # 每个索引只取最新的 SEARCH_MAX_CANDIDATES 条匹配参与排序。不使用 bm25：它需要读完
+            # 每个词的完整倒排表来计算IDF，常见词在百万级数据上要数百毫秒。改为按字段加权计分：
+            # 每个词命中标题记 10 分、命中描述记 1 分，只命中日志记 0.5 分，同分按时间倒序
+            score = ' + '.join(
+                "(instr(lower(b.title), lower(?)) > 0) * 10 + (instr(lower(b.description), lower(?)) > 0)"
+                for _ in index_terms)
+            score_params = [value for term in index_terms for value in (term, term)]
+            candidates = f'''
+                SELECT * FROM (
+                    SELECT f.rowid AS id, {score} AS score
+                    FROM bugs_fts f JOIN bugs b ON b.id = f.rowid
+                    WHERE bugs_fts MATCH ?{"".join(" AND " + c for c in clauses)}
+                    ORDER BY f.rowid DESC LIMIT ?
+                )
+            '''
+            hit_params = [*score_params, match_expr, *params, SEARCH_MAX_CANDIDATES]
+            if include_logs:
+                candidates += f'''
+                    UNION ALL SELECT * FROM (
+                        SELECT f.rowid, 0.5
+                        FROM bug_logs_fts f JOIN bugs b ON b.id = f.rowid
+                        WHERE bug_logs_fts MATCH ?{"".join(" AND " + c for c in clauses)}
+                        ORDER BY f.rowid DESC LIMIT ?
+                    )
+                '''
+                hit_params += [match_expr, *params, SEARCH_MAX_CANDIDATES]
+            sql = f'''
+                WITH hits AS ({candidates}),
+                     ranked AS (SELECT id, MAX(score) AS score FROM hits GROUP BY id
+                                ORDER BY score DESC, id DESC LIMIT ?)
+                SELECT b.id, b.title, b.version, b.region, b.submitter, b.status, b.created_at,
+                       d.name, COUNT(*) OVER () AS total
+                FROM ranked r
+                JOIN bugs b ON b.id = r.id
+                LEFT JOIN developers d ON b.assignee_id = d.id
+                ORDER BY r.score DESC, b.id DESC
+                LIMIT ? OFFSET ?
+            '''
+            all_params = hit_params + [SEARCH_MAX_CANDIDATES]
+        else:
+            # 只有短词：无法使用全文索引，按时间倒序扫描最新的匹配
+            sql = f'''
+                SELECT *, COUNT(*) OVER () AS total FROM (
+                    SELECT b.id, b.title, b.version, b.region, b.submitter, b.status, b.created_at,
+                           d.name
+                    FROM bugs b
+                    LEFT JOIN developers d ON b.assignee_id = d.id
+                    {where}
+                    ORDER BY b.created_at DESC, b.id DESC
+                    LIMIT ?
+                )
+                ORDER BY created_at DESC, id DESC
+                LIMIT ? OFFSET ?
+            '''
+            all_params = params + [SEARCH_MAX_CANDIDATES]
+        cursor.execute(sql, all_params + [page_size, (page - 1) * page_size])
+        rows = cursor.fetchall()
+        total_count = rows[0][8] if rows else 0
+
+        result = [
+            {
+                'id': row[0],
+                'title': row[1],
+                'version': row[2],
+                'region': row[3],
+                'submitter': row[4],
+                'status': row[5],
+                'created_at': row[6],
+                'assignee': row[7] or '未分配',
+                'title_highlight': row[1],
+                'description_snippet': None,
+                'log_snippet': None,
+            } for row in rows
+        ]
+
+        # 只为当前页生成高亮和摘要
+        if match_expr and result:
+            by_id = {bug['id']: bug for bug in result}
+            placeholders = ','.join('?' * len(by_id))
+            cursor.execute(f'''
+                SELECT rowid, highlight(bugs_fts, 0, '**', '**'),
+                       snippet(bugs_fts, 1, '**', '**', '…', 64)
+                FROM bugs_fts WHERE bugs_fts MATCH ? AND rowid IN ({placeholders})
+            ''', [match_expr, *by_id])
+            for bug_id, title_highlight, description_snippet in cursor.fetchall():
+                by_id[bug_id]['title_highlight'] = title_highlight
+                # 描述未命中时 snippet 返回开头的文本，此时不作为摘要返回
+                if '**' in description_snippet:
+                    by_id[bug_id]['description_snippet'] = description_snippet
+            if include_logs:
+                cursor.execute(f'''
+                    SELECT rowid, snippet(bug_logs_fts, 0, '**', '**', '…', 64)
+                    FROM bug_logs_fts WHERE bug_logs_fts MATCH ? AND rowid IN ({placeholders})
+                ''', [match_expr, *by_id])
+                for bug_id, log_snippet in cursor.fetchall():
+                    by_id[bug_id]['log_snippet'] = log_snippet
+
+        logger.debug("全文搜索 %r 命中 %s 条，本页 %s 条", query, total_count, len(result))
+        return result, total_count
+
+# 搜索基准测试的查询: (说明, 搜索词)
+SEARCH_BENCHMARK_QUERIES = (
+    ('常见词', '内存泄漏'),
+    ('罕见词', '内存泄漏 0042'),
+    ('多个词', '网络异常 数据丢失'),
+    ('无匹配', '不存在的问题描述'),
+    ('短词', '崩溃'),
+    ('多个短词', '登录 白屏'),
+)
+# 生成测试数据时使用的词
+_BENCHMARK_WORDS = ('登录', '超时', '崩溃', '闪退', '内存泄漏', '卡顿', '白屏', '支付失败', '推送', '同步',
+                    'UI', '网络异常', '数据丢失', '权限', '升级', '缓存')
+
+def seed_benchmark_bugs(rows, progress=None):
+    """为基准测试（manage.py bench-*）生成 rows 条随机BUG，只能在没有BUG的项目中执行，
+    返回 bulk_import_bugs 的结果"""
+    with read_connection() as conn:
+        if conn.execute('SELECT 1 FROM bugs LIMIT 1').fetchone():
+            raise ValueError("当前项目已有BUG，请在空项目中生成测试数据")
+
+    def generate():
+        for i in range(rows):
+            words = [_BENCHMARK_WORDS[(i * 7 + k * 3) % len(_BENCHMARK_WORDS)] for k in range(3)]
+            yield {
+                'title': f"{words[0]}问题 {i:07d}",
+                'description': f"复现步骤：{words[1]}后{words[2]}，编号 {i % 10000:04d}",
+                'version': f"1.{i % 20}",
+                'region': ('华东', '华南', '华北')[i % 3],
+                'submitter': f"测试{i % 50}",
+                'status': ('待处理', '处理中', '已解决', '已关闭')[i % 4],
+            }
+    return bulk_import_bugs(generate(), progress=progress)
+
+def benchmark_search(rounds=5, page_size=20):
+    """测量 search_bugs（不经过查询缓存）在当前项目上的耗时，返回
+    {'rows': BUG数, 'queries': [(说明, 搜索词, 匹配数, 中位数毫秒, 最大毫秒)]}"""
+    search = inspect.unwrap(search_bugs)
+    with read_connection() as conn:
+        rows = conn.execute('SELECT COUNT(*) FROM bugs').fetchone()[0]
+    queries = []
+    for label, text in SEARCH_BENCHMARK_QUERIES:
+        timings = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            _, total = search(text, page=1, page_size=page_size)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        queries.append((label, text, total, timings[len(timings) // 2], timings[-1]))
+    return {'rows': rows, 'queries': queries}
 
 def get_bug_details(bug_id):
     """获取单个BUG详情（包含研发人员名称）"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    print(f"正在查询BUG详情 ID: {bug_id}")
-    cursor.execute('''
-        SELECT b.title, b.description, b.version, b.region, b.submitter, b.status, 
-               b.screenshot, b.log_file, b.created_at, b.resolved_at,
-               d.name as assignee_name
-        FROM bugs b 
-        LEFT JOIN developers d ON b.assignee_id = d.id 
-        WHERE b.id = ?
-    ''', (bug_id,))
-    row = cursor.fetchone()
-    if row:
-        print(f"找到BUG详情: {row[0]} by {row[4]}, Status: {row[5]}")
-        return {
-            'id': bug_id,
-            'title': row[0],
-            'description': row[1],
-            'version': row[2],
-            'region': row[3],
-            'submitter': row[4],
-            'status': row[5],
-            'screenshot': row[6],
-            'log_file': row[7],
-            'created_at': row[8],
-            'resolved_at': row[9],
-            'assignee': row[10] or '未分配'
-        }
-    else:
-        print(f"未找到BUG ID: {bug_id}")
-    return None
+    with read_connection() as conn:
+        cursor = conn.cursor()
+        logger.debug("正在查询BUG详情 ID: %s", bug_id)
+        cursor.execute('''
+            SELECT b.title, b.description, b.version, b.region, b.submitter, b.status, 
+                   b.screenshot, b.log_file, b.created_at, b.resolved_at,
+                   d.name as assignee_name, b.assignee_id
+            FROM bugs b 
+            LEFT JOIN developers d ON b.assignee_id = d.id 
+            WHERE b.id = ?
+        ''', (bug_id,))
+        row = cursor.fetchone()
+        if row:
+            logger.debug("找到BUG详情: %s by %s, Status: %s", row[0], row[4], row[5])
+            return {
+                'id': bug_id,
+                'title': row[0],
+                'description': row[1],
+                'version': row[2],
+                'region': row[3],
+                'submitter': row[4],
+                'status': row[5],
+                'screenshot': row[6],
+                'log_file': row[7],
+                'created_at': row[8],
+                'resolved_at': row[9],
+                'assignee': row[10] or '未分配',
+                'assignee_id': row[11]
+            }
+        else:
+            logger.debug("未找到BUG ID: %s", bug_id)
+        return None
+
+# 单条 IN (...) 查询的最大参数个数（低于旧版SQLite的999变量上限）
+BUG_DETAILS_BATCH_SIZE = 500
+
+@cached('bugs', 'developers')
+def get_bug_details_many(bug_ids):
+    """批量获取BUG详情，返回 {bug_id: 详情字典}，不存在的ID不出现在结果中"""
+    with read_connection() as conn:
+        cursor = conn.cursor()
+
+        # 去重并保持顺序
+        bug_ids = list(dict.fromkeys(bug_ids))
+        result = {}
+
+        for start in range(0, len(bug_ids), BUG_DETAILS_BATCH_SIZE):
+            batch = bug_ids[start:start + BUG_DETAILS_BATCH_SIZE]
+            placeholders = ', '.join('?' for _ in batch)
+            cursor.execute(f'''
+                SELECT b.id, b.title, b.description, b.version, b.region, b.submitter, b.status,
+                       b.screenshot, b.log_file, b.created_at, b.resolved_at,
+                       d.name as assignee_name, b.assignee_id
+                FROM bugs b
+                LEFT JOIN developers d ON b.assignee_id = d.id
+                WHERE b.id IN ({placeholders})
+            ''', batch)
+            for row in cursor.fetchall():
+                result[row[0]] = {
+                    'id': row[0],
+                    'title': row[1],
+                    'description': row[2],
+                    'version': row[3],
+                    'region': row[4],
+                    'submitter': row[5],
+                    'status': row[6],
+                    'screenshot': row[7],
+                    'log_file': row[8],
+                    'created_at': row[9],
+                    'resolved_at': row[10],
+                    'assignee': row[11] or '未分配',
+                    'assignee_id': row[12]
+                }
+
+        logger.debug("批量查询BUG详情: 请求 %s 条，找到 %s 条", len(bug_ids), len(result))
+        return result
+
+# 压测创建的BUG的提交人（结束后删除这些BUG）
+LOAD_TEST_SUBMITTER = '压测'
+
+def benchmark_load(sessions=50, seconds=8.0, write_ratio=0.1):
+    """模拟 sessions 个会话并发访问当前项目 seconds 秒
+
+    读操作轮流为列表页、本页详情和统计（不经过查询缓存），写操作为新建BUG和修改其状态，
+    写操作占 write_ratio。结束后删除压测创建的BUG。返回 {'sessions', 'seconds', 'reads', 'writes',
+    'ops_per_sec', 'p95_ms': 单次操作耗时的95分位, 'errors': {错误信息: 次数}}
+    """
+    project = get_current_project()
+    list_page = inspect.unwrap(get_bugs_page)
+    details_many = inspect.unwrap(get_bug_details_many)
+    bug_stats = inspect.unwrap(get_bug_stats)
+    statuses = ('待处理', '处理中', '已解决')
+    lock = threading.Lock()
+    totals = {'reads': 0, 'writes': 0}
+    errors = {}
+    timings = []
+    created = []
+    deadline = time.perf_counter() + seconds
+
+    def session(index):
+        rng = random.Random(index)
+        own_bugs = []
+        reads = writes = 0
+        local_timings = []
+        with use_project(project):
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    if rng.random() < write_ratio:
+                        if own_bugs and rng.random() < 0.5:
+                            update_bug_status(rng.choice(own_bugs), rng.choice(statuses))
+                        else:
+                            own_bugs.append(create_bug(f"压测BUG {index}-{len(own_bugs)}", "压测数据", '1.0',
+                                                       '华东', LOAD_TEST_SUBMITTER))
+                        writes += 1
+                    else:
+                        choice = rng.random()
+                        if choice < 0.5:
+                            list_page(page_size=20)
+                        elif choice < 0.8:
+                            bugs, _ = list_page(page_size=20)
+                            details_many([bug['id'] for bug in bugs])
+                        else:
+                            bug_stats()
+                        reads += 1
+                except sqlite3.Error as e:
+                    with lock:
+                        errors[str(e)] = errors.get(str(e), 0) + 1
+                local_timings.append(time.perf_counter() - start)
+        with lock:
+            totals['reads'] += reads
+            totals['writes'] += writes
+            timings.extend(local_timings)
+            created.extend(bug_id for bug_id in own_bugs if bug_id)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=session, args=(index,), name=f'load-{index}') for index in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    for bug_id in created:
+        delete_bug(bug_id)
+    timings.sort()
+    ops = totals['reads'] + totals['writes']
+    return {
+        'sessions': sessions,
+        'seconds': elapsed,
+        'reads': totals['reads'],
+        'writes': totals['writes'],
+        'ops_per_sec': ops / elapsed if elapsed else 0.0,
+        'p95_ms': timings[int(len(timings) * 0.95)] * 1000 if timings else 0.0,
+        'errors': errors,
+    }
+
+@contextmanager
+def _count_read_statements():
+    """统计之后本线程在当前项目读连接上执行的SQL语句数，产出 [计数]
+
+    测量期间借出一个读连接并固定给当前上下文使用（read_connection 直接返回它），
+    只有本线程的查询经过这个连接，其他线程借用的读连接不会被计入。
+    """
+    counter = [0]
+    def trace(_statement):
+        counter[0] += 1
+    with read_connection() as conn:
+        conn.set_trace_callback(trace)
+        token = _pinned_reader.set((get_current_project(), conn))
+        try:
+            yield counter
+        finally:
+            _pinned_reader.reset(token)
+            conn.set_trace_callback(None)
+
+def benchmark_bug_details(count=10000):
+    """对最新的 count 个BUG比较逐个 get_bug_details 与一次 get_bug_details_many（不经过查询缓存），
+    返回 {'bugs': BUG数, 'single': (语句数, 毫秒), 'batch': (语句数, 毫秒)}"""
+    with read_connection() as conn:
+        bug_ids = [row[0] for row in conn.execute('SELECT id FROM bugs ORDER BY id DESC LIMIT ?', (count,))]
+    # 去掉全部包装：查询缓存以及 BUG_DB_METRICS=1 时外层的计时包装
+    details_many = inspect.unwrap(get_bug_details_many)
+
+    report = {'bugs': len(bug_ids)}
+    for mode, load in (('single', lambda: [get_bug_details(bug_id) for bug_id in bug_ids]),
+                       ('batch', lambda: details_many(bug_ids))):
+        with _count_read_statements() as statements:
+            start = time.perf_counter()
+            load()
+            report[mode] = (statements[0], (time.perf_counter() - start) * 1000)
+    return report
+
+def iter_bug_export_rows(status=None, assignee=None, submitter=None, version=None, region=None,
+                         date_from=None, date_to=None, batch_size=1000):
+    """流式导出BUG记录，逐批从游标读取，每行为与导出列顺序一致的元组"""
+    with read_connection() as conn:
+        cursor = conn.cursor()
+
+        clauses, params = build_bug_filters(status, assignee, submitter, version, region,
+                                            date_from, date_to)
+        query = '''
+            SELECT b.id, b.title, b.submitter, COALESCE(d.name, '未分配'), b.version, b.region, b.status,
+                   CASE WHEN length(b.description) > 100
+                        THEN substr(b.description, 1, 100) || '...'
+                        ELSE b.description END,
+                   COALESCE(b.screenshot, ''), COALESCE(b.log_file, ''),
+                   b.created_at, COALESCE(b.resolved_at, '')
+            FROM bugs b
+            LEFT JOIN developers d ON b.assignee_id = d.id
+        '''
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY b.created_at DESC, b.id DESC"
+
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
 
+# 超期统计中边界当天（7天前那一天）尚未整天计入汇总表的部分
+OVERDUE_RECENT_BUGS_SQL = '''
+    SELECT COUNT(*) FROM bugs
+    WHERE created_at >= date('now', '-7 days') AND created_at < datetime('now', '-7 days')
+      AND status != '已解决'
+'''
+
+@cached('bugs', 'developers')
 def get_bug_stats():
-    """获取BUG统计信息（增强版）"""
-    conn = get_connection()
-    cursor = conn.cursor()
+    """获取BUG统计信息（增强版）
+
+    从触发器维护的统计汇总表读取，查询次数和扫描行数与 bugs 表大小无关。
+    """
+    with read_connection() as conn:
+        cursor = conn.cursor()
     
-    # 基本统计
-    cursor.execute('SELECT COUNT(*) FROM bugs')
-    total = cursor.fetchone()[0]
+        current_month = datetime.now().strftime('%Y-%m')
     
-    current_month = datetime.now().strftime('%Y-%m')
-    cursor.execute('SELECT COUNT(*) FROM bugs WHERE strftime("%Y-%m", created_at) = ?', (current_month,))
-    monthly = cursor.fetchone()[0]
+        # 按 (月份, 状态) 汇总：总数、已解决、紧急、状态分布、月度趋势
+        cursor.execute('''
+            SELECT substr(day, 1, 7) as month, status, SUM(bug_count)
+            FROM bug_rollup_daily
+            GROUP BY month, status
+        ''')
     
-    # 已解决BUG统计
-    cursor.execute('SELECT COUNT(*) FROM bugs WHERE status = "已解决"')
-    resolved = cursor.fetchone()[0]
+        total = 0
+        status_stats = {}
+        month_counts = {}
+        for month, status, count in cursor.fetchall():
+            total += count
+            status_stats[status] = status_stats.get(status, 0) + count
+            if month:
+                month_counts[month] = month_counts.get(month, 0) + count
     
-    # 按提交人统计
-    cursor.execute('SELECT submitter, COUNT(*) FROM bugs GROUP BY submitter')
-    submitter_stats = dict(cursor.fetchall())
+        monthly = month_counts.get(current_month, 0)
+        resolved = status_stats.get('已解决', 0)
+        urgent = status_stats.get('紧急', 0)
     
-    # 按状态统计
-    cursor.execute('SELECT status, COUNT(*) FROM bugs GROUP BY status')
-    status_stats = dict(cursor.fetchall())
+        # 超期未解决：7天前之前的整天从汇总表读取，边界当天的剩余部分走 created_at 索引
+        cursor.execute('''
+            SELECT IFNULL(SUM(bug_count), 0) FROM bug_rollup_daily
+            WHERE day != '' AND day < date('now', '-7 days') AND status NOT IN ('已解决', '')
+        ''')
+        overdue = cursor.fetchone()[0]
+        cursor.execute(OVERDUE_RECENT_BUGS_SQL)
+        overdue += cursor.fetchone()[0]
     
-    # 按研发人员统计（已分配的BUG）
-    cursor.execute('''
-        SELECT d.name, COUNT(*) 
-        FROM bugs b 
-        LEFT JOIN developers d ON b.assignee_id = d.id 
-        WHERE b.assignee_id IS NOT NULL 
-        GROUP BY d.id, d.name
-    ''')
-    assignee_stats = dict(cursor.fetchall())
+        # 按提交人统计（含已解决数）
+        cursor.execute('''
+            SELECT submitter, SUM(bug_count), SUM(CASE WHEN status = '已解决' THEN bug_count ELSE 0 END)
+            FROM bug_rollup_submitter
+            GROUP BY submitter
+        ''')
+        submitter_stats = {}
+        submitter_resolved = {}
+        for submitter, count, resolved_count in cursor.fetchall():
+            submitter_stats[submitter] = count
+            submitter_resolved[submitter] = resolved_count
     
-    # 按月统计（最近12个月）
-    cursor.execute('''
-        SELECT strftime('%Y-%m', created_at) as month, COUNT(*) 
-        FROM bugs 
-        GROUP BY month 
-        ORDER BY month DESC 
-        LIMIT 12
-    ''')
-    monthly_trend = cursor.fetchall()
+        # 按研发人员统计（已分配的BUG）
+        cursor.execute('''
+            SELECT d.name, r.bug_count
+            FROM bug_rollup_assignee r
+            LEFT JOIN developers d ON r.assignee_id = d.id
+            WHERE r.assignee_id != 0
+        ''')
+        assignee_stats = {}
+        for assignee_name, count in cursor.fetchall():
+            assignee_stats[assignee_name] = assignee_stats.get(assignee_name, 0) + count
     
-    print(f"统计信息 - 总计: {total}, 本月: {monthly}, 已解决: {resolved}")
-    print(f"提交人统计: {submitter_stats}")
-    print(f"状态统计: {status_stats}")
-    print(f"研发人员统计: {assignee_stats}")
+        # 按月统计（最近12个月）
+        monthly_trend = sorted(month_counts.items(), reverse=True)[:12]
     
-    return {
-        'total': total,
-        'monthly': monthly,
-        'resolved': resolved,
-        'submitter_stats': submitter_stats,
-        'status_stats': status_stats,
-        'assignee_stats': assignee_stats,
-        'monthly_trend': monthly_trend
-    }
+        logger.debug("统计信息 - 总计: %s, 本月: %s, 已解决: %s, 紧急: %s, 超期: %s", total, monthly, resolved, urgent, overdue)
+        logger.debug("提交人统计: %s", submitter_stats)
+        logger.debug("状态统计: %s", status_stats)
+        logger.debug("研发人员统计: %s", assignee_stats)
+    
+        return {
+            'total': total,
+            'monthly': monthly,
+            'resolved': resolved,
+            'urgent': urgent,
+            'overdue': overdue,
+            'submitter_stats': submitter_stats,
+            'submitter_resolved': submitter_resolved,
+            'status_stats': status_stats,
+            'assignee_stats': assignee_stats,
+            'monthly_trend': monthly_trend
+        }
+
+# 跨项目统计的并发线程数（SQLite 查询期间释放 GIL，各项目是独立的数据库文件）
+PROJECT_STATS_WORKERS = int(os.environ.get('BUG_PROJECT_STATS_WORKERS', '4'))
+# 跨项目汇总的计数字段
+PROJECT_STATS_FIELDS = ('total', 'monthly', 'resolved', 'urgent', 'overdue')
+
+def _project_stats(project):
+    with use_project(project['key']):
+        stats = get_bug_stats()
+    return dict({'key': project['key'], 'name': project['name']},
+                **{field: stats[field] for field in PROJECT_STATS_FIELDS})
+
+def get_cross_project_stats(workers=PROJECT_STATS_WORKERS):
+    """并行读取各项目的统计，返回 {'projects': [各项目的计数], 'total': 合计}"""
+    projects = list_projects()
+    if len(projects) == 1 or workers <= 1:
+        rows = [_project_stats(project) for project in projects]
+    else:
+        with ThreadPoolExecutor(max_workers=min(workers, len(projects)), thread_name_prefix='project_stats') as executor:
+            rows = list(executor.map(_project_stats, projects))
+    total = {field: sum(row[field] for row in rows) for field in PROJECT_STATS_FIELDS}
+    return {'projects': rows, 'total': total}
+
+# 附件管理函数
+def register_attachment(digest, size, temp_path, path):
+    """登记一个已写入临时文件的附件，返回其最终路径
+
+    内容已存在时删除临时文件并返回已有路径，否则把临时文件移动到 path。
+    文件移动在写事务内进行，与 collect_orphan_attachments 互斥。
+    """
+    with write_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT OR IGNORE INTO attachments (hash, path, size) VALUES (?, ?, ?)
+        ''', (digest, path, size))
+        created = cursor.rowcount > 0
+        # 刷新时间，避免刚上传还未关联BUG的附件被回收
+        cursor.execute('UPDATE attachments SET touched_at = CURRENT_TIMESTAMP WHERE hash = ?', (digest,))
+        cursor.execute('SELECT path FROM attachments WHERE hash = ?', (digest,))
+        stored_path = cursor.fetchone()[0]
+
+        if os.path.exists(stored_path):
+            os.remove(temp_path)
+        else:
+            os.makedirs(os.path.dirname(stored_path), exist_ok=True)
+            os.replace(temp_path, stored_path)
+
+    logger.info("附件 %s %s，大小 %s 字节", stored_path, "已保存" if created else "已存在，复用已有文件", size)
+    return stored_path
+
+def collect_orphan_attachments(grace_seconds=ATTACHMENT_GC_GRACE_SECONDS):
+    """删除没有BUG引用的附件文件，返回 (删除文件数, 释放字节数)"""
+    with write_connection() as conn:
+        if not conn.in_transaction:
+            conn.execute('BEGIN IMMEDIATE')
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT hash, path, size FROM attachments
+            WHERE ref_count <= 0 AND touched_at <= datetime('now', ?)
+        ''', (f'-{int(grace_seconds)} seconds',))
+        orphans = cursor.fetchall()
+
+        freed = 0
+        for digest, path, size in orphans:
+            cursor.execute('DELETE FROM attachments WHERE hash = ?', (digest,))
+            try:
+                os.remove(path)
+                freed += size
+            except FileNotFoundError:
+                pass
+            remove_derivatives(path)
+
+    if orphans:
+        logger.info("回收未引用附件 %s 个，释放 %s 字节", len(orphans), freed)
+    return len(orphans), freed
+
+def get_attachment_stats():
+    """附件存储统计：去重后实际占用与按引用计算的占用之差即为节省的空间"""
+    with read_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT COUNT(*), IFNULL(SUM(size), 0),
+                   IFNULL(SUM(CASE WHEN ref_count > 0 THEN size ELSE 0 END), 0),
+                   IFNULL(SUM(CASE WHEN ref_count > 0 THEN size * ref_count ELSE 0 END), 0),
+                   IFNULL(SUM(CASE WHEN ref_count <= 0 THEN 1 ELSE 0 END), 0)
+            FROM attachments
+        ''')
+        blobs, stored_bytes, live_bytes, referenced_bytes, orphans = cursor.fetchone()
+        return {
+            'blobs': blobs,
+            'orphans': orphans,
+            'stored_bytes': stored_bytes,
+            'referenced_bytes': referenced_bytes,
+            'saved_bytes': referenced_bytes - live_bytes,
+        }
+
+def get_unmanaged_attachment_paths():
+    """返回BUG引用的、尚未纳入附件存储的文件路径（旧版本直接写入 uploads/ 的文件）"""
+    with read_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT path FROM (
+                SELECT screenshot AS path FROM bugs WHERE screenshot IS NOT NULL AND screenshot != ''
+                UNION
+                SELECT log_file FROM bugs WHERE log_file IS NOT NULL AND log_file != ''
+            )
+            WHERE path NOT IN (SELECT path FROM attachments)
+        ''')
+        return [row[0] for row in cursor.fetchall()]
+
+def get_screenshot_paths():
+    """返回BUG引用的全部截图路径（用于补齐缩略图）"""
+    with read_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT DISTINCT screenshot FROM bugs WHERE screenshot IS NOT NULL AND screenshot != ''
+        ''')
+        return [row[0] for row in cursor.fetchall()]
+
+def relink_attachment(old_path, new_path):
+    """把引用 old_path 的BUG改为引用 new_path，返回修改的BUG数"""
+    with write_connection(invalidates=('bugs',)) as conn:
+        cursor = conn.cursor()
+        changed = 0
+        for column in ATTACHMENT_COLUMNS:
+            cursor.execute(f'UPDATE bugs SET {column} = ? WHERE {column} = ?', (new_path, old_path))
+            changed += cursor.rowcount
+        return changed
 
 # 关闭所有连接（用于清理）
 def close_connections():
-    if hasattr(threading.current_thread(), 'conn'):
-        getattr(threading.current_thread(), 'conn').close()
\ No newline at end of file
+    with _pool_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+
+# 不做函数级统计的模块函数（连接管理和生成器）
+_UNINSTRUMENTED_FUNCTIONS = {'get_pool', 'read_connection', 'write_connection', 'close_connections',
+                             'get_current_project', 'set_current_project', 'use_project', 'get_project_path',
+                             'iter_bug_export_rows', 'encode_bug_cursor', 'decode_bug_cursor'}
+
+def _instrument_public_functions():
+    """开启性能监控时，为本模块的公开函数加上计时包装"""
+    namespace = globals()
+    for name, value in list(namespace.items()):
+        if (name.startswith('_') or name in _UNINSTRUMENTED_FUNCTIONS or not callable(value)
+                or isinstance(value, type) or getattr(value, '__module__', None) != __name__):
+            continue
+        namespace[name] = db_metrics.instrument_function(value)
+
+if db_metrics.is_enabled():
+    _instrument_public_functions()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库性能监控（默认关闭）
+开启后记录 database.py 中各函数及每条SQL语句的调用次数、耗时分布和返回行数，
+超过阈值的语句连同 EXPLAIN QUERY PLAN 写入慢查询日志。
+
+环境变量:
+    BUG_DB_METRICS   设为 1 开启监控（需在导入 database 之前设置）
+    BUG_DB_SLOW_MS   慢查询阈值（毫秒），默认 100
+"""
+
+import functools
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+
+slow_query_logger = logging.getLogger('slow_query')
+
+# 耗时分布的桶上限（毫秒），最后一个桶收集其余所有
+HISTOGRAM_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000)
+# 内存中保留的最近慢查询条数
+RECENT_SLOW_QUERIES = 50
+
+_enabled = os.environ.get('BUG_DB_METRICS', '') == '1'
+_slow_query_ms = float(os.environ.get('BUG_DB_SLOW_MS', '100'))
+_lock = threading.Lock()
+_function_stats = {}
+_statement_stats = {}
+_slow_queries = deque(maxlen=RECENT_SLOW_QUERIES)
+_started_at = time.time()
+
+def is_enabled():
+    """监控是否开启"""
+    return _enabled
+
+def _new_stats():
+    return {'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0,
+            'buckets': [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)}
+
+def _bucket_index(elapsed_ms):
+    for index, upper in enumerate(HISTOGRAM_BUCKETS_MS):
+        if elapsed_ms <= upper:
+            return index
+    return len(HISTOGRAM_BUCKETS_MS)
+
+def _record(table, key, elapsed_ms, rows=0):
+    with _lock:
+        stats = table.get(key)
+        if stats is None:
+            stats = table[key] = _new_stats()
+        stats['calls'] += 1
+        stats['total_ms'] += elapsed_ms
+        stats['rows'] += rows
+        if elapsed_ms > stats['max_ms']:
+            stats['max_ms'] = elapsed_ms
+        stats['buckets'][_bucket_index(elapsed_ms)] += 1
+
+def _add_rows(key, rows, elapsed_ms):
+    """把取数阶段的行数和耗时计入对应语句（不计入调用次数和分布）"""
+    with _lock:
+        stats = _statement_stats.get(key)
+        if stats is not None:
+            stats['rows'] += rows
+            stats['total_ms'] += elapsed_ms
+
+def normalize_sql(sql):
+    """归一化SQL：合并空白，把不定长的 IN (?, ?, ...) 参数列表折叠为一个键"""
+    sql = ' '.join(sql.split())
+    return re.sub(r'\?(\s*,\s*\?)+', '?, ...', sql)
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """记录每条语句耗时和返回行数的游标"""
+
+    _statement_key = None
+
+    def _timed_execute(self, method, sql, params):
+        key = normalize_sql(sql)
+        start = time.perf_counter()
+        result = method(sql, params)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self._statement_key = key
+        _record(_statement_stats, key, elapsed_ms)
+        if elapsed_ms >= _slow_query_ms:
+            _log_slow_query(self.connection, sql, params, elapsed_ms)
+        return result
+
+    def execute(self, sql, params=()):
+        return self._timed_execute(super().execute, sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self._timed_execute(super().executemany, sql, seq_of_params)
+
+    def _timed_fetch(self, method, *args):
+        start = time.perf_counter()
+        result = method(*args)
+        if self._statement_key is not None:
+            rows = len(result) if isinstance(result, list) else int(result is not None)
+            _add_rows(self._statement_key, rows, (time.perf_counter() - start) * 1000)
+        return result
+
+    def fetchone(self):
+        return self._timed_fetch(super().fetchone)
+
+    def fetchmany(self, size=None):
+        if size is None:
+            return self._timed_fetch(super().fetchmany)
+        return self._timed_fetch(super().fetchmany, size)
+
+    def fetchall(self):
+        return self._timed_fetch(super().fetchall)
+
+class InstrumentedConnection(sqlite3.Connection):
+    """cursor() 默认返回 InstrumentedCursor 的连接"""
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or InstrumentedCursor)
+
+def _log_slow_query(conn, sql, params, elapsed_ms):
+    """记录慢查询及其查询计划"""
+    plan = []
+    if sql.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE', 'INSERT', 'WITH')):
+        try:
+            # 使用普通游标，避免查询计划本身被统计
+            cursor = sqlite3.Cursor(conn)
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params if isinstance(params, (tuple, list, dict)) else ())
+            plan = [row[-1] for row in cursor.fetchall()]
+        except sqlite3.Error:
+            plan = []
+
+    entry = {
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'elapsed_ms': round(elapsed_ms, 2),
+        'sql': normalize_sql(sql),
+        'plan': plan,
+    }
+    with _lock:
+        _slow_queries.append(entry)
+    slow_query_logger.warning("慢查询 %.1fms: %s | 查询计划: %s", elapsed_ms, entry['sql'], plan)
+
+def instrument_function(func):
+    """包装函数，记录调用次数和耗时；返回列表/元组/字典时记录元素个数"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+        rows = 0
+        if isinstance(result, tuple) and result and isinstance(result[0], (list, dict)):
+            rows = len(result[0])
+        elif isinstance(result, (list, dict)):
+            rows = len(result)
+        _record(_function_stats, func.__name__, elapsed_ms, rows)
+        return result
+    wrapper.__wrapped_by_metrics__ = True
+    return wrapper
+
+def _sorted_stats(table, limit):
+    with _lock:
+        items = [(key, dict(stats, buckets=list(stats['buckets']))) for key, stats in table.items()]
+    items.sort(key=lambda item: item[1]['total_ms'], reverse=True)
+    return [dict(stats, name=key, avg_ms=stats['total_ms'] / max(stats['calls'], 1))
+            for key, stats in items[:limit]]
+
+def get_metrics(limit=20):
+    """按总耗时倒序返回函数、语句统计和最近慢查询"""
+    with _lock:
+        slow_queries = list(_slow_queries)
+    return {
+        'enabled': _enabled,
+        'since': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(_started_at)),
+        'slow_query_ms': _slow_query_ms,
+        'bucket_labels': [f"≤{upper}ms" for upper in HISTOGRAM_BUCKETS_MS] + [f">{HISTOGRAM_BUCKETS_MS[-1]}ms"],
+        'functions': _sorted_stats(_function_stats, limit),
+        'statements': _sorted_stats(_statement_stats, limit),
+        'slow_queries': list(reversed(slow_queries)),
+    }
+
+def reset_metrics():
+    """清空已收集的统计"""
+    global _started_at
+    with _lock:
+        _function_stats.clear()
+        _statement_stats.clear()
+        _slow_queries.clear()
+        _started_at = time.time()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BUG列表导出模块
+从数据库游标流式读取BUG记录，写入Excel/CSV/Parquet临时文件，内存占用不随BUG数量增长。
+临时文件在第一次被下载读取后删除；一直没有下载的在下一次导出或进程退出时删除。
+"""
+
+import atexit
+import csv
+import logging
+import os
+import tempfile
+import threading
+from itertools import chain, islice
+
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+
+from database import iter_bug_export_rows
+
+logger = logging.getLogger(__name__)
+
+# 导出列（与 iter_bug_export_rows 返回的元组顺序一致）
+EXPORT_COLUMNS = ['ID', '标题', '提交人', '分配研发', '版本', '地区', '状态',
+                  '描述', '截图路径', '日志路径', '创建时间', '解决时间']
+
+# 用于估算列宽的采样行数
+WIDTH_SAMPLE_ROWS = 200
+# 最大列宽
+MAX_COLUMN_WIDTH = 50
+# Parquet 每批写入的行数
+PARQUET_BATCH_ROWS = 5000
+
+# 尚未删除的导出临时文件
+_pending_exports = set()
+_pending_lock = threading.Lock()
+
+EXPORT_FORMATS = {
+    'xlsx': {'suffix': '.xlsx', 'mime': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'},
+    'csv': {'suffix': '.csv', 'mime': 'text/csv'},
+    'parquet': {'suffix': '.parquet', 'mime': 'application/octet-stream'},
+}
+
+def update_column_widths(widths, row):
+    """根据一行数据增量更新各列的最大显示宽度"""
+    for index, value in enumerate(row):
+        length = len(str(value)) if value is not None else 0
+        if length > widths[index]:
+            widths[index] = length
+    return widths
+
+def write_xlsx(path, rows):
+    """以 openpyxl 只写模式流式写入Excel，列宽由前若干行采样计算"""
+    rows = iter(rows)
+    sample = list(islice(rows, WIDTH_SAMPLE_ROWS))
+
+    # 只写模式下必须在写入数据前设置列宽
+    widths = [len(column) for column in EXPORT_COLUMNS]
+    for row in sample:
+        update_column_widths(widths, row)
+
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet('BUG记录')
+    for index, width in enumerate(widths, start=1):
+        worksheet.column_dimensions[get_column_letter(index)].width = min(width + 2, MAX_COLUMN_WIDTH)
+
+    worksheet.append(EXPORT_COLUMNS)
+    count = 0
+    for row in chain(sample, rows):
+        worksheet.append(list(row))
+        count += 1
+
+    workbook.save(path)
+    return count
+
+def write_csv(path, rows):
+    """流式写入CSV（带BOM，便于Excel直接打开中文）"""
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(EXPORT_COLUMNS)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+def write_parquet(path, rows):
+    """按批写入Parquet（需要安装 pyarrow）"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("导出Parquet需要安装 pyarrow: pip install pyarrow") from e
+
+    schema = pa.schema([(column, pa.int64() if column == 'ID' else pa.string()) for column in EXPORT_COLUMNS])
+    rows = iter(rows)
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        while True:
+            batch = list(islice(rows, PARQUET_BATCH_ROWS))
+            if not batch:
+                break
+            columns = [list(column) for column in zip(*batch)]
+            columns = [columns[0]] + [[None if v is None else str(v) for v in column] for column in columns[1:]]
+            writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+            count += len(batch)
+    return count
+
+WRITERS = {
+    'xlsx': write_xlsx,
+    'csv': write_csv,
+    'parquet': write_parquet,
+}
+
+def export_bugs_to_tempfile(fmt='xlsx', **filters):
+    """按过滤条件导出BUG到临时文件，返回 (文件路径, 导出行数)
+
+    文件在 download_export 的回调第一次读取后删除，也可以用 discard_export 提前删除；
+    都没有发生时在进程退出时删除。
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"不支持的导出格式: {fmt}")
+
+    fd, path = tempfile.mkstemp(prefix='bug_export_', suffix=EXPORT_FORMATS[fmt]['suffix'])
+    os.close(fd)
+    try:
+        count = WRITERS[fmt](path, iter_bug_export_rows(**filters))
+    except Exception:
+        os.remove(path)
+        raise
+    with _pending_lock:
+        _pending_exports.add(path)
+    logger.info("导出 %s 条BUG记录到 %s", count, path)
+    return path, count
+
+def discard_export(path):
+    """删除导出临时文件（已删除时忽略）"""
+    with _pending_lock:
+        _pending_exports.discard(path)
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def download_export(path):
+    """返回供 st.download_button 使用的回调：点击下载时才读取导出文件，页面重跑时不读取
+
+    第一次调用读取文件后即删除；Streamlit 会保存回调返回的内容，再次点击返回同一份数据。
+    """
+    content = None
+    def read_content():
+        nonlocal content
+        if content is None:
+            try:
+                with open(path, 'rb') as f:
+                    content = f.read()
+            finally:
+                discard_export(path)
+        return content
+    return read_content
+
+@atexit.register
+def _discard_pending_exports():
+    """进程退出时删除从未被下载的导出文件"""
+    with _pending_lock:
+        paths = list(_pending_exports)
+    for path in paths:
+        discard_export(path)
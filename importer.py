@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BUG批量导入模块
+从 CSV / Excel / JSONL 文件流式读取BUG记录，校验后交给 database.bulk_import_bugs 批量写入。
+列名支持导出文件的中文表头（见 exporter.EXPORT_COLUMNS）和英文字段名，导出的文件可以直接导入。
+解析和校验可以分散到多个进程，写入始终由主进程的一个写连接完成。
+"""
+
+import csv
+import json
+import logging
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timezone
+from itertools import islice
+
+from openpyxl import load_workbook
+
+from database import BULK_IMPORT_FIELDS, bulk_import_bugs
+
+logger = logging.getLogger(__name__)
+
+# 列名 -> 字段名（导出文件的中文表头和英文字段名），其余列（如 ID）忽略
+COLUMN_ALIASES = {
+    '标题': 'title',
+    '描述': 'description',
+    '版本': 'version',
+    '地区': 'region',
+    '提交人': 'submitter',
+    '分配研发': 'assignee',
+    '分配研发人员': 'assignee',
+    '状态': 'status',
+    '截图路径': 'screenshot',
+    '日志路径': 'log_file',
+    '创建时间': 'created_at',
+    '解决时间': 'resolved_at',
+}
+COLUMN_ALIASES.update({field: field for field in BULK_IMPORT_FIELDS})
+
+# 合法的BUG状态
+BUG_STATUSES = ('待处理', '紧急', '一般', '低优先级', '已解决')
+# 支持的文件格式（按扩展名识别）
+IMPORT_FORMATS = {
+    '.csv': 'csv',
+    '.xlsx': 'xlsx',
+    '.jsonl': 'jsonl',
+    '.ndjson': 'jsonl',
+}
+# 每个解析任务的行数
+PARSE_CHUNK_ROWS = 5000
+# 报告中最多保留的错误明细条数
+MAX_ERROR_DETAILS = 100
+
+def detect_format(path):
+    """根据扩展名判断文件格式，不支持时抛出 ValueError"""
+    fmt = IMPORT_FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"不支持的导入文件格式: {path}（支持 {', '.join(IMPORT_FORMATS)}）")
+    return fmt
+
+def _iter_raw_chunks(path, fmt):
+    """逐块读取原始行，产出 (表头, 首行行号, 行列表)；JSONL 的表头为 None、行为文本"""
+    if fmt == 'jsonl':
+        with open(path, encoding='utf-8-sig') as f:
+            line_number = 1
+            while True:
+                lines = list(islice(f, PARSE_CHUNK_ROWS))
+                if not lines:
+                    break
+                yield None, line_number, lines
+                line_number += len(lines)
+        return
+
+    if fmt == 'csv':
+        f = open(path, newline='', encoding='utf-8-sig')
+        rows = csv.reader(f)
+    else:
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        rows = workbook.active.iter_rows(values_only=True)
+    try:
+        header = next(rows, None)
+        if header is None:
+            return
+        line_number = 2
+        while True:
+            chunk = list(islice(rows, PARSE_CHUNK_ROWS))
+            if not chunk:
+                break
+            yield list(header), line_number, chunk
+            line_number += len(chunk)
+    finally:
+        if fmt == 'csv':
+            f.close()
+        else:
+            workbook.close()
+
+def _to_text(value):
+    """单元格值转为去掉首尾空白的文本，空值返回 None"""
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    value = str(value).strip()
+    return value or None
+
+def _to_timestamp(value):
+    """各种时间写法统一为 'YYYY-MM-DD HH:MM:SS'（带时区的转换为 UTC，与 CURRENT_TIMESTAMP 一致）"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, date):
+        parsed = datetime(value.year, value.month, value.day)
+    else:
+        try:
+            parsed = datetime.fromisoformat(str(value).strip().replace('/', '-'))
+        except ValueError:
+            raise ValueError(f"无法识别的时间: {value}") from None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.strftime('%Y-%m-%d %H:%M:%S')
+
+def normalize_record(raw):
+    """把一条原始记录（列名 -> 值）校验并转换为 bulk_import_bugs 接受的字典，无效时抛出 ValueError"""
+    record = {}
+    for column, value in raw.items():
+        field = COLUMN_ALIASES.get(str(column).strip()) if column is not None else None
+        if field:
+            record[field] = value
+
+    bug = {field: _to_text(record.get(field))
+           for field in ('title', 'description', 'version', 'region', 'submitter', 'assignee',
+                         'status', 'screenshot', 'log_file')}
+    if not bug['title']:
+        raise ValueError("缺少标题")
+    if bug['status'] is None:
+        bug['status'] = '待处理'
+    elif bug['status'] not in BUG_STATUSES:
+        raise ValueError(f"无效的状态: {bug['status']}")
+    if record.get('assignee_id') not in (None, ''):
+        try:
+            bug['assignee_id'] = int(record['assignee_id'])
+        except (TypeError, ValueError):
+            raise ValueError(f"无效的研发人员ID: {record['assignee_id']}") from None
+    bug['created_at'] = _to_timestamp(record.get('created_at'))
+    bug['resolved_at'] = _to_timestamp(record.get('resolved_at'))
+    return bug
+
+def parse_chunk(header, first_line, rows):
+    """解析一块原始行，返回 ([(行号, 记录)], [(行号, 错误信息)])；可在子进程中执行"""
+    bugs = []
+    errors = []
+    for line_number, row in enumerate(rows, start=first_line):
+        try:
+            if header is None:
+                if not row.strip():
+                    continue
+                raw = json.loads(row)
+                if not isinstance(raw, dict):
+                    raise ValueError("每行应为一个JSON对象")
+            else:
+                if not any(value not in (None, '') for value in row):
+                    continue
+                raw = dict(zip(header, row))
+            bugs.append((line_number, normalize_record(raw)))
+        except ValueError as e:
+            errors.append((line_number, str(e)))
+    return bugs, errors
+
+def _iter_parsed_chunks(paths, workers):
+    """按文件顺序产出 (文件, 记录列表, 错误列表)；workers > 1 时在进程池中解析，最多同时排队 2×workers 块"""
+    chunks = ((path, chunk) for path in paths for chunk in _iter_raw_chunks(path, detect_format(path)))
+    if workers <= 1:
+        for path, chunk in chunks:
+            yield (path,) + parse_chunk(*chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for path, chunk in chunks:
+            pending.append((path, executor.submit(parse_chunk, *chunk)))
+            if len(pending) >= workers * 2:
+                path, future = pending.popleft()
+                yield (path,) + future.result()
+        while pending:
+            path, future = pending.popleft()
+            yield (path,) + future.result()
+
+def import_bug_files(paths, workers=1, progress=None, **options):
+    """导入若干 CSV / XLSX / JSONL 文件，返回 bulk_import_bugs 的报告并附加
+    'errors'（无效行数）和 'error_details'（[(文件, 行号, 错误信息)]，最多 MAX_ERROR_DETAILS 条）
+
+    无效行跳过并记录，不影响其余行；写入时才能发现的错误（如研发人员ID不存在）同样按行号记录。
+    options 传给 bulk_import_bugs（batch_size、transaction_rows）。
+    """
+    for path in paths:
+        detect_format(path)
+    error_count = 0
+    error_details = []
+    # 最近交给 bulk_import_bugs 的记录所在的 (文件, 行号)
+    location = None
+
+    def add_error(path, line_number, message):
+        nonlocal error_count
+        error_count += 1
+        if len(error_details) < MAX_ERROR_DETAILS:
+            error_details.append((path, line_number, message))
+
+    def records():
+        nonlocal location
+        for path, bugs, errors in _iter_parsed_chunks(paths, workers):
+            for line_number, message in errors:
+                add_error(path, line_number, message)
+            for line_number, bug in bugs:
+                location = (path, line_number)
+                yield bug
+
+    def on_error(bug, message):
+        # bulk_import_bugs 在取出一行后立即校验，出错的就是最近产出的那一行
+        add_error(*location, message)
+
+    report = bulk_import_bugs(records(), progress=progress, on_error=on_error, **options)
+    report['errors'] = error_count
+    report['error_details'] = error_details
+    if error_count:
+        logger.warning("批量导入跳过无效行 %s 条", error_count)
+    return report
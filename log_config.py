@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BUG管理系统 - 日志配置
+日志记录通过 QueueHandler 投递到后台线程，由其写入按大小轮转的JSON日志文件，
+调用方线程不做任何文件IO；控制台只输出警告及以上级别。
+
+环境变量:
+    BUG_LOG_LEVEL    全局日志级别，默认 INFO
+    BUG_LOG_LEVELS   按模块设置级别，例如 "database=DEBUG,exporter=WARNING"
+    BUG_LOG_DIR      日志目录，默认为数据目录（BUG_DATA_DIR）下的 logs
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+from datetime import datetime, timezone
+
+from database import DATA_DIR
+
+# 默认日志目录（与数据库同在数据目录下，不随启动时的工作目录变化）
+DEFAULT_LOG_DIR = os.path.join(DATA_DIR, 'logs')
+LOG_FILE_NAME = 'bug_system.log'
+# 慢查询单独写入此文件（同时也会写入主日志）
+SLOW_QUERY_LOG_FILE_NAME = 'slow_query.log'
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+_listener = None
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出为一行JSON"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+def parse_module_levels(spec):
+    """解析 "database=DEBUG,exporter=WARNING" 形式的模块级别配置"""
+    levels = {}
+    for item in (spec or '').split(','):
+        if '=' not in item:
+            continue
+        name, level = item.split('=', 1)
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+def setup_logging(level=None, log_dir=None, module_levels=None, console_level=logging.WARNING):
+    """配置根日志（重复调用无副作用，适配 Streamlit 每次交互重跑脚本）"""
+    global _listener
+    if _listener is not None:
+        return
+
+    level = level or os.environ.get('BUG_LOG_LEVEL', 'INFO')
+    log_dir = log_dir or os.environ.get('BUG_LOG_DIR', DEFAULT_LOG_DIR)
+    if module_levels is None:
+        module_levels = parse_module_levels(os.environ.get('BUG_LOG_LEVELS'))
+
+    os.makedirs(log_dir, exist_ok=True)
+    file_handler = logging.handlers.RotatingFileHandler(
+        os.path.join(log_dir, LOG_FILE_NAME), maxBytes=LOG_MAX_BYTES,
+        backupCount=LOG_BACKUP_COUNT, encoding='utf-8')
+    file_handler.setFormatter(JsonFormatter())
+
+    slow_query_handler = logging.handlers.RotatingFileHandler(
+        os.path.join(log_dir, SLOW_QUERY_LOG_FILE_NAME), maxBytes=LOG_MAX_BYTES,
+        backupCount=LOG_BACKUP_COUNT, encoding='utf-8')
+    slow_query_handler.setFormatter(JsonFormatter())
+    slow_query_handler.addFilter(logging.Filter('slow_query'))
+
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(console_level)
+    console_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    for name, module_level in module_levels.items():
+        logging.getLogger(name).setLevel(module_level)
+
+    _listener = logging.handlers.QueueListener(log_queue, file_handler, slow_query_handler, console_handler,
+                                               respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
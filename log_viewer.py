@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+大日志文件分页查看
+通过 mmap 按需读取日志中的若干行，不把整个文件读入内存。每个文件的行首偏移索引
+构建一次后缓存在进程内（附件按内容哈希存储，内容不会变化）；压缩存储的日志首次查看时
+解压到附件目录下的 cache/logs 后再映射，缓存目录超过大小上限时删除最久未用的解压文件。
+
+Streamlit 会把下载内容整个放在内存中，因此大日志按行边界拆成多段分别下载，
+每次点击最多读取一段。
+
+环境变量:
+    BUG_LOG_CACHE_MAX_MB         解压缓存目录的大小上限（MB），默认 2048
+    BUG_LOG_DOWNLOAD_PART_MB     单个下载文件的最大大小（MB），默认 64
+"""
+
+import logging
+import mmap
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from attachments import UPLOAD_DIR
+from compression import codec_of, open_attachment, strip_codec_suffix
+
+logger = logging.getLogger(__name__)
+
+# 压缩日志的解压缓存目录
+LOG_CACHE_DIR = os.path.join(UPLOAD_DIR, 'cache', 'logs')
+# 进程内缓存的行索引数量
+LOG_INDEX_CACHE_SIZE = 16
+# 构建行索引时每次扫描的字节数
+INDEX_SCAN_BYTES = 64 * 1024 * 1024
+# 解压缓存目录的大小上限
+LOG_CACHE_MAX_BYTES = int(float(os.environ.get('BUG_LOG_CACHE_MAX_MB', '2048')) * 1024 * 1024)
+# 单个下载文件的最大字节数，更大的日志拆成多段下载
+LOG_DOWNLOAD_PART_BYTES = int(float(os.environ.get('BUG_LOG_DOWNLOAD_PART_MB', '64')) * 1024 * 1024)
+# 解压时每次读取的字节数
+COPY_CHUNK_SIZE = 1024 * 1024
+# 搜索最多返回的匹配行数
+MAX_SEARCH_RESULTS = 200
+
+_index_cache = OrderedDict()
+_index_lock = threading.Lock()
+
+def _trim_log_cache(keep):
+    """缓存目录超过大小上限时，按最近访问时间删除最旧的解压文件（keep 除外）"""
+    entries = []
+    total = 0
+    with os.scandir(LOG_CACHE_DIR) as it:
+        for entry in it:
+            if entry.name.startswith('unpack_') or not entry.is_file():
+                continue
+            stat = entry.stat()
+            entries.append((stat.st_atime, stat.st_size, entry.path))
+            total += stat.st_size
+    for _, size, path in sorted(entries):
+        if total <= LOG_CACHE_MAX_BYTES:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except OSError as e:
+            # Windows 上正被其他会话映射的文件无法删除，下次再清理
+            logger.debug("删除日志解压缓存 %s 失败: %s", path, e)
+            continue
+        total -= size
+        logger.info("日志解压缓存超过上限，删除 %s", path)
+
+def readable_path(path, decompress=True):
+    """返回可以直接 mmap 的文件路径，压缩日志先解压到缓存目录
+
+    decompress 为 False 时不解压，压缩日志尚未解压则返回 None。
+    """
+    if not codec_of(path):
+        return path
+
+    cached_path = os.path.join(LOG_CACHE_DIR, strip_codec_suffix(os.path.basename(path)))
+    try:
+        # 只更新访问时间作为缓存淘汰依据，修改时间是行索引缓存键的一部分
+        os.utime(cached_path, ns=(time.time_ns(), os.stat(cached_path).st_mtime_ns))
+        cached = True
+    except FileNotFoundError:
+        cached = False
+    if not cached:
+        if not decompress:
+            return None
+        os.makedirs(LOG_CACHE_DIR, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=LOG_CACHE_DIR, prefix='unpack_')
+        try:
+            with os.fdopen(fd, 'wb') as out, open_attachment(path) as f:
+                while True:
+                    chunk = f.read(COPY_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+            os.replace(temp_path, cached_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        logger.info("解压日志 %s 到 %s", path, cached_path)
+        _trim_log_cache(cached_path)
+    return cached_path
+
+def _build_line_index(path, size):
+    """扫描文件得到每一行的起始偏移"""
+    offsets = [np.zeros(1, dtype=np.int64)]
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for start in range(0, size, INDEX_SCAN_BYTES):
+            chunk = np.frombuffer(mm, dtype=np.uint8, count=min(INDEX_SCAN_BYTES, size - start), offset=start)
+            offsets.append(np.flatnonzero(chunk == 10).astype(np.int64) + start + 1)
+            del chunk
+    offsets = np.concatenate(offsets)
+    # 文件以换行结尾时，最后一个偏移等于文件大小，不构成新的一行
+    if len(offsets) > 1 and offsets[-1] == size:
+        offsets = offsets[:-1]
+    return offsets
+
+def get_line_index(path):
+    """返回 (可读路径, 行首偏移数组, 文件大小)，索引按 (路径, 修改时间, 大小) 缓存"""
+    path = readable_path(path)
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    with _index_lock:
+        offsets = _index_cache.get(key)
+        if offsets is not None:
+            _index_cache.move_to_end(key)
+            return path, offsets, stat.st_size
+
+    if stat.st_size == 0:
+        offsets = np.zeros(0, dtype=np.int64)
+    else:
+        offsets = _build_line_index(path, stat.st_size)
+        logger.debug("构建日志行索引 %s: %s 行", path, len(offsets))
+
+    with _index_lock:
+        _index_cache[key] = offsets
+        while len(_index_cache) > LOG_INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return path, offsets, stat.st_size
+
+def get_log_info(path):
+    """日志的行数和大小（解压后）"""
+    _, offsets, size = get_line_index(path)
+    return {'lines': len(offsets), 'size': size}
+
+def read_lines(path, start, count):
+    """读取从第 start 行（从0开始）起的 count 行，返回 (实际起始行, 行列表)"""
+    path, offsets, size = get_line_index(path)
+    total = len(offsets)
+    if total == 0:
+        return 0, []
+    start = max(0, min(start, total - 1))
+    end = min(start + count, total)
+    begin_offset = int(offsets[start])
+    end_offset = int(offsets[end]) if end < total else size
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        data = mm[begin_offset:end_offset]
+    return start, data.decode('utf-8', errors='replace').splitlines()
+
+def search_log(path, pattern, ignore_case=True, max_results=MAX_SEARCH_RESULTS):
+    """在日志中按正则搜索，返回 [(行号, 行内容)]，行号从0开始，每行只返回一次
+
+    ^ 和 $ 按行匹配；正则表达式无效时抛出 ValueError。
+    """
+    try:
+        flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+        regex = re.compile(pattern.encode('utf-8'), flags)
+    except re.error as e:
+        raise ValueError(f"无效的正则表达式: {e}") from e
+
+    path, offsets, size = get_line_index(path)
+    if size == 0:
+        return []
+
+    results = []
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        position = 0
+        while len(results) < max_results:
+            match = regex.search(mm, position)
+            if match is None:
+                break
+            line = int(np.searchsorted(offsets, match.start(), side='right')) - 1
+            line_end = int(offsets[line + 1]) if line + 1 < len(offsets) else size
+            results.append((line, mm[int(offsets[line]):line_end].decode('utf-8', errors='replace').rstrip('\r\n')))
+            # 从下一行开始继续搜索，同一行的多个匹配只返回一次
+            position = max(line_end, match.end() + 1 if match.end() == match.start() else match.end())
+            if position >= size:
+                break
+    return results
+
+def download_parts(path):
+    """把日志（解压后）按行边界拆成不超过 LOG_DOWNLOAD_PART_BYTES 的若干段，返回 [(起始偏移, 结束偏移)]
+
+    压缩日志尚未解压（还没有打开查看）时返回 None。
+    """
+    path = readable_path(path, decompress=False)
+    if path is None:
+        return None
+    size = os.path.getsize(path)
+    if size <= LOG_DOWNLOAD_PART_BYTES:
+        return [(0, size)]
+
+    parts = []
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = 0
+        while start < size:
+            end = min(start + LOG_DOWNLOAD_PART_BYTES, size)
+            if end < size:
+                # 在本段最后一个换行之后切分；单行超过分段大小时按字节切分
+                newline = mm.rfind(b'\n', start, end)
+                if newline >= 0:
+                    end = newline + 1
+            parts.append((start, end))
+            start = end
+    return parts
+
+def download_log(path, start=0, end=None):
+    """返回供 st.download_button 使用的回调：点击下载时才读取解压后日志的 [start, end) 字节"""
+    def read_content():
+        with open(readable_path(path), 'rb') as f:
+            f.seek(start)
+            return f.read(-1 if end is None else end - start)
+    return read_content
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BUG管理系统 - 命令行维护工具
+用法（--project 指定操作的项目，默认为默认项目）:
+    python manage.py rebuild-stats    重建统计汇总表
+    python manage.py check-stats      检查统计汇总表与bugs表是否一致
+    python manage.py check-plans      检查热点查询是否使用了预期索引
+    python manage.py rebuild-search   重建BUG全文索引（含日志附件）
+    python manage.py import-attachments  把旧版本 uploads/ 中的附件导入去重存储
+    python manage.py gc-attachments   回收未被引用的附件
+    python manage.py attachment-stats 显示附件存储占用和去重节省的空间
+    python manage.py thumbnails       为已有截图补齐缩略图和预览图
+    python manage.py import-bugs 文件...  从 CSV / XLSX / JSONL 批量导入BUG
+    python manage.py bench-login      测试当前密码哈希强度下每秒可处理的登录数
+    python manage.py bench-permissions  测试列表页每次重跑的权限判断开销
+    python manage.py bench-search [--seed 行数]  测试全文搜索耗时（--seed 先在空项目中生成测试数据）
+    python manage.py bench-details [--seed 行数]  比较逐个与批量读取BUG详情的语句数和耗时
+    python manage.py bench-load [--sessions 50]  模拟多个会话并发读写，测试吞吐量和锁冲突
+    python manage.py list-projects    列出全部项目及其数据库文件
+    python manage.py create-project 标识 [名称]  新建项目（独立的数据库文件）
+    python manage.py --project mobile check-stats  对指定项目执行命令
+"""
+
+import argparse
+import sys
+
+import attachments
+import database
+import importer
+import passwords
+import permissions
+import thumbnails
+from log_config import setup_logging
+
+def rebuild_stats(args):
+    """重建统计汇总表"""
+    database.rebuild_stats_rollups()
+    return 0
+
+def check_stats(args):
+    """检查统计汇总表一致性，不一致时返回非零退出码"""
+    mismatches = database.check_stats_rollups()
+    if not mismatches:
+        print("统计汇总表与bugs表一致")
+        return 0
+
+    for table, key, expected, actual in mismatches:
+        print(f"{table} {key}: 重算值 {expected}, 汇总表值 {actual}")
+    print("存在不一致，可执行 python manage.py rebuild-stats 重建")
+    return 1
+
+def check_plans(args):
+    """检查热点查询的查询计划，未命中预期索引时返回非零退出码"""
+    failures = database.check_query_plans()
+    if not failures:
+        print("所有热点查询均使用了预期索引")
+        return 0
+
+    for name, expected_index, plan in failures:
+        print(f"{name}: 预期使用 {expected_index}, 实际查询计划: {plan}")
+    return 1
+
+def rebuild_search(args):
+    """重建BUG全文索引"""
+    database.rebuild_search_index()
+    return 0
+
+def format_bytes(size):
+    """以合适的单位显示字节数"""
+    if size < 1024:
+        return f"{size} B"
+    for unit in ('KB', 'MB', 'GB'):
+        size /= 1024
+        if size < 1024 or unit == 'GB':
+            return f"{size:.1f} {unit}"
+
+def import_attachments(args):
+    """导入旧附件"""
+    report = attachments.import_legacy_attachments()
+    print(f"导入 {report['files']} 个附件，缺失 {report['missing']} 个")
+    print(f"原占用 {format_bytes(report['bytes_before'])}，去重后 {format_bytes(report['bytes_after'])}，"
+          f"节省 {format_bytes(report['bytes_before'] - report['bytes_after'])}")
+    return 0
+
+def gc_attachments(args):
+    """回收未被引用的附件"""
+    count, freed = database.collect_orphan_attachments(args.grace)
+    print(f"回收 {count} 个附件，释放 {format_bytes(freed)}")
+    return 0
+
+def attachment_stats(args):
+    """显示附件存储统计"""
+    stats = database.get_attachment_stats()
+    print(f"文件数: {stats['blobs']}（未引用 {stats['orphans']}）")
+    print(f"实际占用: {format_bytes(stats['stored_bytes'])}")
+    print(f"按引用计算: {format_bytes(stats['referenced_bytes'])}")
+    print(f"去重节省: {format_bytes(stats['saved_bytes'])}")
+    return 0
+
+def backfill_thumbnails(args):
+    """为已有截图补齐缩略图和预览图"""
+    report = thumbnails.backfill_derivatives(database.get_screenshot_paths())
+    print(f"截图 {report['images']} 张，新生成派生图 {report['generated']} 个，"
+          f"原图缺失 {report['missing']} 张，失败 {report['failed']} 张")
+    print(f"原图共 {format_bytes(report['original_bytes'])}，缩略图共 {format_bytes(report['thumb_bytes'])}")
+    return 0 if report['failed'] == 0 else 1
+
+def import_bugs(args):
+    """从文件批量导入BUG"""
+    def progress(rows):
+        print(f"已导入 {rows} 条...", flush=True)
+
+    report = importer.import_bug_files(args.files, workers=args.workers, progress=progress,
+                                       batch_size=args.batch_size, transaction_rows=args.transaction_rows)
+    print(f"导入 {report['rows']} 条BUG，用时 {report['seconds']:.1f} 秒，{report['rows_per_sec']:.0f} 条/秒")
+    if report['unknown_assignees']:
+        print(f"不存在的研发人员（已设为未分配）: {', '.join(report['unknown_assignees'])}")
+    if report['errors']:
+        print(f"跳过无效行 {report['errors']} 条:")
+        for path, line_number, message in report['error_details']:
+            print(f"  {path}:{line_number}: {message}")
+    return 0 if report['errors'] == 0 else 1
+
+def bench_login(args):
+    """测试密码验证吞吐量"""
+    report = passwords.benchmark_logins(args.logins, args.concurrency)
+    print(f"算法 {report['algorithm']}（参数 {'/'.join(report['params'])}），单次哈希 {report['hash_ms']:.1f} 毫秒")
+    print(f"{args.concurrency} 个会话并发登录 {report['logins']} 次，用时 {report['seconds']:.2f} 秒，"
+          f"{report['logins_per_sec']:.1f} 次/秒（验证线程 {passwords.PASSWORD_WORKERS} 个）")
+    return 0
+
+def bench_permissions(args):
+    """测试列表页权限判断开销"""
+    report = permissions.benchmark_list_permissions(args.page_size, args.rounds)
+    for role, micros in report.items():
+        print(f"{role:<10} 每页 {args.page_size} 个BUG: {micros:.1f} 微秒/次重跑")
+    return 0
+
+def seed_benchmark(rows):
+    """在空项目中生成基准测试数据，失败时返回 False"""
+    try:
+        report = database.seed_benchmark_bugs(
+            rows, progress=lambda done: print(f"\r已生成 {done} 条", end='', flush=True))
+    except ValueError as e:
+        print(e)
+        return False
+    print(f"\n生成 {report['rows']} 条BUG，用时 {report['seconds']:.1f} 秒")
+    return True
+
+def bench_search(args):
+    """测试全文搜索耗时"""
+    if args.seed and not seed_benchmark(args.seed):
+        return 1
+    report = database.benchmark_search(args.rounds)
+    print(f"BUG总数 {report['rows']}，每个查询执行 {args.rounds} 次（不经过查询缓存）")
+    for label, text, total, median_ms, max_ms in report['queries']:
+        print(f"{label:<6} {text!r:<20} 匹配 {total:>5} 条  中位数 {median_ms:7.1f} 毫秒  最大 {max_ms:7.1f} 毫秒")
+    return 0
+
+def bench_details(args):
+    """比较逐个与批量读取BUG详情"""
+    if args.seed and not seed_benchmark(args.seed):
+        return 1
+    report = database.benchmark_bug_details(args.bugs)
+    print(f"读取 {report['bugs']} 个BUG的详情（不经过查询缓存）")
+    for label, mode in (("逐个 get_bug_details", 'single'), ("批量 get_bug_details_many", 'batch')):
+        statements, ms = report[mode]
+        print(f"{label:<26} {statements:>6} 条语句  {ms:8.1f} 毫秒")
+    return 0
+
+def bench_load(args):
+    """模拟多个会话并发读写"""
+    if args.seed and not seed_benchmark(args.seed):
+        return 1
+    report = database.benchmark_load(args.sessions, args.seconds, args.write_ratio)
+    print(f"{report['sessions']} 个会话并发 {report['seconds']:.1f} 秒: 读 {report['reads']} 次，写 {report['writes']} 次，"
+          f"{report['ops_per_sec']:.0f} 次/秒，95分位耗时 {report['p95_ms']:.1f} 毫秒")
+    if report['errors']:
+        for message, count in report['errors'].items():
+            print(f"  错误 {count} 次: {message}")
+        return 1
+    print("没有出现数据库错误")
+    return 0
+
+def list_projects(args):
+    """列出全部项目"""
+    for project in database.list_projects():
+        print(f"{project['key']:<16} {project['name']:<16} {project['path']}")
+    return 0
+
+def create_project(args):
+    """新建项目"""
+    try:
+        database.create_project(args.key, args.name)
+    except ValueError as e:
+        print(e)
+        return 1
+    print(f"已创建项目 {args.key}: {database.get_project_path(args.key)}")
+    return 0
+
+def main(argv=None):
+    """主入口"""
+    parser = argparse.ArgumentParser(description="BUG管理系统命令行维护工具")
+    parser.add_argument('--project', default=database.DEFAULT_PROJECT, help="操作的项目标识")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('rebuild-stats', help="重建统计汇总表").set_defaults(func=rebuild_stats)
+    subparsers.add_parser('check-stats', help="检查统计汇总表一致性").set_defaults(func=check_stats)
+    subparsers.add_parser('check-plans', help="检查热点查询的索引使用情况").set_defaults(func=check_plans)
+    subparsers.add_parser('rebuild-search', help="重建BUG全文索引").set_defaults(func=rebuild_search)
+    subparsers.add_parser('import-attachments', help="把旧附件导入去重存储").set_defaults(func=import_attachments)
+    gc_parser = subparsers.add_parser('gc-attachments', help="回收未被引用的附件")
+    gc_parser.add_argument('--grace', type=int, default=database.ATTACHMENT_GC_GRACE_SECONDS,
+                           help="未引用附件至少保留的秒数")
+    gc_parser.set_defaults(func=gc_attachments)
+    subparsers.add_parser('attachment-stats', help="显示附件存储统计").set_defaults(func=attachment_stats)
+    subparsers.add_parser('thumbnails', help="为已有截图补齐缩略图").set_defaults(func=backfill_thumbnails)
+    import_parser = subparsers.add_parser('import-bugs', help="从 CSV / XLSX / JSONL 批量导入BUG")
+    import_parser.add_argument('files', nargs='+', help="导入文件，按扩展名识别格式")
+    import_parser.add_argument('--workers', type=int, default=1, help="解析文件的进程数")
+    import_parser.add_argument('--batch-size', type=int, default=database.BULK_IMPORT_BATCH_SIZE,
+                               help="每次批量插入的行数")
+    import_parser.add_argument('--transaction-rows', type=int, default=database.BULK_IMPORT_TRANSACTION_ROWS,
+                               help="每个事务提交的行数")
+    import_parser.set_defaults(func=import_bugs)
+    bench_parser = subparsers.add_parser('bench-login', help="测试密码验证吞吐量")
+    bench_parser.add_argument('--logins', type=int, default=50, help="登录次数")
+    bench_parser.add_argument('--concurrency', type=int, default=8, help="并发会话数")
+    bench_parser.set_defaults(func=bench_login)
+    perm_parser = subparsers.add_parser('bench-permissions', help="测试列表页权限判断开销")
+    perm_parser.add_argument('--page-size', type=int, default=100, help="每页BUG数")
+    perm_parser.add_argument('--rounds', type=int, default=2000, help="重复次数")
+    perm_parser.set_defaults(func=bench_permissions)
+    search_parser = subparsers.add_parser('bench-search', help="测试全文搜索耗时")
+    search_parser.add_argument('--seed', type=int, default=0, help="先生成的测试BUG数（只能用于空项目）")
+    search_parser.add_argument('--rounds', type=int, default=5, help="每个查询的执行次数")
+    search_parser.set_defaults(func=bench_search)
+    details_parser = subparsers.add_parser('bench-details', help="比较逐个与批量读取BUG详情")
+    details_parser.add_argument('--seed', type=int, default=0, help="先生成的测试BUG数（只能用于空项目）")
+    details_parser.add_argument('--bugs', type=int, default=10000, help="读取详情的BUG数")
+    details_parser.set_defaults(func=bench_details)
+    load_parser = subparsers.add_parser('bench-load', help="模拟多个会话并发读写")
+    load_parser.add_argument('--seed', type=int, default=0, help="先生成的测试BUG数（只能用于空项目）")
+    load_parser.add_argument('--sessions', type=int, default=50, help="并发会话数")
+    load_parser.add_argument('--seconds', type=float, default=8.0, help="持续时间（秒）")
+    load_parser.add_argument('--write-ratio', type=float, default=0.1, help="写操作比例")
+    load_parser.set_defaults(func=bench_load)
+    subparsers.add_parser('list-projects', help="列出全部项目").set_defaults(func=list_projects)
+    project_parser = subparsers.add_parser('create-project', help="新建项目")
+    project_parser.add_argument('key', help="项目标识（小写字母、数字、下划线和短横线）")
+    project_parser.add_argument('name', nargs='?', help="项目名称，默认与标识相同")
+    project_parser.set_defaults(func=create_project)
+
+    args = parser.parse_args(argv)
+    setup_logging()
+    try:
+        database.set_current_project(args.project)
+    except ValueError as e:
+        print(e)
+        return 1
+    return args.func(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
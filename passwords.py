@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+密码哈希
+密码以自描述格式保存在 users.password_hash 中（算法$参数$盐值$哈希），算法和强度可通过环境变量调整；
+登录验证成功时如果发现哈希的算法或强度与当前配置不同，由调用方用 hash_password 重新生成（透明升级）。
+旧版本的 sha256(密码 + 盐值) 哈希（盐值在 users.salt 列）仍可验证，首次登录后即被升级。
+
+scrypt / PBKDF2 的计算会释放 GIL，但每次要消耗数十到上百毫秒 CPU（scrypt 还要 16MB 内存），
+因此验证放到一个固定大小的线程池中执行：登录高峰时多余的请求排队，不会挤占其他会话的脚本线程。
+
+环境变量:
+    BUG_PASSWORD_HASHER      新密码使用的算法: scrypt（默认）或 pbkdf2_sha256
+    BUG_SCRYPT_N             scrypt 的 CPU/内存代价参数 N（2 的幂），默认 16384
+    BUG_PBKDF2_ITERATIONS    PBKDF2 迭代次数，默认 600000
+    BUG_PASSWORD_WORKERS     密码验证线程数，默认 2
+"""
+
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# 新密码使用的算法
+PASSWORD_HASHER = os.environ.get('BUG_PASSWORD_HASHER', 'scrypt')
+# scrypt 参数（N=16384, r=8 时每次计算约需 16MB 内存）
+SCRYPT_N = int(os.environ.get('BUG_SCRYPT_N', '16384'))
+SCRYPT_R = 8
+SCRYPT_P = 1
+# PBKDF2-HMAC-SHA256 迭代次数
+PBKDF2_ITERATIONS = int(os.environ.get('BUG_PBKDF2_ITERATIONS', '600000'))
+# 密码验证线程数
+PASSWORD_WORKERS = int(os.environ.get('BUG_PASSWORD_WORKERS', '2'))
+# 盐值字节数
+SALT_BYTES = 16
+
+class ScryptHasher:
+    """scrypt$N$r$p$盐值$哈希"""
+    algorithm = 'scrypt'
+
+    def __init__(self, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P):
+        self.n, self.r, self.p = n, r, p
+
+    @staticmethod
+    def _derive(password, salt, n, r, p):
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                              maxmem=256 * n * r + 1024 * 1024, dklen=32)
+
+    def encode(self, password):
+        salt = secrets.token_bytes(SALT_BYTES)
+        digest = self._derive(password, salt, self.n, self.r, self.p)
+        return f"{self.algorithm}${self.n}${self.r}${self.p}${salt.hex()}${digest.hex()}"
+
+    def verify(self, password, encoded):
+        _, n, r, p, salt, digest = encoded.split('$')
+        actual = self._derive(password, bytes.fromhex(salt), int(n), int(r), int(p))
+        return hmac.compare_digest(actual, bytes.fromhex(digest))
+
+    def is_current(self, encoded):
+        return encoded.split('$')[1:4] == [str(self.n), str(self.r), str(self.p)]
+
+class PBKDF2Hasher:
+    """pbkdf2_sha256$迭代次数$盐值$哈希"""
+    algorithm = 'pbkdf2_sha256'
+
+    def __init__(self, iterations=PBKDF2_ITERATIONS):
+        self.iterations = iterations
+
+    def encode(self, password):
+        salt = secrets.token_bytes(SALT_BYTES)
+        digest = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, self.iterations)
+        return f"{self.algorithm}${self.iterations}${salt.hex()}${digest.hex()}"
+
+    def verify(self, password, encoded):
+        _, iterations, salt, digest = encoded.split('$')
+        actual = hashlib.pbkdf2_hmac('sha256', password.encode(), bytes.fromhex(salt), int(iterations))
+        return hmac.compare_digest(actual, bytes.fromhex(digest))
+
+    def is_current(self, encoded):
+        return encoded.split('$')[1] == str(self.iterations)
+
+# 算法名 -> 哈希器
+HASHERS = {hasher.algorithm: hasher for hasher in (ScryptHasher(), PBKDF2Hasher())}
+
+if PASSWORD_HASHER not in HASHERS:
+    raise ValueError(f"不支持的密码哈希算法: {PASSWORD_HASHER}（支持 {', '.join(HASHERS)}）")
+
+_executor = None
+_executor_lock = threading.Lock()
+# 用户名不存在时用来验证的哈希，使其耗时与真实验证一致，避免据此探测用户名
+_dummy_hash = None
+
+def hash_password(password):
+    """用当前配置的算法生成密码哈希（盐值包含在结果中）"""
+    return HASHERS[PASSWORD_HASHER].encode(password)
+
+def _verify_legacy(password, stored_hash, salt):
+    """旧版本的 sha256(密码 + 盐值)"""
+    digest = hashlib.sha256((password + (salt or '')).encode()).hexdigest()
+    return hmac.compare_digest(digest, stored_hash)
+
+def verify_password(password, stored_hash, legacy_salt=None):
+    """验证密码，返回 (是否匹配, 是否需要用当前配置重新哈希)"""
+    algorithm = stored_hash.split('$', 1)[0]
+    hasher = HASHERS.get(algorithm)
+    if hasher is None:
+        if '$' in stored_hash:
+            logger.warning("无法识别的密码哈希算法: %s", algorithm)
+            return False, False
+        return _verify_legacy(password, stored_hash, legacy_salt), True
+
+    try:
+        matched = hasher.verify(password, stored_hash)
+    except ValueError as e:
+        logger.warning("密码哈希格式错误: %s", e)
+        return False, False
+    return matched, algorithm != PASSWORD_HASHER or not hasher.is_current(stored_hash)
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max(PASSWORD_WORKERS, 1), thread_name_prefix='password')
+        return _executor
+
+def check_password(password, stored_hash, legacy_salt=None):
+    """在密码验证线程池中执行 verify_password 并等待结果"""
+    return _get_executor().submit(verify_password, password, stored_hash, legacy_salt).result()
+
+def check_dummy_password(password):
+    """用户不存在时调用，消耗与一次真实验证相同的时间，结果总是不匹配"""
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = hash_password(secrets.token_hex(SALT_BYTES))
+    check_password(password, _dummy_hash)
+    return False, False
+
+def benchmark_logins(logins=50, concurrency=8):
+    """模拟 concurrency 个会话同时登录共 logins 次，返回 {'algorithm', 'params', 'hash_ms': 单次哈希耗时,
+    'logins': 次数, 'seconds': 总耗时, 'logins_per_sec': 每秒登录数}"""
+    password = secrets.token_hex(8)
+    start = time.perf_counter()
+    encoded = hash_password(password)
+    hash_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as sessions:
+        results = list(sessions.map(lambda _: check_password(password, encoded)[0], range(logins)))
+    seconds = time.perf_counter() - start
+    if not all(results):
+        raise RuntimeError("密码验证结果不正确")
+    return {
+        'algorithm': PASSWORD_HASHER,
+        'params': encoded.split('$')[1:-2],
+        'hash_ms': hash_ms,
+        'logins': logins,
+        'seconds': seconds,
+        'logins_per_sec': logins / seconds if seconds else 0.0,
+    }
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+角色权限
+各角色的权限表在导入时编译成不可变集合，check_permission 只做一次集合查找。
+页面在每次重跑开始时用 get_capabilities 取出当前用户的全部权限，之后直接判断成员关系；
+"只能编辑自己提交的BUG" 这类按BUG判断的权限用 editable_bug_mask 对一整页BUG一次算出。
+
+'all' 展开为权限表中出现过的全部权限加上 ADMIN_ONLY_PERMISSIONS。与旧版本不同，管理员对
+不在表中的权限名（例如拼写错误）也返回 False；新增权限时需要把它加入某个角色或 ADMIN_ONLY_PERMISSIONS。
+"""
+
+import time
+
+import numpy as np
+
+# 各角色的权限，'all' 表示拥有全部权限
+ROLE_PERMISSIONS = {
+    'admin': ('all',),
+    'pm': ('view_bugs', 'create_bug', 'edit_bug', 'delete_bug', 'manage_developers', 'view_stats', 'export_data'),
+    'developer': ('view_bugs', 'create_bug', 'edit_own_bug', 'view_stats'),
+    'tester': ('view_bugs', 'create_bug', 'edit_own_bug', 'view_stats'),
+    'guest': ('view_bugs', 'view_stats'),
+}
+# 只授予 'all' 的权限（用户管理、性能监控、新建项目）
+ADMIN_ONLY_PERMISSIONS = ('manage_users', 'view_metrics', 'manage_projects')
+
+def _compile_permissions():
+    """把权限表展开为 角色 -> frozenset，'all' 展开为全部权限"""
+    all_permissions = frozenset(action for actions in ROLE_PERMISSIONS.values() for action in actions
+                                if action != 'all') | frozenset(ADMIN_ONLY_PERMISSIONS)
+    return all_permissions, {
+        role: all_permissions if 'all' in actions else frozenset(actions)
+        for role, actions in ROLE_PERMISSIONS.items()
+    }
+
+ALL_PERMISSIONS, ROLE_CAPABILITIES = _compile_permissions()
+NO_PERMISSIONS = frozenset()
+
+def get_capabilities(user_role):
+    """返回角色拥有的全部权限（frozenset），未知角色没有任何权限"""
+    return ROLE_CAPABILITIES.get(user_role, NO_PERMISSIONS)
+
+def check_permission(user_role, action):
+    """检查用户权限（未知的权限名对所有角色都返回 False）"""
+    return action in ROLE_CAPABILITIES.get(user_role, NO_PERMISSIONS)
+
+def bug_owner_name(user):
+    """BUG的提交人字段中代表该用户的名字（提交时填入真实姓名，未设置时为用户名）"""
+    return user.get('real_name') or user.get('username', '')
+
+def editable_bug_mask(user, submitters, capabilities=None):
+    """对一页BUG的提交人一次算出当前用户能否编辑，返回与 submitters 等长的布尔数组"""
+    if capabilities is None:
+        capabilities = get_capabilities(user['role'])
+    count = len(submitters)
+    if 'edit_bug' in capabilities:
+        return np.ones(count, dtype=bool)
+    if 'edit_own_bug' not in capabilities:
+        return np.zeros(count, dtype=bool)
+    return np.asarray(submitters, dtype=object) == bug_owner_name(user)
+
+def benchmark_list_permissions(page_size=100, rounds=2000):
+    """测量列表页每次重跑的权限判断开销：取权限集合 + 一页BUG的可编辑判断 + 页面上的各项检查，
+    返回 {角色: 每次重跑的微秒数}"""
+    submitters = [f"提交人{i % 7}" for i in range(page_size)]
+    report = {}
+    for role in ROLE_PERMISSIONS:
+        user = {'id': 1, 'username': role, 'role': role, 'real_name': '提交人3'}
+        start = time.perf_counter()
+        for _ in range(rounds):
+            capabilities = get_capabilities(role)
+            for action in ('view_stats', 'view_bugs', 'create_bug', 'manage_developers',
+                           'manage_users', 'view_metrics', 'edit_bug', 'delete_bug'):
+                action in capabilities
+            editable_bug_mask(user, submitters, capabilities)
+        report[role] = (time.perf_counter() - start) / rounds * 1e6
+    return report
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+进程内查询缓存
+Streamlit 每次交互都会从头重跑 app.py，相同的列表/统计查询会被反复执行。
+本模块为读函数提供带TTL和LRU淘汰的缓存；每张表有一个代数计数器，写操作提交后
+递增相关表的代数，依赖这些表的缓存项随即失效，其余缓存项不受影响。
+
+缓存返回的是共享对象，调用方不应修改。
+
+多个项目各用一个数据库文件时，通过 set_scope_provider 注册返回当前项目的函数，
+缓存项和表代数按作用域（项目）区分，一个项目的写入不会使其他项目的缓存失效。
+
+环境变量:
+    BUG_CACHE_TTL    缓存有效期（秒），默认 60；设为 0 关闭缓存
+    BUG_CACHE_SIZE   最多缓存的条目数，默认 256
+"""
+
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_TTL = float(os.environ.get('BUG_CACHE_TTL', '60'))
+DEFAULT_MAX_ENTRIES = int(os.environ.get('BUG_CACHE_SIZE', '256'))
+
+class QueryCache:
+    """线程安全的 TTL + LRU 缓存，键中带有所依赖表的代数"""
+
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def generations(self, tables):
+        """返回若干表当前的代数"""
+        with self._lock:
+            return tuple(self._generations.get(table, 0) for table in tables)
+
+    def invalidate(self, *tables):
+        """递增表的代数，使依赖这些表的缓存项失效"""
+        with self._lock:
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+
+    def _count(self, name, field):
+        stats = self._stats.setdefault(name, {'hits': 0, 'misses': 0})
+        stats[field] += 1
+
+    def get(self, name, key):
+        """命中返回 (True, 值)，未命中或已过期返回 (False, None)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self._count(name, 'hits')
+                return True, entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self._count(name, 'misses')
+            return False, None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """各函数的命中/未命中次数及当前条目数"""
+        with self._lock:
+            functions = {name: dict(stats) for name, stats in self._stats.items()}
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': sum(stats['hits'] for stats in functions.values()),
+                'misses': sum(stats['misses'] for stats in functions.values()),
+                'functions': functions,
+                'generations': dict(self._generations),
+            }
+
+_cache = QueryCache()
+# 返回当前作用域的函数，None 表示只有一个全局作用域
+_scope_provider = None
+
+def set_scope_provider(provider):
+    """注册返回当前缓存作用域（如当前项目）的函数"""
+    global _scope_provider
+    _scope_provider = provider
+
+def _current_scope():
+    return _scope_provider() if _scope_provider is not None else None
+
+def _scoped_tables(tables, scope):
+    """作用域内的表名（代数按作用域分别计数）"""
+    if scope is None:
+        return tables
+    return tuple(f"{scope}:{table}" for table in tables)
+
+def _freeze(value):
+    """把列表等参数转换为可哈希的形式"""
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+def cached(*tables, scope=None):
+    """读函数装饰器，tables 为该函数结果所依赖的表
+
+    scope 为固定的作用域（例如总是读写同一个数据库的函数）；默认使用调用时的当前作用域。
+    """
+    def decorator(func):
+        name = func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _cache.ttl <= 0:
+                return func(*args, **kwargs)
+            current = scope if scope is not None else _current_scope()
+            key = (name, current, _freeze(args), _freeze(kwargs),
+                   _cache.generations(_scoped_tables(tables, current)))
+            try:
+                hit, value = _cache.get(name, key)
+            except TypeError:
+                # 参数不可哈希时直接查询
+                return func(*args, **kwargs)
+            if hit:
+                return value
+            value = func(*args, **kwargs)
+            _cache.put(key, value)
+            return value
+        return wrapper
+    return decorator
+
+def invalidate(*tables, scope=None):
+    """写操作提交后调用，使依赖这些表的缓存失效；scope 默认为当前作用域"""
+    _cache.invalidate(*_scoped_tables(tables, scope if scope is not None else _current_scope()))
+
+def clear_cache():
+    """清空全部缓存条目"""
+    _cache.clear()
+
+def get_cache_stats():
+    """返回缓存命中/未命中统计"""
+    return _cache.stats()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+登录会话
+登录成功后在 user_sessions 表中保存一条会话，并发放签名令牌（会话ID.过期时间.HMAC签名）。
+令牌放在页面 URL 的查询参数中，刷新页面或断线重连后凭令牌恢复登录，无需重新输入密码。
+
+注意：令牌在 URL 中意味着复制页面链接（或浏览器历史、截图中的地址）就等于交出了登录状态，
+在有效期内任何人打开该链接都会以该用户身份登录。因此默认有效期较短（12 小时），注销会立即
+使令牌失效；不能接受这一点的部署可设置 BUG_SESSION_IN_URL=0，令牌只保存在当前页面的会话中，
+刷新页面后需要重新登录。
+
+令牌 -> 用户信息缓存在进程内的 LRU 中：缓存命中时不访问数据库；未命中或缓存超过
+BUG_SESSION_TTL 秒时只做一次按会话ID的主键查询，被停用或删除的用户随即失效，
+角色等信息的修改也在一个缓存有效期内生效。签名不对或已过期的令牌不查询数据库直接拒绝。
+恢复会话不写数据库（最后登录时间只在输入密码登录时记录，并由 database 模块批量写入）。
+
+环境变量:
+    BUG_SESSION_LIFETIME       会话有效期（秒），默认 43200（12 小时）
+    BUG_SESSION_IN_URL         是否把令牌放在 URL 中以便刷新后恢复登录，默认 1；设为 0 关闭
+    BUG_SESSION_TTL            用户信息缓存的有效期（秒），默认 300
+    BUG_SESSION_CACHE_SIZE     最多缓存的会话数，默认 1024
+    BUG_SESSION_SECRET         令牌签名密钥；未设置时使用 BUG_SESSION_SECRET_FILE 中的密钥（不存在时自动生成）
+    BUG_SESSION_SECRET_FILE    签名密钥文件，默认为数据目录（BUG_DATA_DIR）下的 session_secret.key
+"""
+
+import base64
+import hashlib
+import hmac
+import logging
+import os
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from database import (create_session_record, get_session_user_record, delete_session_record,
+                      delete_user_session_records, DATA_DIR)
+
+logger = logging.getLogger(__name__)
+
+# 会话有效期（秒）
+SESSION_LIFETIME = int(os.environ.get('BUG_SESSION_LIFETIME', '43200'))
+# 用户信息缓存的有效期（秒）
+SESSION_TTL = float(os.environ.get('BUG_SESSION_TTL', '300'))
+# 最多缓存的会话数
+SESSION_CACHE_SIZE = int(os.environ.get('BUG_SESSION_CACHE_SIZE', '1024'))
+# 签名密钥文件
+SESSION_SECRET_FILE = os.environ.get('BUG_SESSION_SECRET_FILE', os.path.join(DATA_DIR, 'session_secret.key'))
+# 保存令牌的 URL 查询参数名
+SESSION_QUERY_PARAM = 'session'
+# 是否把令牌放在 URL 中（刷新页面后恢复登录）
+SESSION_IN_URL = os.environ.get('BUG_SESSION_IN_URL', '1') != '0'
+# 令牌格式: 会话ID.过期时间.签名，只含 URL 安全的 ASCII 字符
+TOKEN_PATTERN = re.compile(r'([A-Za-z0-9_-]{1,64})\.(\d{1,12})\.([A-Za-z0-9_-]{43})')
+
+# 会话ID -> (用户信息, 缓存过期时间)，按最近使用排序
+_cache = OrderedDict()
+_lock = threading.Lock()
+_secret = None
+
+def _get_secret():
+    """读取签名密钥，密钥文件不存在时生成（仅所有者可读写）"""
+    global _secret
+    if _secret is not None:
+        return _secret
+    secret = os.environ.get('BUG_SESSION_SECRET')
+    if secret:
+        _secret = secret.encode()
+        return _secret
+    try:
+        fd = os.open(SESSION_SECRET_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(SESSION_SECRET_FILE, 'rb') as f:
+            _secret = f.read().strip()
+    else:
+        _secret = secrets.token_hex(32).encode()
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_secret)
+        logger.info("生成会话签名密钥: %s", SESSION_SECRET_FILE)
+    return _secret
+
+def _sign(payload):
+    digest = hmac.new(_get_secret(), payload.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b'=').decode()
+
+def _parse_token(token):
+    """校验令牌签名，返回 (会话ID, 过期时间)；格式不对或签名错误时返回 None
+
+    令牌来自 URL，可能是任意字符串，先按格式过滤，再比较签名的字节串。
+    """
+    match = TOKEN_PATTERN.fullmatch(token) if isinstance(token, str) else None
+    if match is None:
+        return None
+    session_id, expires_at, signature = match.groups()
+    if not hmac.compare_digest(signature.encode(), _sign(f"{session_id}.{expires_at}").encode()):
+        return None
+    return session_id, int(expires_at)
+
+def _cache_put(session_id, user):
+    with _lock:
+        _cache[session_id] = (user, time.monotonic() + SESSION_TTL)
+        _cache.move_to_end(session_id)
+        while len(_cache) > SESSION_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+def create_session(user):
+    """为登录成功的用户创建会话，返回令牌"""
+    session_id = secrets.token_urlsafe(18)
+    expires_at = int(time.time()) + SESSION_LIFETIME
+    create_session_record(session_id, user['id'], expires_at)
+    _cache_put(session_id, user)
+    payload = f"{session_id}.{expires_at}"
+    return f"{payload}.{_sign(payload)}"
+
+def get_session_user(token):
+    """返回令牌对应的用户信息；令牌无效、会话已过期或用户已停用时返回 None"""
+    if not token:
+        return None
+    parsed = _parse_token(token)
+    if parsed is None:
+        logger.warning("会话令牌格式或签名无效")
+        return None
+    session_id, expires_at = parsed
+    if expires_at <= time.time():
+        with _lock:
+            _cache.pop(session_id, None)
+        return None
+
+    with _lock:
+        entry = _cache.get(session_id)
+        if entry is not None and time.monotonic() < entry[1]:
+            _cache.move_to_end(session_id)
+            return entry[0]
+
+    user = get_session_user_record(session_id)
+    if user is None:
+        with _lock:
+            _cache.pop(session_id, None)
+        return None
+    _cache_put(session_id, user)
+    return user
+
+def drop_session(token):
+    """注销会话"""
+    parsed = _parse_token(token) if token else None
+    if parsed is None:
+        return
+    with _lock:
+        _cache.pop(parsed[0], None)
+    delete_session_record(parsed[0])
+
+def _evict_user(user_id):
+    with _lock:
+        for session_id in [session_id for session_id, (user, _) in _cache.items() if user['id'] == user_id]:
+            del _cache[session_id]
+
+def drop_user_sessions(user_id):
+    """注销某个用户的全部会话（修改密码、删除用户后调用）"""
+    _evict_user(user_id)
+    delete_user_session_records(user_id)
+
+def expire_user_sessions(user_id):
+    """丢弃某个用户的缓存，下一次访问时重新读取用户信息（修改用户信息后调用）"""
+    _evict_user(user_id)
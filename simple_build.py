@@ -8,8 +8,32 @@
 import os
 import subprocess
 import shutil
+import sqlite3
 from pathlib import Path
 
+def copy_database(source, target):
+    """复制 SQLite 数据库
+
+    WAL 模式下最近提交的事务可能还在 -wal 文件中，只复制 .db 文件会丢失这些数据；
+    这里用 SQLite 在线备份得到包含全部已提交数据的一致副本，程序运行中也可以执行。
+    """
+    source_conn = sqlite3.connect(source)
+    try:
+        target_conn = sqlite3.connect(target)
+        try:
+            source_conn.backup(target_conn)
+        finally:
+            target_conn.close()
+    finally:
+        source_conn.close()
+
+def copy_project_databases(target_dir):
+    """复制项目登记表和各项目的数据库"""
+    shutil.copy2('projects.json', target_dir / 'projects.json')
+    (target_dir / 'projects').mkdir(exist_ok=True)
+    for db_file in Path('projects').glob('*.db'):
+        copy_database(db_file, target_dir / 'projects' / db_file.name)
+
 def main():
     print("=" * 50)
     print("BUG管理系统 - 简化版打包工具")
@@ -37,6 +61,18 @@ def main():
         '--clean',
         '--add-data=app.py;.',
         '--add-data=database.py;.',
+        '--add-data=exporter.py;.',
+        '--add-data=log_config.py;.',
+        '--add-data=db_metrics.py;.',
+        '--add-data=query_cache.py;.',
+        '--add-data=attachments.py;.',
+        '--add-data=compression.py;.',
+        '--add-data=log_viewer.py;.',
+        '--add-data=thumbnails.py;.',
+        '--add-data=importer.py;.',
+        '--add-data=passwords.py;.',
+        '--add-data=sessions.py;.',
+        '--add-data=permissions.py;.',
         'launcher.py'
     ]
     
@@ -53,9 +89,14 @@ def main():
             
             # 复制数据库文件
             if os.path.exists('bugs.db'):
-                shutil.copy2('bugs.db', dist_dir / 'bugs.db')
+                copy_database('bugs.db', dist_dir / 'bugs.db')
                 print("- 复制数据库文件")
             
+            # 复制其他项目的登记表和数据库
+            if os.path.exists('projects.json'):
+                copy_project_databases(dist_dir)
+                print("- 复制项目数据库")
+            
             # 复制上传目录
             if os.path.exists('uploads'):
                 shutil.copytree('uploads', dist_dir / 'uploads', dirs_exist_ok=True)
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""测试共用的数据目录和项目：每个测试在独立的新项目（数据库）中执行"""
+
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('BUG_DATA_DIR', tempfile.mkdtemp(prefix='bug_tests_'))
+os.environ.setdefault('BUG_SESSION_SECRET', 'test-secret')
+
+import database  # noqa: E402
+
+
+@pytest.fixture
+def project():
+    """新建一个空项目并设为当前项目，返回项目标识"""
+    key = database.create_project(f"test-{uuid.uuid4().hex[:12]}")
+    with database.use_project(key):
+        yield key
+
+
+def add_bug(title='BUG', description='描述', submitter='测试人员', assignee_id=None, status='待处理',
+            created_at=None):
+    """直接插入一个BUG（可指定创建时间），返回ID"""
+    with database.write_connection(invalidates=('bugs',)) as conn:
+        cursor = conn.execute('''
+            INSERT INTO bugs (title, description, version, region, submitter, assignee_id, status, created_at)
+            VALUES (?, ?, '1.0', '华东', ?, ?, ?, IFNULL(?, CURRENT_TIMESTAMP))
+        ''', (title, description, submitter, assignee_id, status, created_at))
+        return cursor.lastrowid
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""基准测试的语句计数只统计测量线程自己的查询"""
+
+import os
+import subprocess
+import sys
+import threading
+
+import database
+from conftest import add_bug
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _read_in_other_thread(project, bug_id, times):
+    def read():
+        with database.use_project(project):
+            for _ in range(times):
+                database.get_bug_details(bug_id)
+    thread = threading.Thread(target=read)
+    thread.start()
+    thread.join()
+
+
+def test_statement_count_ignores_other_threads(project):
+    bug_ids = [add_bug() for _ in range(5)]
+    with database._count_read_statements() as statements:
+        # 测量线程两次查询之间，其他线程借用空闲读连接
+        _read_in_other_thread(project, bug_ids[0], 20)
+        for bug_id in bug_ids:
+            assert database.get_bug_details(bug_id)['id'] == bug_id
+            _read_in_other_thread(project, bug_id, 3)
+    assert statements[0] == len(bug_ids)
+
+    # 测量结束后不再计数，连接照常归还连接池
+    database.get_bug_details(bug_ids[0])
+    assert statements[0] == len(bug_ids)
+
+
+def test_benchmark_bug_details_counts_statements(project):
+    for _ in range(12):
+        add_bug()
+    report = database.benchmark_bug_details(10)
+    assert report['bugs'] == 10
+    assert report['single'][0] == 10
+    assert report['batch'][0] <= 2
+
+
+def test_benchmark_bypasses_cache_with_metrics_enabled(tmp_path):
+    # 性能监控在导入 database 时决定是否包装函数，需要在子进程中开启
+    script = '''
+import database
+for _ in range(5):
+    database.create_bug('问题', '描述', '1.0', '华东', '测试人员')
+database.get_bug_details_many([5, 4, 3, 2, 1])
+report = database.benchmark_bug_details(5)
+assert report['batch'][0] >= 1, report
+'''
+    env = dict(os.environ, BUG_DB_METRICS='1', BUG_DATA_DIR=str(tmp_path))
+    result = subprocess.run([sys.executable, '-c', script], cwd=ROOT, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""批量修改BUG：不存在的ID、解决时间、取消分配、缓存和统计汇总表的更新"""
+
+import pytest
+
+import database
+from conftest import add_bug
+
+
+def _assignees(bug_ids):
+    return {bug_id: database.get_bug_details_many([bug_id])[bug_id]['assignee_id'] for bug_id in bug_ids}
+
+
+def test_mixed_existing_and_missing_ids(project):
+    first, second = add_bug(), add_bug()
+    results = database.bulk_update_bugs([first, 999999, second, first], status='紧急')
+    assert results == {first: True, 999999: False, second: True}
+    details = database.get_bug_details_many([first, second])
+    assert {details[first]['status'], details[second]['status']} == {'紧急'}
+
+
+def test_resolved_at_kept_for_already_resolved(project):
+    resolved = add_bug(status='已解决')
+    pending = add_bug()
+    with database.write_connection(invalidates=('bugs',)) as conn:
+        conn.execute("UPDATE bugs SET resolved_at = '2020-01-02 03:04:05' WHERE id = ?", (resolved,))
+
+    database.bulk_update_bugs([resolved, pending], status='已解决')
+    details = database.get_bug_details_many([resolved, pending])
+    assert details[resolved]['resolved_at'] == '2020-01-02 03:04:05'
+    assert details[pending]['resolved_at'] is not None
+
+
+def test_unassigned_id_clears_assignee(project):
+    bug_ids = [add_bug(assignee_id=1), add_bug(assignee_id=2)]
+    database.bulk_update_bugs(bug_ids, assignee_id=database.UNASSIGNED_ID)
+    assert _assignees(bug_ids) == dict.fromkeys(bug_ids, None)
+
+
+def test_unknown_assignee_keeps_existing_assignments(project):
+    bug_ids = [add_bug(assignee_id=1), add_bug(assignee_id=2)]
+    with pytest.raises(ValueError):
+        database.bulk_update_bugs(bug_ids, status='紧急', assignee_id=999999)
+    assert _assignees(bug_ids) == {bug_ids[0]: 1, bug_ids[1]: 2}
+    assert {bug['status'] for bug in database.get_bug_details_many(bug_ids).values()} == {'待处理'}
+
+
+def test_cache_and_rollups_follow_update(project):
+    bug_ids = [add_bug(assignee_id=1) for _ in range(3)]
+    before = database.get_bug_stats()
+    page, _ = database.get_bugs_page()
+    assert before['urgent'] == 0
+    assert {bug['assignee'] for bug in page} == {'张三'}
+
+    database.bulk_update_bugs(bug_ids[:2], status='紧急', assignee_id=2)
+    after = database.get_bug_stats()
+    page, _ = database.get_bugs_page()
+    assert after['urgent'] == 2
+    assert after['assignee_stats'] == {'张三': 1, '李四': 2}
+    assert sorted(bug['assignee'] for bug in page) == ['张三', '李四', '李四']
+    assert database.check_stats_rollups() == []
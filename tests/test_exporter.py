@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""导出临时文件：下载读取后删除，未下载的在进程退出时删除"""
+
+import csv
+import io
+import os
+
+import exporter
+from conftest import add_bug
+
+
+def test_export_file_removed_after_download(project):
+    add_bug('导出问题一')
+    add_bug('导出问题二')
+    path, count = exporter.export_bugs_to_tempfile('csv')
+    assert count == 2
+    assert os.path.exists(path)
+
+    read_content = exporter.download_export(path)
+    assert os.path.exists(path)
+    content = read_content()
+    assert not os.path.exists(path)
+    rows = list(csv.reader(io.StringIO(content.decode('utf-8-sig'))))
+    assert rows[0] == exporter.EXPORT_COLUMNS
+    assert sorted(row[1] for row in rows[1:]) == ['导出问题一', '导出问题二']
+    # 再次点击下载返回同一份内容
+    assert read_content() is content
+    assert path not in exporter._pending_exports
+
+
+def test_undownloaded_exports_removed_at_exit(project):
+    add_bug()
+    paths = [exporter.export_bugs_to_tempfile(fmt)[0] for fmt in ('csv', 'xlsx')]
+    exporter.discard_export(paths[0])
+    assert not os.path.exists(paths[0])
+    assert os.path.exists(paths[1])
+
+    exporter._discard_pending_exports()
+    assert not os.path.exists(paths[1])
+    assert not exporter._pending_exports
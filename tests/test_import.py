@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""批量导入：无效行按文件行号报告，其余行写入，导入后触发器恢复、统计汇总表和全文索引一致"""
+
+import json
+
+import pytest
+
+import database
+import importer
+
+
+def _write_csv(path):
+    path.write_text(
+        "标题,描述,提交人,分配研发,assignee_id,状态\n"
+        "登录超时问题,点击登录后超时,测试甲,张三,,紧急\n"
+        "分配不存在,研发人员ID不存在,测试甲,,999,\n"
+        ",缺少标题,测试甲,,,\n"
+        "支付失败问题,支付后页面白屏,测试乙,,0,\n"
+        "推送延迟问题,推送消息延迟到达,测试乙,,2,已解决\n",
+        encoding='utf-8')
+
+
+def _write_jsonl(path):
+    rows = [
+        {'title': '登录超时问题', 'description': '点击登录后超时', 'submitter': '测试甲', 'assignee': '张三',
+         'status': '紧急'},
+        {'title': '分配不存在', 'submitter': '测试甲', 'assignee_id': 999},
+        {'description': '缺少标题', 'submitter': '测试甲'},
+        {'title': '支付失败问题', 'description': '支付后页面白屏', 'submitter': '测试乙', 'assignee_id': 0},
+        {'title': '推送延迟问题', 'description': '推送消息延迟到达', 'submitter': '测试乙', 'assignee_id': 2,
+         'status': '已解决'},
+    ]
+    path.write_text(''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in rows), encoding='utf-8')
+
+
+@pytest.mark.parametrize('name, write, first_line', [
+    ('bugs.csv', _write_csv, 2),
+    ('bugs.jsonl', _write_jsonl, 1),
+])
+def test_import_reports_bad_rows_by_line(project, tmp_path, name, write, first_line):
+    path = tmp_path / name
+    write(path)
+
+    report = importer.import_bug_files([str(path)], batch_size=2, transaction_rows=2)
+
+    assert report['rows'] == 3
+    assert report['skipped'] == 1
+    assert report['errors'] == 2
+    assert sorted((line, message) for _, line, message in report['error_details']) == [
+        (first_line + 1, '研发人员ID 999 不存在'),
+        (first_line + 2, '缺少标题'),
+    ]
+    assert {detail[0] for detail in report['error_details']} == {str(path)}
+
+    page, _ = database.get_bugs_page()
+    assert sorted((bug['title'], bug['assignee']) for bug in page) == [
+        ('推送延迟问题', '李四'), ('支付失败问题', '未分配'), ('登录超时问题', '张三')]
+
+    with database.read_connection() as conn:
+        triggers = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    assert set(database.BULK_DEFERRED_TRIGGERS) <= triggers
+    assert database.check_stats_rollups() == []
+    assert database.get_bug_stats()['urgent'] == 1
+    results, total = database.search_bugs('支付后页面')
+    assert total == 1 and results[0]['title'] == '支付失败问题'
+
+    # 触发器恢复后，逐行写入仍会更新汇总表和全文索引
+    database.create_bug('导入后新增问题', '导入之后新增', '1.0', '华东', '测试丙')
+    assert database.check_stats_rollups() == []
+    assert database.search_bugs('导入之后')[1] == 1
+
+
+def test_on_error_called_for_unknown_assignee_id(project):
+    errors = []
+    report = database.bulk_import_bugs(
+        [{'title': '正常'}, {'title': '不存在', 'assignee_id': 999}, {'title': '未分配', 'assignee_id': 0}],
+        on_error=lambda bug, message: errors.append((bug['title'], message)))
+    assert report['rows'] == 2
+    assert report['skipped'] == 1
+    assert errors == [('不存在', '研发人员ID 999 不存在')]
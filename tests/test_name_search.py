@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""姓名子串搜索：n-gram 索引与超长姓名"""
+
+import database
+
+
+def _search(text):
+    developers, total = database.get_developers(search=text, page_size=100)
+    return sorted(dev['name'] for dev in developers)
+
+
+def test_short_and_long_terms_use_grams(project):
+    database.create_developer('欧阳春晓')
+    assert _search('春晓') == ['欧阳春晓']
+    assert _search('欧阳春') == ['欧阳春晓']
+    assert _search('阳春晓') == ['欧阳春晓']
+    assert _search('欧阳晓') == []
+
+
+def test_match_past_gram_limit(project):
+    long_name = '外' * database.NAME_GRAM_MAX_LENGTH + '包团队王小明'
+    dev_id = database.create_developer(long_name)
+    database.create_developer('王小明')
+    assert _search('团队王') == [long_name]
+    assert _search('王小明') == sorted(['王小明', long_name])
+    assert _search('明') == sorted(['王小明', long_name])
+
+    # 改为短姓名后标记随之删除，不再作为候选
+    database.update_developer(dev_id, name='包团队')
+    with database.read_connection() as conn:
+        markers = conn.execute('SELECT COUNT(*) FROM name_grams WHERE gram = ?',
+                               (database.NAME_GRAM_LONG_MARKER,)).fetchone()[0]
+    assert markers == 0
+    assert _search('王小明') == ['王小明']
+    assert _search('团队') == ['包团队']
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""BUG列表键集分页：created_at 相同的行跨页时不重复、不遗漏，上一页与之前看到的一致"""
+
+import pytest
+
+import database
+from conftest import add_bug
+
+
+def _walk_forward(page_size, **filters):
+    """像列表页一样逐页向后翻，返回 (各页起始游标, 各页ID)"""
+    cursors, pages = [None], []
+    while True:
+        bugs, next_cursor = database.get_bugs_page(cursor=cursors[-1], page_size=page_size, **filters)
+        pages.append([bug['id'] for bug in bugs])
+        if next_cursor is None:
+            return cursors, pages
+        cursors.append(next_cursor)
+
+
+@pytest.mark.parametrize('page_size', [1, 3, 4, 7, 25])
+def test_pages_cover_ties_without_duplicates_or_gaps(project, page_size):
+    # 同一时间戳的一批BUG会跨越页边界
+    times = ['2024-05-01 09:00:00'] * 5 + ['2024-05-02 12:00:00'] * 9 + ['2024-05-03 08:30:00'] * 3
+    bug_ids = [add_bug(f"问题{i}", status='紧急' if i % 2 else '待处理', created_at=created_at)
+               for i, created_at in enumerate(times)]
+    expected = sorted(bug_ids, key=lambda bug_id: (times[bug_ids.index(bug_id)], bug_id), reverse=True)
+
+    cursors, pages = _walk_forward(page_size)
+    assert [bug_id for page in pages for bug_id in page] == expected
+    assert all(len(page) == page_size for page in pages[:-1])
+    assert 0 < len(pages[-1]) <= page_size
+
+    # 向前翻：弹出游标后重新查询，得到与向后翻时相同的页
+    while len(cursors) > 1:
+        cursors.pop()
+        bugs, next_cursor = database.get_bugs_page(cursor=cursors[-1], page_size=page_size)
+        assert [bug['id'] for bug in bugs] == pages[len(cursors) - 1]
+        assert next_cursor is not None
+
+    # 带过滤条件时同样完整
+    _, urgent_pages = _walk_forward(page_size, status='紧急')
+    assert [bug_id for page in urgent_pages for bug_id in page] == \
+        [bug_id for bug_id in expected if bug_ids.index(bug_id) % 2]
+
+
+def test_exact_multiple_of_page_size_has_no_empty_last_page(project):
+    for _ in range(6):
+        add_bug(created_at='2024-05-01 09:00:00')
+    cursors, pages = _walk_forward(3)
+    assert [len(page) for page in pages] == [3, 3]
+    assert len(cursors) == 2
+
+
+def test_invalid_cursor_is_rejected(project):
+    with pytest.raises(ValueError):
+        database.get_bugs_page(cursor='不是游标')
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""角色权限集合和整页BUG的可编辑判断"""
+
+import pytest
+
+import permissions
+
+
+def test_role_capabilities_are_compiled_frozensets():
+    for role, actions in permissions.ROLE_PERMISSIONS.items():
+        capabilities = permissions.get_capabilities(role)
+        assert isinstance(capabilities, frozenset)
+        if 'all' not in actions:
+            assert capabilities == frozenset(actions)
+
+
+def test_admin_has_every_known_permission():
+    admin = permissions.get_capabilities('admin')
+    assert admin == permissions.ALL_PERMISSIONS
+    assert set(permissions.ADMIN_ONLY_PERMISSIONS) <= admin
+    assert 'all' not in admin
+    for role in ('pm', 'developer', 'tester', 'guest'):
+        assert permissions.get_capabilities(role) < admin
+        assert not set(permissions.ADMIN_ONLY_PERMISSIONS) & permissions.get_capabilities(role)
+
+
+@pytest.mark.parametrize('role, action, allowed', [
+    ('admin', 'manage_users', True),
+    ('admin', 'delete_bug', True),
+    ('admin', 'no_such_action', False),
+    ('pm', 'export_data', True),
+    ('pm', 'manage_users', False),
+    ('tester', 'edit_own_bug', True),
+    ('tester', 'edit_bug', False),
+    ('guest', 'create_bug', False),
+    ('nobody', 'view_bugs', False),
+])
+def test_check_permission(role, action, allowed):
+    assert permissions.check_permission(role, action) is allowed
+    assert (action in permissions.get_capabilities(role)) is allowed
+
+
+SUBMITTERS = ['测试人员', 'tester', '其他人', '测试人员']
+
+
+@pytest.mark.parametrize('user, expected', [
+    ({'role': 'pm', 'username': 'pm', 'real_name': '项目经理'}, [True, True, True, True]),
+    ({'role': 'admin', 'username': 'admin', 'real_name': None}, [True, True, True, True]),
+    ({'role': 'tester', 'username': 'tester', 'real_name': '测试人员'}, [True, False, False, True]),
+    ({'role': 'developer', 'username': 'tester', 'real_name': ''}, [False, True, False, False]),
+    ({'role': 'guest', 'username': 'guest', 'real_name': '测试人员'}, [False, False, False, False]),
+])
+def test_editable_bug_mask(user, expected):
+    mask = permissions.editable_bug_mask(user, SUBMITTERS)
+    assert mask.dtype == bool
+    assert mask.tolist() == expected
+
+
+def test_editable_bug_mask_empty_page():
+    user = {'role': 'tester', 'username': 'tester', 'real_name': '测试人员'}
+    assert permissions.editable_bug_mask(user, []).tolist() == []
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""查询缓存按项目区分：写入只使本项目依赖该表的缓存失效"""
+
+import uuid
+
+import database
+
+
+def test_write_invalidates_only_its_project(project):
+    other = database.create_project(f"test-{uuid.uuid4().hex[:12]}")
+    database.create_bug('本项目问题', '描述', '1.0', '华东', '测试甲')
+    with database.use_project(other):
+        database.create_bug('其他项目问题', '描述', '1.0', '华东', '测试甲')
+
+    page = database.get_bugs_page()
+    developers = database.get_developers()
+    with database.use_project(other):
+        other_page = database.get_bugs_page()
+    assert [bug['title'] for bug in page[0]] == ['本项目问题']
+    assert [bug['title'] for bug in other_page[0]] == ['其他项目问题']
+    # 未写入时命中缓存（返回同一个对象）
+    assert database.get_bugs_page() is page
+
+    # 其他项目的写入不影响本项目的缓存
+    with database.use_project(other):
+        database.create_bug('其他项目问题二', '描述', '1.0', '华东', '测试甲')
+        refreshed_other = database.get_bugs_page()
+    assert refreshed_other is not other_page
+    assert len(refreshed_other[0]) == 2
+    assert database.get_bugs_page() is page
+
+    # 本项目写入 bugs 后依赖 bugs 的缓存失效，只依赖 developers 的缓存不变
+    database.create_bug('本项目问题二', '描述', '1.0', '华东', '测试甲')
+    refreshed = database.get_bugs_page()
+    assert refreshed is not page
+    assert [bug['title'] for bug in refreshed[0]] == ['本项目问题二', '本项目问题']
+    assert database.get_developers() is developers
+
+    database.create_developer('钱七')
+    assert database.get_developers() is not developers
+    assert database.get_bugs_page() is not refreshed
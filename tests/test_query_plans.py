@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""热点查询的 EXPLAIN QUERY PLAN：各自使用预期索引，不对 bugs 表做全表扫描"""
+
+import pytest
+
+import database
+
+EXPECTATIONS = database._query_plan_expectations()
+
+
+@pytest.mark.parametrize('name, query, params, expected_index, plan_project', EXPECTATIONS,
+                         ids=[expectation[0] for expectation in EXPECTATIONS])
+def test_hot_query_uses_expected_index(project, name, query, params, expected_index, plan_project):
+    plan = database._explain_query_plan(query, params, plan_project)
+    assert database._plan_uses_index(plan, expected_index), plan
+    assert not database._plan_scans_bugs(plan), plan
+
+
+def test_dropped_index_is_detected(project):
+    name, query, params, expected_index, _ = EXPECTATIONS[2]
+    assert expected_index == 'idx_bugs_submitter_created'
+    with database.write_connection() as conn:
+        conn.execute(f"DROP INDEX {expected_index}")
+    plan = database._explain_query_plan(query, params)
+    assert not database._plan_uses_index(plan, expected_index)
+    assert [failure[0] for failure in database.check_query_plans()] == [name]
+
+
+@pytest.mark.parametrize('plan, scans_bugs', [
+    (['SCAN b'], True),
+    (['SCAN bugs'], True),
+    (['SCAN bug_rollup_daily'], False),
+    (['SCAN bugs_fts VIRTUAL TABLE INDEX 0:M1'], False),
+    (['SCAN b USING INDEX idx_bugs_created_at'], False),
+    (['SEARCH b USING INDEX idx_bugs_status_created (status=?)'], False),
+])
+def test_full_scan_matches_bugs_table_only(plan, scans_bugs):
+    assert database._plan_scans_bugs(plan) is scans_bugs
+
+
+def test_index_name_matches_whole_word():
+    plan = ['SEARCH b USING INDEX idx_bugs_created_at_v2 (created_at<?)']
+    assert not database._plan_uses_index(plan, 'idx_bugs_created_at')
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""全文搜索：三字及以上的词走 trigram 索引，更短的词用 LIKE 过滤且 % 和 _ 按字面匹配"""
+
+import database
+from conftest import add_bug
+
+
+def _titles(query):
+    results, total = database.search_bugs(query, page_size=50)
+    assert total == len(results)
+    return sorted(bug['title'] for bug in results)
+
+
+def test_trigram_search_matches_substrings(project):
+    add_bug('登录页面白屏', '点击登录按钮后页面白屏')
+    add_bug('支付超时', '支付接口响应超过30秒')
+    add_bug('推送失败', '后台推送服务返回登录过期')
+    assert _titles('页面白') == ['登录页面白屏']
+    assert _titles('接口响应') == ['支付超时']
+    assert _titles('登录过期') == ['推送失败']
+    assert _titles('登录 白屏') == ['登录页面白屏']
+    assert _titles('不存在的词') == []
+
+
+def test_title_hits_rank_before_description_hits(project):
+    add_bug('普通问题', '偶发崩溃问题')
+    add_bug('启动崩溃问题', '描述')
+    results, _ = database.search_bugs('崩溃问题')
+    assert [bug['title'] for bug in results] == ['启动崩溃问题', '普通问题']
+
+
+def test_fts_follows_update_and_delete(project):
+    bug_id = add_bug('旧标题内容', '描述')
+    database.update_bug(bug_id, title='新标题内容')
+    assert _titles('旧标题') == []
+    assert _titles('新标题') == ['新标题内容']
+    database.delete_bug(bug_id)
+    assert _titles('新标题') == []
+
+
+def test_short_terms_escape_like_wildcards(project):
+    add_bug('进度100%卡住', '描述')
+    add_bug('进度1000卡住', '描述')
+    add_bug('字段user_id为空', '描述')
+    add_bug('字段userXid为空', '描述')
+    assert _titles('%') == ['进度100%卡住']
+    assert _titles('0%') == ['进度100%卡住']
+    assert _titles('_') == ['字段user_id为空']
+    assert _titles('r_') == ['字段user_id为空']
+    assert _titles('卡住 0%') == ['进度100%卡住']
+    assert _titles('进度100 %') == ['进度100%卡住']
+    assert _titles('ab') == []
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""会话令牌解析：来自 URL 的任意字符串都不能让页面崩溃"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('BUG_DATA_DIR', tempfile.mkdtemp(prefix='bug_sessions_'))
+os.environ.setdefault('BUG_SESSION_SECRET', 'test-secret')
+
+import sessions  # noqa: E402
+
+
+@pytest.mark.parametrize('token', [
+    'abc.123.é',
+    'é.123.' + 'A' * 43,
+    'abc.１２３.' + 'A' * 43,
+    'abc.123',
+    'abc.123.' + 'A' * 43 + '.x',
+    'abc.notanumber.' + 'A' * 43,
+    '',
+    None,
+    ['abc', '123', 'sig'],
+])
+def test_malformed_token_is_rejected(token):
+    assert sessions._parse_token(token) is None
+    assert sessions.get_session_user(token) is None
+    sessions.drop_session(token)
+
+
+def test_signed_token_round_trip():
+    payload = 'abc.4102444800'
+    token = f"{payload}.{sessions._sign(payload)}"
+    assert sessions._parse_token(token) == ('abc', 4102444800)
+    assert sessions._parse_token(token[:-1] + ('A' if token[-1] != 'A' else 'B')) is None
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""统计汇总表：触发器维护的计数在插入、修改、删除后与 bugs 表的 COUNT(*) 一致"""
+
+import database
+from conftest import add_bug
+
+
+def _recount():
+    with database.read_connection() as conn:
+        daily = dict(((day, status), count) for day, status, count in conn.execute(
+            "SELECT IFNULL(date(created_at), ''), IFNULL(status, ''), COUNT(*) FROM bugs GROUP BY 1, 2"))
+        rollup = dict(((day, status), count) for day, status, count in conn.execute(
+            "SELECT day, status, bug_count FROM bug_rollup_daily"))
+    return daily, rollup
+
+
+def _assert_consistent():
+    daily, rollup = _recount()
+    assert rollup == daily
+    assert database.check_stats_rollups() == []
+
+
+def test_rollups_follow_insert_update_delete(project):
+    first = database.create_bug('问题一', '描述', '1.0', '华东', '测试甲', assignee_id=1, status='紧急')
+    second = database.create_bug('问题二', '描述', '1.0', '华南', '测试乙')
+    third = add_bug(submitter='测试甲', created_at='2024-03-05 10:00:00')
+    _assert_consistent()
+    assert database.get_bug_stats()['total'] == 3
+
+    database.update_bug(second, status='已解决', assignee_id=2)
+    database.update_bug_status(first, '一般')
+    with database.write_connection(invalidates=('bugs',)) as conn:
+        conn.execute("UPDATE bugs SET created_at = '2024-04-01 08:00:00', submitter = '测试丙' WHERE id = ?",
+                     (third,))
+    _assert_consistent()
+    stats = database.get_bug_stats()
+    assert stats['resolved'] == 1 and stats['urgent'] == 0
+    assert stats['submitter_stats'] == {'测试甲': 1, '测试乙': 1, '测试丙': 1}
+    assert stats['assignee_stats'] == {'张三': 1, '李四': 1}
+
+    database.delete_bug(first)
+    database.delete_bug(third)
+    _assert_consistent()
+    with database.read_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM bug_rollup_daily WHERE bug_count <= 0").fetchone()[0] == 0
+    assert database.get_bug_stats()['total'] == 1
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+截图缩略图与预览图
+上传截图后在后台线程中生成 WebP 缩略图（列表中显示）和中等尺寸预览图（点击查看时显示），
+保存在原图旁边（<原图去掉扩展名>.thumb.webp / .preview.webp）。原图按内容哈希存储、
+内容不会变化，因此派生图生成一次即可，无需失效处理。
+
+环境变量:
+    BUG_THUMBNAIL_WORKERS   生成派生图的后台线程数，默认 2
+"""
+
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# 派生图规格: 名称 -> (最长边像素, WebP 质量)
+DERIVATIVE_SPECS = {
+    'thumb': (320, 70),
+    'preview': (1280, 80),
+}
+# 后台生成线程数
+THUMBNAIL_WORKERS = int(os.environ.get('BUG_THUMBNAIL_WORKERS', '2'))
+
+_executor = None
+_executor_lock = threading.Lock()
+# 排队中的原图路径，避免每次重跑重复提交
+_pending = set()
+# 生成失败的原图路径（例如文件损坏），不再重试
+_failed = set()
+
+def derivative_path(path, kind):
+    """原图对应的派生图路径"""
+    return f"{os.path.splitext(path)[0]}.{kind}.webp"
+
+def _save_webp(image, path, quality):
+    """先写临时文件再重命名，并发生成同一张图时也不会读到半个文件"""
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.thumb_', suffix='.webp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            image.save(f, 'WEBP', quality=quality, method=4)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def generate_derivatives(path):
+    """为一张原图生成缺少的派生图，返回新生成的数量"""
+    missing = {kind: spec for kind, spec in DERIVATIVE_SPECS.items()
+               if not os.path.exists(derivative_path(path, kind))}
+    if not missing:
+        return 0
+
+    largest = max(size for size, _ in missing.values())
+    with Image.open(path) as image:
+        # JPEG 可以直接按缩小的尺寸解码，大图省去大部分解码开销
+        image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+
+        # 从大到小依次缩放，小图由上一级结果缩放得到
+        for kind, (size, quality) in sorted(missing.items(), key=lambda item: -item[1][0]):
+            image.thumbnail((size, size), Image.Resampling.LANCZOS)
+            _save_webp(image, derivative_path(path, kind), quality)
+    logger.debug("生成派生图 %s: %s", path, sorted(missing))
+    return len(missing)
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max(THUMBNAIL_WORKERS, 1), thread_name_prefix='thumbnail')
+        return _executor
+
+def _generate_in_background(path):
+    try:
+        generate_derivatives(path)
+    except Exception as e:
+        logger.warning("生成派生图失败 %s: %s", path, e)
+        with _executor_lock:
+            _failed.add(path)
+    finally:
+        with _executor_lock:
+            _pending.discard(path)
+
+def schedule_derivatives(path):
+    """提交后台任务生成派生图（已在排队或已失败的不重复提交）"""
+    executor = _get_executor()
+    with _executor_lock:
+        if path in _pending or path in _failed:
+            return
+        _pending.add(path)
+    executor.submit(_generate_in_background, path)
+
+def get_derivative(path, kind):
+    """返回已生成的派生图路径；尚未生成时提交后台任务并返回 None"""
+    target = derivative_path(path, kind)
+    if os.path.exists(target):
+        return target
+    if os.path.exists(path):
+        schedule_derivatives(path)
+    return None
+
+def remove_derivatives(path):
+    """删除原图的全部派生图（原图被回收时调用）"""
+    for kind in DERIVATIVE_SPECS:
+        try:
+            os.remove(derivative_path(path, kind))
+        except FileNotFoundError:
+            pass
+
+def backfill_derivatives(paths):
+    """为已有截图补齐派生图，返回 {'images': 原图数, 'generated': 新生成数, 'missing': 原图不存在数,
+    'failed': 失败数, 'original_bytes': 原图总大小, 'thumb_bytes': 缩略图总大小}"""
+    report = {'images': 0, 'generated': 0, 'missing': 0, 'failed': 0, 'original_bytes': 0, 'thumb_bytes': 0}
+    existing = []
+    for path in paths:
+        if os.path.isfile(path):
+            existing.append(path)
+        else:
+            report['missing'] += 1
+
+    def generate(path):
+        try:
+            return generate_derivatives(path)
+        except Exception as e:
+            logger.warning("生成派生图失败 %s: %s", path, e)
+            return None
+
+    for path, generated in zip(existing, _get_executor().map(generate, existing)):
+        report['images'] += 1
+        if generated is None:
+            report['failed'] += 1
+            continue
+        report['generated'] += generated
+        report['original_bytes'] += os.path.getsize(path)
+        report['thumb_bytes'] += os.path.getsize(derivative_path(path, 'thumb'))
+    return report
+
+def download_original(path):
+    """返回供 st.download_button 使用的回调：点击下载时才读取原图"""
+    def read_content():
+        with open(path, 'rb') as f:
+            return f.read()
+    return read_content